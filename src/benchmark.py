@@ -0,0 +1,183 @@
+"""
+Benchmark the stages of the corpus generation on synthetic GregoBase dumps.
+
+For every scale (number of chants), a synthetic dump is generated (see
+`synthetic_dump.py`) and all pipeline stages are run on it and timed. The
+results are stored as a JSON file, so that they can be compared between
+commits. Usage:
+
+```bash
+$ python benchmark.py --scales=1000,10000 --output=../dist/benchmarks/new.json
+$ python benchmark.py --scales=1000,10000 --compare=../dist/benchmarks/old.json
+```
+"""
+import os
+import json
+import time
+import shutil
+import logging
+import platform
+import datetime
+import subprocess
+
+import generate_corpus as gc
+import synthetic_dump
+
+STAGES = ['sql', 'gabc', 'html', 'readme', 'compress']
+
+def git_commit():
+    """Return the hash of the current git commit, or None"""
+    try:
+        output = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+            cwd=gc.SRC_DIR, stderr=subprocess.DEVNULL)
+        return output.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_pipeline(dump_fn, output_dir, stages=STAGES, engine='native', jobs=1):
+    """Run the stages of the pipeline on a dump and time them.
+
+    Returns:
+        dict: maps stage names to durations in seconds
+    """
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.makedirs(output_dir)
+    gc.set_output_dir(output_dir)
+
+    durations = {}
+    start = time.perf_counter()
+    sql = gc.SQLConverter(engine=engine)
+    sql.convert_to_csv(filepath=dump_fn)
+    durations['sql'] = time.perf_counter() - start
+
+    tables = gc.CorpusTables()
+    if 'gabc' in stages:
+        start = time.perf_counter()
+        csv = gc.CSVConverter(tables=tables)
+        csv.convert_to_gabc()
+        durations['gabc'] = time.perf_counter() - start
+
+    if 'html' in stages:
+        start = time.perf_counter()
+        gabc = gc.GABCConverter(tables=tables)
+        gabc.convert_to_html(jobs=jobs)
+        durations['html'] = time.perf_counter() - start
+
+    if 'readme' in stages:
+        start = time.perf_counter()
+        writer = gc.ReadmeWriter(tables=tables)
+        writer.write_readme(gregobase_export_date='synthetic')
+        durations['readme'] = time.perf_counter() - start
+
+    if 'compress' in stages:
+        start = time.perf_counter()
+        gc.compress_corpus()
+        durations['compress'] = time.perf_counter() - start
+
+    return { stage: duration for stage, duration in durations.items() if stage in stages }
+
+def run_benchmark(scales, work_dir, stages=STAGES, repeat=1, engine='native', jobs=1, seed=0):
+    """Benchmark the pipeline at several scales.
+
+    Returns:
+        dict: the benchmark results
+    """
+    results = []
+    for num_chants in scales:
+        dump_fn = os.path.join(work_dir, f'synthetic-{num_chants}.sql')
+        if not os.path.exists(dump_fn):
+            print(f'Generating synthetic dump with {num_chants} chants...')
+            tables = synthetic_dump.generate_tables(num_chants, seed=seed)
+            synthetic_dump.write_dump(tables, dump_fn)
+
+        output_dir = os.path.join(work_dir, f'gregobasecorpus-{num_chants}')
+        timings = { stage: [] for stage in stages }
+        for i in range(repeat):
+            print(f'Running pipeline on {num_chants} chants ({i + 1}/{repeat})...')
+            durations = run_pipeline(dump_fn, output_dir, stages=stages,
+                engine=engine, jobs=jobs)
+            for stage, duration in durations.items():
+                timings[stage].append(duration)
+
+        for stage in stages:
+            results.append({
+                'chants': num_chants,
+                'stage': stage,
+                'seconds': timings[stage],
+            })
+
+    return {
+        'commit': git_commit(),
+        'date': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'engine': engine,
+        'jobs': jobs,
+        'results': results
+    }
+
+def compare(new, old):
+    """Print a comparison of two benchmark results (using the fastest runs)"""
+    old_results = { (r['chants'], r['stage']): r['seconds'] for r in old['results'] }
+    print(f"{'chants':>8} {'stage':<10} {'old (s)':>10} {'new (s)':>10} {'ratio':>7}")
+    for result in new['results']:
+        key = (result['chants'], result['stage'])
+        if key not in old_results or len(result['seconds']) == 0:
+            continue
+        old_time = min(old_results[key])
+        new_time = min(result['seconds'])
+        ratio = new_time / old_time if old_time > 0 else float('nan')
+        print(f'{key[0]:>8} {key[1]:<10} {old_time:>10.3f} {new_time:>10.3f} {ratio:>7.2f}')
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark the generation of the GregoBase Corpus.')
+    parser.add_argument('--scales', type=str, default='500,2000,10000',
+                        help='comma-separated list of numbers of chants')
+    parser.add_argument('--stages', type=str, default=','.join(STAGES),
+                        help=f'comma-separated list of stages to time ({",".join(STAGES)})')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='number of times the pipeline is run at every scale')
+    parser.add_argument('--engine', type=str, default='native', choices=gc.SQLConverter.engines,
+                        help='engine used to read the sql dumps')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='number of worker processes used to convert chants to html')
+    parser.add_argument('--work-dir', type=str, default=os.path.join(gc.DIST_DIR, 'benchmarks'),
+                        help='directory where dumps and outputs are stored')
+    parser.add_argument('--output', type=str, default=None,
+                        help='path of the json file with the results')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='path of a json file with earlier results to compare to')
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(',')]
+    stages = args.stages.split(',')
+    for stage in stages:
+        if stage not in STAGES:
+            parser.error(f'Unknown stage: {stage}')
+    if not os.path.exists(args.work_dir):
+        os.makedirs(args.work_dir)
+    logging.basicConfig(filename=os.path.join(args.work_dir, 'benchmark.log'),
+                        filemode='w',
+                        format='%(levelname)s %(asctime)s %(message)s',
+                        level=logging.INFO)
+
+    results = run_benchmark(scales, args.work_dir, stages=stages, repeat=args.repeat,
+        engine=args.engine, jobs=args.jobs)
+
+    output_fn = args.output
+    if output_fn is None:
+        name = (results['commit'] or 'unknown')[:10]
+        output_fn = os.path.join(args.work_dir, f'benchmark-{name}.json')
+    with open(output_fn, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    print(f'Results written to {output_fn}')
+
+    if args.compare is not None:
+        with open(args.compare, 'r') as handle:
+            old = json.load(handle)
+        compare(results, old)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,408 @@
+"""
+A fast renderer that exports GABC files directly to the HTML files chant21
+would produce, without constructing music21 streams.
+
+Chant21 converts a GABC file to HTML by parsing it, building a music21 stream
+of sections, words, syllables, neumes and notes, and exporting that stream to
+a plain dictionary that is rendered using a template. This renderer walks the
+same parse tree (using chant21's GABC grammar), but builds lightweight objects
+instead of music21 objects, and renders the same template. Whenever a chant
+uses something the renderer does not support, it raises an exception, and
+the chant should be converted using chant21 instead (see
+`generate_corpus.convert_chant_to_html`).
+
+You can check that the renderer produces exactly the same files as chant21 for
+a (random sample of the) chants in a generated corpus:
+
+```bash
+$ python fast_html.py ../dist/gregobasecorpus-v0.4 --sample=500
+```
+"""
+import os
+import random
+import functools
+from arpeggio import visit_parse_tree, NoMatch
+from music21.editorial import Editorial
+from chant21 import __version__ as chant21_version
+from chant21.gabc import ParserGABC
+from chant21.gabc.parser import IncompleteParseError, EmptyParseError
+from chant21.gabc.converter import VisitorGABC, gabcPositionToStep
+from chant21.gabc.converter import MissingClef, AlterationWarning, NEUME_BOUNDARY
+from chant21.html import toFile
+
+VOLPIANO_NOTES = '89abcdefghjklmnopqrs'
+VOLPIANO_LIQUESCENTS = '()ABCDEFGHJKLMNOPQRS'
+PAUSA_VOLPIANO = {
+    'pausaminima': '7', 'pausaminor': '6', 'pausamajor': '3', 'pausafinalis': '4'
+}
+
+class UnsupportedChant(Exception):
+    """Raised when a chant cannot be rendered without chant21"""
+
+def from_chant21(function):
+    """Wrap a function from chant21, so that the exceptions it raises (which 
+    chant21 would also raise) are raised as an `UnsupportedChant`"""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        except UnsupportedChant:
+            raise
+        except Exception as e:
+            raise UnsupportedChant(f'{type(e).__name__}: {e}') from e
+    return wrapper
+
+def volpiano_index(position, gabc_clef):
+    """Return the index of a note in the volpiano alphabet, as computed by
+    `chant21.chant.pitchToVolpiano`"""
+    step = gabcPositionToStep(position, gabc_clef)
+    diatonic_note_num = int(step[1:]) * 7 + 'CDEFGAB'.index(step[0]) + 1
+    # The lowest volpiano note is 6 steps below the lowest line (E4, 31)
+    index = diatonic_note_num - 31 + 6
+    if index < 0 or index >= len(VOLPIANO_NOTES):
+        raise UnsupportedChant(f'Cannot convert {step} to volpiano')
+    return index
+
+class Element(object):
+    """A lightweight replacement of the music21 objects in a syllable. The
+    priority and class sort order are those of the corresponding chant21 class,
+    and determine the order of elements at the same offset, as in music21."""
+
+    sort_orders = {
+        'clef': (-2, 0), 'pausaminima': (-1, 20), 'pausaminor': (-1, 20),
+        'pausamajor': (-1, -5), 'pausafinalis': (-1, -5), 'flat': (-1, 20),
+        'natural': (-1, 20), 'neume': (0, -20)
+    }
+
+    def __init__(self, type, gabc=None, position=None):
+        self.type = type
+        self.gabc = gabc
+        self.position = position
+        self.notes = []
+
+    @property
+    def duration(self):
+        return len(self.notes)
+
+    def to_object(self):
+        obj = { 'type': self.type }
+        if self.type == 'neume':
+            obj['elements'] = [{ 'type': 'note', 'volpiano': note.volpiano }
+                               for note in self.notes]
+        elif self.type in PAUSA_VOLPIANO:
+            obj['volpiano'] = PAUSA_VOLPIANO[self.type]
+        elif self.type == 'clef':
+            obj['volpiano'] = '1'
+        # Chant21 fails to compute the volpiano of alterations, and omits it
+        return obj
+
+class Note(object):
+    """A lightweight replacement of `chant21.chant.Note`"""
+
+    def __init__(self, position):
+        self.position = position
+        self.editorial = Editorial()
+        self.notehead = 'normal'
+        self.noteheadFill = None
+        self.volpiano = None
+
+class Syllable(object):
+    """A lightweight replacement of `chant21.chant.Syllable`"""
+
+    def __init__(self, elements):
+        self.editorial = Editorial()
+        self.num_annotations = 0
+        # Sort the elements as music21 would: by offset, priority, class sort
+        # order and the order of insertion
+        offset = 0
+        keys = []
+        for i, element in enumerate(elements):
+            keys.append((offset, *Element.sort_orders[element.type], i))
+            offset += element.duration
+        self.elements = [elements[key[-1]] for key in sorted(keys)]
+        self.has_notes = offset > 0
+
+    @property
+    def annotation(self):
+        return self.editorial.get('annotation')
+
+    @annotation.setter
+    def annotation(self, value):
+        self.editorial.annotation = value
+
+    @property
+    def lyric(self):
+        return self.editorial.get('lyric')
+
+    @lyric.setter
+    def lyric(self, value):
+        # Chant21 stores lyrics on the first note, and only accepts strings
+        if not self.has_notes or type(value) is str:
+            self.editorial.lyric = value
+
+    def insert(self, offset, element):
+        # Only used to insert annotations, which are not exported
+        self.num_annotations += 1
+
+    @property
+    def num_leaves(self):
+        """The number of elements in a flattened version of the syllable"""
+        return self.num_annotations + sum(max(1, len(el.notes)) for el in self.elements)
+
+    def to_object(self):
+        obj = { 'type': 'syllable' }
+        if self.annotation is not None:
+            obj['annotation'] = self.annotation
+        obj['elements'] = [element.to_object() for element in self.elements]
+        if self.lyric is not None:
+            obj['lyric'] = self.lyric
+        return obj
+
+class Chant(object):
+    """Mimics a chant21 Chant object, so that it can be rendered using
+    `chant21.html.toFile`"""
+
+    def __init__(self, sections, metadata=None):
+        self.sections = sections
+        self.metadata = metadata if metadata is not None else {}
+
+    @staticmethod
+    def section_name(words):
+        if len(words) > 0 and words[0][0].annotation is not None:
+            annotation = words[0][0].annotation
+            return { 'V': 'verse', 'R': 'respond', 'A': 'antiphon' }.get(annotation)
+
+    def toObject(self, includeVolpiano=True):
+        metadata = self.metadata
+        metadata['chant21version'] = chant21_version
+        sections = []
+        for words in self.sections:
+            section = { 'type': 'section' }
+            section['elements'] = [
+                { 'type': 'word',
+                  'elements': [syllable.to_object() for syllable in word],
+                  'musicAndTextAligned': None }
+                for word in words]
+            name = self.section_name(words)
+            if name is not None:
+                section['name'] = name
+            sections.append(section)
+        return { 'type': 'chant', 'metadata': metadata, 'elements': sections }
+
+class FastVisitorGABC(VisitorGABC):
+    """Visitor that converts a GABC parse tree to lightweight objects. The text
+    of syllables (lyrics and annotations) is handled by the chant21 visitor."""
+
+    def visit_file(self, node, children):
+        header = {
+            'conversion': {
+                'originalFormat': 'gabc',
+                'converter': 'chant21',
+                'version': chant21_version
+            }
+        }
+        for header_section in children.results.get('header', []):
+            header.update(header_section)
+        sections = children.results.get('body', [[]])[0]
+        return Chant(sections, metadata=header)
+
+    def visit_body(self, node, children):
+        """Split the words in sections, and compute the volpiano of all notes"""
+        sections = []
+        section = []
+        gabc_clef = None
+        for i, word in enumerate(children):
+            if not isinstance(word, list):
+                raise UnsupportedChant('Unknown element in body')
+            section.append(word)
+            for syllable in word:
+                for element in syllable.elements:
+                    if element.type == 'clef':
+                        gabc_clef = element.gabc
+                    elif element.type == 'neume':
+                        if gabc_clef is None:
+                            raise MissingClef('Missing clef! Cannot process notes without a clef.')
+                        for note in element.notes:
+                            index = volpiano_index(note.position, gabc_clef)
+                            liquescent = note.editorial.get('liquescence', False)
+                            note.volpiano = (VOLPIANO_LIQUESCENTS[index] if liquescent
+                                             else VOLPIANO_NOTES[index])
+                    elif element.type in ['flat', 'natural']:
+                        if gabc_clef is None:
+                            raise MissingClef('Cannot process notes without a clef.')
+                        volpiano_index(element.position, gabc_clef)
+                    elif element.type == 'pausafinalis':
+                        # Sections start at a pausa finalis, except the last one
+                        if i < len(children) - 1:
+                            section.remove(word)
+                            sections.append(section)
+                            section = [word]
+                        else:
+                            sections.append(section)
+                            section = []
+        if sum(syllable.num_leaves for word in section for syllable in word) > 0:
+            sections.append(section)
+        return sections
+
+    def visit_word(self, node, children):
+        return list(children)
+
+    def visit_syllable(self, node, children):
+        elements = children.results.get('music', [[]])[0]
+        syllable = Syllable(elements)
+        if 'text' in children.results:
+            for modifier in children.results.get('text')[0]:
+                syllable = from_chant21(modifier)(syllable)
+        return syllable
+
+    def visit_music(self, node, children):
+        elements = []
+        neume = Element('neume')
+        for element in children:
+            if isinstance(element, Note):
+                neume.notes.append(element)
+                # End neumes on dots
+                for suffix in element.editorial.get('gabcSuffixes', []):
+                    if suffix.get('rhythmicSign') in ['.', '..']:
+                        elements.append(neume)
+                        neume = Element('neume')
+            elif isinstance(element, Element):
+                if len(neume.notes) > 0:
+                    elements.append(neume)
+                    neume = Element('neume')
+                elements.append(element)
+            elif element is NEUME_BOUNDARY:
+                if len(neume.notes) > 0:
+                    elements.append(neume)
+                    neume = Element('neume')
+            else:
+                raise UnsupportedChant('Unknown musical element')
+        if len(neume.notes) > 0:
+            elements.append(neume)
+        return elements
+
+    def visit_pausa_finalis(self, node, children):
+        return Element('pausafinalis', gabc=node.value)
+
+    def visit_pausa_major(self, node, children):
+        return Element('pausamajor', gabc=node.value)
+
+    def visit_pausa_minor(self, node, children):
+        return Element('pausaminor', gabc=node.value)
+
+    def visit_pausa_minima(self, node, children):
+        return Element('pausaminima', gabc=node.value)
+
+    def visit_clef(self, node, children):
+        return Element('clef', gabc=node.value)
+
+    def visit_note(self, node, children):
+        n = Note(children.results.get('position')[0])
+        n.editorial.gabcSuffixes = []
+        prefixes = children.results.get('prefix', [])
+        suffixes = [modifier for suffix in children.results.get('suffix', [[]])
+                    for modifier in suffix]
+        for modify in suffixes + prefixes:
+            n = from_chant21(modify)(n)
+        return n
+
+    def visit_alteration(self, node, children):
+        position = children.results.get('position')[0]
+        alteration = node[1].value
+        if alteration == 'x':
+            return Element('flat', position=position)
+        elif alteration == 'y':
+            return Element('natural', position=position)
+        else:
+            raise AlterationWarning('Encountered a sharp. are not supported and ignored.')
+
+# The visitor methods inherited from chant21 (e.g. for the text of syllables)
+for name, method in vars(VisitorGABC).items():
+    if name.startswith('visit_') and name not in vars(FastVisitorGABC):
+        setattr(FastVisitorGABC, name, from_chant21(method))
+
+_parser = None
+
+def render_gabc_to_html(gabc_path, html_path):
+    """Render a GABC file to an HTML file, as chant21 would.
+
+    Returns:
+        dict: the chant exported to a dictionary, as by ``chant.toObject()``,
+            from which the HTML was rendered
+
+    Raises:
+        UnsupportedChant: if the chant cannot be rendered. The chant should then
+            be converted using chant21 (which also reports parse errors, and 
+            errors raised by the chant21 code used here). Other exceptions
+            are bugs in this renderer.
+    """
+    # Imported here, as generate_corpus imports this module
+    from generate_corpus import ExportedChant
+    global _parser
+    if _parser is None:
+        _parser = ParserGABC(root='file')
+    with open(gabc_path, 'r') as handle:
+        gabc = handle.read()
+    try:
+        tree = _parser.parse(gabc)
+        chant = visit_parse_tree(tree, FastVisitorGABC())
+    except (NoMatch, IncompleteParseError, EmptyParseError, MissingClef,
+            AlterationWarning) as e:
+        raise UnsupportedChant(f'{type(e).__name__}: {e}') from e
+    if not isinstance(chant, Chant):
+        raise UnsupportedChant('Could not convert the parse tree')
+    obj = chant.toObject()
+    toFile(ExportedChant(obj), filepath=html_path)
+    return obj
+
+def validate(corpus_dir, sample_size=None, seed=0):
+    """Render the GABC files of (a sample of) the chants in a corpus and compare
+    the results to the HTML files generated by chant21.
+
+    Returns:
+        dict: the ids of chants that were rendered identically (``identical``),
+            differently (``different``) or could not be rendered (``unsupported``)
+    """
+    html_dir = os.path.join(corpus_dir, 'html')
+    gabc_dir = os.path.join(corpus_dir, 'gabc')
+    ids = sorted(int(fn.split('.')[0]) for fn in os.listdir(html_dir) if fn.endswith('.html'))
+    if sample_size is not None and sample_size < len(ids):
+        ids = sorted(random.Random(seed).sample(ids, sample_size))
+
+    results = { 'identical': [], 'different': [], 'unsupported': [] }
+    tmp_path = os.path.join(corpus_dir, '.fast_html_validation.html')
+    try:
+        for idx in ids:
+            try:
+                render_gabc_to_html(os.path.join(gabc_dir, f'{idx:0>5}.gabc'), tmp_path)
+            except Exception:
+                results['unsupported'].append(idx)
+                continue
+            with open(tmp_path, 'r') as handle:
+                fast_html = handle.read()
+            with open(os.path.join(html_dir, f'{idx:0>5}.html'), 'r') as handle:
+                html = handle.read()
+            results['identical' if fast_html == html else 'different'].append(idx)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return results
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Validate the fast html renderer on a generated corpus.')
+    parser.add_argument('corpus', type=str,
+                        help='the directory of the corpus')
+    parser.add_argument('--sample', type=int, default=None,
+                        help='number of randomly sampled chants to validate (default: all)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed')
+    args = parser.parse_args()
+    results = validate(args.corpus, sample_size=args.sample, seed=args.seed)
+    for key, ids in results.items():
+        print(f'{key}: {len(ids)}')
+    if len(results['different']) > 0:
+        print('Different: ' + ', '.join(str(idx) for idx in results['different']))
+
+if __name__ == '__main__':
+    main()
@@ -6,16 +6,68 @@
 """
 Generate the GregoBase Corpus.
 """
-import pymysql
 import random
 import os
-import pandas as pd
+import re
+import io
+import csv
 import shutil
 import json
 import datetime
 import logging
-from music21 import converter
-import chant21
+import signal
+import multiprocessing
+import hashlib
+import queue
+import threading
+import collections
+import zipfile
+import tarfile
+import mmap
+import time
+import sys
+import contextlib
+import importlib
+import string
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+try:
+    import resource
+except ImportError:
+    resource = None
+
+class LazyModule(object):
+    """A module that is only imported when it is first used. Importing music21
+    and chant21 takes several seconds, and not every stage needs them (nor 
+    pandas or pymysql)."""
+
+    def __init__(self, name, requires=()):
+        """
+        Args:
+            name (str): the name of the module
+            requires (list, optional): names of modules to import first; e.g.
+                chant21, which registers the GABC format with music21.
+        """
+        self._name = name
+        self._requires = requires
+        self._module = None
+
+    def __getattr__(self, attr):
+        if attr in ['_name', '_requires', '_module']:
+            raise AttributeError(attr)
+        if self._module is None:
+            for name in self._requires:
+                importlib.import_module(name)
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+pymysql = LazyModule('pymysql')
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+music21 = LazyModule('music21')
+chant21 = LazyModule('chant21')
+converter = LazyModule('music21.converter', requires=['chant21'])
 
 # GregoBase Corpus version
 __version__ = '0.4'
@@ -26,8 +78,14 @@ ROOT_DIR = os.path.abspath(os.path.join(SRC_DIR, os.path.pardir))
 DIST_DIR = os.path.join(ROOT_DIR, 'dist')
 OUTPUT_DIR = os.path.join(DIST_DIR, f'gregobasecorpus-v{__version__}')
 CSV_DIR = os.path.join(OUTPUT_DIR, 'csv')
+PARQUET_DIR = os.path.join(OUTPUT_DIR, 'parquet')
 GABC_DIR = os.path.join(OUTPUT_DIR, 'gabc')
 HTML_DIR = os.path.join(OUTPUT_DIR, 'html')        
+PACKED_DIR = os.path.join(OUTPUT_DIR, 'packed')
+FEATURES_DIR = os.path.join(OUTPUT_DIR, 'features')
+
+# Stages of the pipeline, in the order in which they are run
+STAGES = ['sql', 'gabc', 'parquet', 'validate', 'html', 'pack', 'readme', 'compress']
 
 # Load database structure
 db_structure_fn = os.path.join(SRC_DIR, 'db_structure.json')
@@ -41,46 +99,986 @@ def random_id(length=5):
     chars = 'abcdefghijklmnopqrstuvwxyz1234567890'
     return ''.join(random.choice(chars) for _ in range(length))
 
-def compress_corpus():
-    """Compress the output directory, and put the archive inside it."""
-    archive_fn = os.path.join(DIST_DIR, f'gregobasecorpus-v{__version__}')
-    shutil.make_archive(archive_fn, 'zip', OUTPUT_DIR)
-    source_fn = f'{archive_fn}.zip'
-    target_fn = os.path.join(OUTPUT_DIR, f'gregobasecorpus-v{__version__}.zip')
-    logging.info(f"Compressing the corpus: '{os.path.relpath(target_fn, start=OUTPUT_DIR)}")
-    os.rename(source_fn, target_fn)
+def package_version(name):
+    """Return the installed version of a package, if possible without importing it"""
+    try:
+        from importlib import metadata
+        return metadata.version(name)
+    except ImportError:
+        return getattr(importlib.import_module(name), '__version__', None)
+    except Exception:
+        return None
+
+def set_output_dir(output_dir):
+    """Change the output directory of the corpus (and the `csv`, `parquet`, 
+    `gabc`, `html`, `packed` and `features` directories inside it). The archive is
+    temporarily stored in the parent directory."""
+    global DIST_DIR, OUTPUT_DIR, CSV_DIR, PARQUET_DIR, GABC_DIR, HTML_DIR, PACKED_DIR
+    global FEATURES_DIR
+    OUTPUT_DIR = os.path.abspath(output_dir)
+    DIST_DIR = os.path.dirname(OUTPUT_DIR)
+    CSV_DIR = os.path.join(OUTPUT_DIR, 'csv')
+    PARQUET_DIR = os.path.join(OUTPUT_DIR, 'parquet')
+    GABC_DIR = os.path.join(OUTPUT_DIR, 'gabc')
+    HTML_DIR = os.path.join(OUTPUT_DIR, 'html')
+    PACKED_DIR = os.path.join(OUTPUT_DIR, 'packed')
+    FEATURES_DIR = os.path.join(OUTPUT_DIR, 'features')
+
+class CorpusArchive(object):
+    """A zip archive of the corpus that is built while the corpus is generated.
+
+    Files are added as soon as they are written, and are compressed and 
+    appended to the archive by a writer thread (zlib releases the GIL, so this
+    runs in parallel with the rest of the build), in the order in which they 
+    were added. The archive is a standard zip file, written using the public 
+    `zipfile` API (which switches to zip64 for large files and archives). Until
+    it is closed, it is stored in the `dist` directory, after which it is 
+    checked and moved into the output directory.
+
+    Files are compressed one at a time, on a single core: the public API cannot
+    append data that was compressed elsewhere. Files that are only added when 
+    the archive is closed (e.g. packed shards, or files reused by an incremental
+    build) are therefore compressed one after another at the end of the build.
+    """
+
+    compress_level = 6
+    """int: zlib compression level"""
+
+    max_pending = 1000
+    """int: maximum number of added files waiting to be compressed"""
+
+    excluded = ['manifest.json', 'validation.csv', 'performance.json', 
+                'performance-chants.csv']
+    """list: files in the output directory that are used to build the corpus, 
+    and are not archived (the build manifest, the validation report and the
+    performance report)"""
+
+    def __init__(self):
+        name = f'gregobasecorpus-v{__version__}'
+        self.filepath = os.path.join(OUTPUT_DIR, f'{name}.zip')
+        self.tar_zst_filepath = os.path.join(OUTPUT_DIR, f'{name}.tar.zst')
+        self.tmp_filepath = os.path.join(DIST_DIR, f'{name}.zip')
+        for filepath in [self.filepath, self.tar_zst_filepath]:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+        self.zip = zipfile.ZipFile(self.tmp_filepath, 'w', zipfile.ZIP_DEFLATED,
+                                   compresslevel=self.compress_level)
+        self.pending = queue.Queue(maxsize=self.max_pending)
+        self.added = set()
+        self.lock = threading.Lock()
+        self.error = None
+        self.writer = threading.Thread(target=self.write_pending, daemon=True)
+        self.writer.start()
+
+    def add(self, path):
+        """Add a file from the output directory to the archive. This method
+        is thread-safe."""
+        arcname = os.path.relpath(path, start=OUTPUT_DIR)
+        if arcname in self.excluded:
+            return
+        with self.lock:
+            if arcname in self.added:
+                return
+            self.added.add(arcname)
+
+            # Add entries for all parent directories, like make_archive does
+            parts = arcname.split(os.sep)
+            for i in range(1, len(parts)):
+                self.add_directory(os.sep.join(parts[:i]))
+            self.pending.put((path, arcname))
+
+    def add_directory(self, arcname):
+        """Add an entry for a directory (relative to the output directory)"""
+        if arcname not in self.added:
+            self.added.add(arcname)
+            self.pending.put((os.path.join(OUTPUT_DIR, arcname), arcname))
+
+    def write_pending(self):
+        """Compress and append all added files to the archive, in the order in 
+        which they were added, until None is added. Runs in the writer thread."""
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue
+            path, arcname = item
+            try:
+                info = zipfile.ZipInfo.from_file(path, arcname)
+                if info.is_dir():
+                    self.zip.write(path, arcname)
+                    continue
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with open(path, 'rb') as source, self.zip.open(info, 'w') as target:
+                    shutil.copyfileobj(source, target, 2**20)
+            except Exception as e:
+                self.error = e
+
+    def write_tar_zst(self, filepath):
+        """Write a zstandard-compressed tarball of the output directory. This
+        requires the `zstandard` package."""
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception(
+                'Writing a .tar.zst archive requires the zstandard package. '
+                'You can install it using `pip install zstandard`.')
+        compressor = zstandard.ZstdCompressor(level=10, threads=-1)
+        with open(filepath, 'wb') as handle:
+            with compressor.stream_writer(handle) as stream:
+                with tarfile.open(fileobj=stream, mode='w|') as tar:
+                    for name in sorted(os.listdir(OUTPUT_DIR)):
+                        if name in self.excluded:
+                            continue
+                        tar.add(os.path.join(OUTPUT_DIR, name), arcname=name)
+
+    def close(self, tar_zst=False):
+        """Add all remaining files in the output directory, finish the archive
+        and move it into the output directory.
+
+        Args:
+            tar_zst (bool, optional): also write a `.tar.zst` archive. 
+                Defaults to False.
+        """
+        for dirpath, dirnames, filenames in os.walk(OUTPUT_DIR):
+            dirnames.sort()
+            if dirpath != OUTPUT_DIR:
+                with self.lock:
+                    self.add_directory(os.path.relpath(dirpath, start=OUTPUT_DIR))
+            for filename in sorted(filenames):
+                if dirpath == OUTPUT_DIR and filename in self.excluded:
+                    continue
+                self.add(os.path.join(dirpath, filename))
+        self.pending.put(None)
+        self.writer.join()
+        self.zip.close()
+        if self.error is not None:
+            raise Exception(f'Could not write the archive: {self.error}')
+        with zipfile.ZipFile(self.tmp_filepath, 'r') as archive:
+            corrupt = archive.testzip()
+        if corrupt is not None:
+            raise Exception(f'The archive is corrupt: could not read {corrupt}')
+        
+        if tar_zst:
+            tmp_filepath = os.path.join(DIST_DIR, os.path.basename(self.tar_zst_filepath))
+            self.write_tar_zst(tmp_filepath)
+            os.rename(tmp_filepath, self.tar_zst_filepath)
+            record_written(self.tar_zst_filepath)
+        os.rename(self.tmp_filepath, self.filepath)
+        record_written(self.filepath)
+
+def compress_corpus(archive=None, tar_zst=False):
+    """Compress the output directory, and put the archive inside it.
+    
+    Args:
+        archive (CorpusArchive, optional): an archive to which files have already
+            been added during the generation of the corpus. All other files are
+            added now. If None, a new archive is created.
+        tar_zst (bool, optional): also write a `.tar.zst` archive. Defaults to False.
+    """
+    if archive is None:
+        archive = CorpusArchive()
+    logging.info(f"Compressing the corpus: '{os.path.relpath(archive.filepath, start=OUTPUT_DIR)}")
+    archive.close(tar_zst=tar_zst)
+
+class Manifest(object):
+    """Keeps track of the files generated for every chant, so that a rebuild 
+    only has to regenerate chants that are new or have changed.
+
+    For every chant, the manifest stores a hash of its GABC file (that is, of the
+    GABC body and all header metadata), and a hash of the HTML file rendered from
+    it, or the error message if it could not be rendered. HTML files are 
+    invalidated when the GABC file changes, or when the chant21 version changes.
+    Errors that do not only depend on the chant (timeouts, or a validator verdict)
+    are stored with the options that caused them, and are invalidated when
+    those options change.
+    """
+
+    def __init__(self, filepath=None):
+        """
+        Args:
+            filepath (str, optional): path to the manifest file. If it exists, 
+                the manifest is loaded from it. If None, the manifest is only
+                kept in memory.
+        """
+        self.filepath = filepath
+        self.chant21_version = package_version('chant21')
+        self.chants = {}
+        if filepath is not None and os.path.exists(filepath):
+            with open(filepath, 'r') as handle:
+                data = json.load(handle)
+            self.chants = { int(idx): entry for idx, entry in data['chants'].items() }
+            if data.get('chant21_version') != self.chant21_version:
+                logging.info('The chant21 version changed: all HTML files will be regenerated')
+                for entry in self.chants.values():
+                    entry['html'] = None
+                    entry.pop('html_error', None)
+                    entry.pop('html_error_options', None)
+
+    @staticmethod
+    def hash(contents):
+        """Return the hash of a string"""
+        return hashlib.sha1(contents.encode('utf-8')).hexdigest()
+
+    def update_gabc(self, idx, contents):
+        """Register the GABC contents of a chant.
+        
+        Returns:
+            bool: True if the chant is new or has changed, False otherwise
+        """
+        gabc_hash = self.hash(contents)
+        entry = self.chants.get(idx)
+        if entry is not None and entry['gabc'] == gabc_hash:
+            return False
+        self.chants[idx] = { 'gabc': gabc_hash, 'html': None }
+        return True
+
+    def update_html(self, idx, contents=None, error=None, options=None):
+        """Register the HTML contents of a chant, or the error message if
+        it could not be converted.
+
+        Args:
+            options (dict, optional): the options that caused the error, if it
+                does not only depend on the chant (see `has_html`)
+        """
+        entry = self.chants.setdefault(idx, { 'gabc': None })
+        entry['html'] = None if contents is None else self.hash(contents)
+        entry.pop('html_error', None)
+        entry.pop('html_error_options', None)
+        if error is not None:
+            entry['html_error'] = error
+            if options is not None:
+                entry['html_error_options'] = options
+
+    def html_error(self, idx):
+        """Return the error message of the last HTML conversion of a chant, if any"""
+        return self.chants.get(idx, {}).get('html_error')
+
+    def has_html(self, idx, options=None):
+        """Whether the HTML of the current version of a chant has been generated,
+        or it could not be converted. An error that was stored with options only
+        counts if all those options have the same value in `options`.
+
+        Args:
+            options (dict, optional): the options of the current build
+        """
+        entry = self.chants.get(idx, {})
+        if entry.get('html') is not None:
+            return True
+        elif 'html_error' not in entry:
+            return False
+        if options is None:
+            options = {}
+        error_options = entry.get('html_error_options', {})
+        return all(options.get(key) == value for key, value in error_options.items())
+
+    def remove(self, idx):
+        """Remove a chant from the manifest"""
+        del self.chants[idx]
+
+    def save(self):
+        """Write the manifest to its file (if any)"""
+        if self.filepath is None:
+            return
+        data = {
+            'version': __version__,
+            'chant21_version': self.chant21_version,
+            'chants': { str(idx): entry for idx, entry in sorted(self.chants.items()) }
+        }
+        with open(self.filepath, 'w') as handle:
+            json.dump(data, handle, indent=1)
+        record_written(self.filepath)
+
+class ParseCache(object):
+    """A persistent cache of parsed chants.
+
+    Parsing GABC files with chant21 is slow, and music21's own cache is not used
+    (as GABC files are parsed with ``forceSource=True``). This cache stores the
+    parsed chants (frozen music21 streams) on disk. Entries are keyed by a hash
+    of the GABC file, the chant21 and music21 versions and the format of the 
+    cache, so that stale entries are never used after an update of either. The
+    size of the cache is bounded: when it grows too large, the least recently 
+    used entries are removed. The cache can also be used outside the build, e.g.:
+
+    ```python
+    cache = ParseCache()
+    chant = cache.parse('dist/gregobasecorpus-v0.4/gabc/00001.gabc')
+    ```
+    """
+
+    extension = '.pickle'
+
+    format_version = 2
+    """int: the version of the format of the cache entries, which is part of
+    their keys. Increase it whenever the format changes, so that old entries 
+    are no longer used."""
+
+    slots = ('_style', '_editorial')
+    """tuple: slots of music21 objects that are not pickled by some music21
+    versions (e.g. 6.x), as ``Music21Object.__getstate__`` only stores the 
+    ``__dict__``. They are stored separately under ``stored_slots``."""
+
+    stored_slots = '_parseCacheSlots'
+
+    def __init__(self, directory=None, max_size=2 * 2**30):
+        """
+        Args:
+            directory (str, optional): the cache directory. Defaults to 
+                ``dist/parse-cache``, which is not cleared between builds.
+            max_size (int, optional): the maximum size of the cache in bytes.
+                Defaults to 2GB.
+        """
+        if directory is None:
+            directory = os.path.join(DIST_DIR, 'parse-cache')
+        self.directory = directory
+        self.max_size = max_size
+        self.versions = (f"format={self.format_version};"
+                         f"chant21={getattr(chant21, '__version__', None)};"
+                         f"music21={getattr(music21, '__version__', None)}")
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def key(self, contents):
+        """Return the cache key of the contents of a GABC file"""
+        return Manifest.hash(f'{self.versions}\n{contents}')
+
+    def path(self, key):
+        """Return the path of the cache entry with a given key"""
+        return os.path.join(self.directory, key + self.extension)
+
+    def get(self, key):
+        """Return the cached chant with a given key, or None if it is not cached"""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as handle:
+                data = handle.read()
+        except FileNotFoundError:
+            return None
+        try:
+            thawer = music21.freezeThaw.StreamThawer()
+            thawer.openStr(data)
+        except Exception as e:
+            logging.warning(f'Removing corrupt parse cache entry {key}: {e}')
+            os.remove(path)
+            return None
+        # Mark the entry as recently used
+        os.utime(path)
+        self.restore_slots(thawer.stream)
+        return thawer.stream
+
+    def store_slots(self, chant):
+        """Store the slots of all objects in a chant in their ``__dict__``, so
+        that they are pickled"""
+        for obj in chant.recurse(includeSelf=True):
+            values = { slot: getattr(obj, slot, None) for slot in self.slots }
+            values = { slot: value for slot, value in values.items() if value is not None }
+            if len(values) > 0:
+                obj.__dict__[self.stored_slots] = values
+
+    def restore_slots(self, chant):
+        """Restore the slots of all objects in a chant stored by `store_slots`"""
+        for obj in chant.recurse(includeSelf=True):
+            values = obj.__dict__.pop(self.stored_slots, {})
+            for slot in self.slots:
+                setattr(obj, slot, values.get(slot))
+
+    def put(self, key, chant):
+        """Store a parsed chant in the cache. Chants that cannot be frozen
+        are not cached."""
+        try:
+            self.store_slots(chant)
+            freezer = music21.freezeThaw.StreamFreezer(chant)
+            data = freezer.writeStr(fmt='pickle')
+        except Exception as e:
+            logging.warning(f'Could not add chant to the parse cache: {e}')
+            return
+        finally:
+            self.restore_slots(chant)
+        # Write to a temporary file first, as worker processes share the cache
+        tmp_path = self.path(f'{key}-{random_id()}.tmp')
+        with open(tmp_path, 'wb') as handle:
+            handle.write(data)
+        os.replace(tmp_path, self.path(key))
+
+    def parse(self, gabc_path):
+        """Parse a GABC file, using the cache if possible.
+
+        Returns:
+            tuple: the parsed chant and a boolean indicating whether it was 
+                found in the cache
+        """
+        with open(gabc_path, 'r') as handle:
+            key = self.key(handle.read())
+        chant = self.get(key)
+        if chant is not None:
+            return chant, True
+        chant = converter.parse(gabc_path,
+            format='gabc', forceSource=True, storePickle=False)
+        self.put(key, chant)
+        return chant, False
+
+    def evict(self):
+        """Remove the least recently used entries until the cache is smaller 
+        than its maximum size."""
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(self.extension):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+
+        num_removed = 0
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            # The cache can be shared by several builds (e.g. shards)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total_size -= size
+            num_removed += 1
+        if num_removed > 0:
+            logging.info(f'Removed {num_removed} entries from the parse cache')
+
+class BuildMetrics(object):
+    """Collects performance metrics of a build of the corpus.
+
+    For every stage of the pipeline this records the wall time, the cpu time
+    (including child processes), the maximum resident set size (rss) so far and 
+    the number and size of the files written (as reported by `record_written`).
+    For individual chants, it records how long writing the GABC file, parsing it
+    with music21 and exporting it to HTML took, and the sizes of the GABC and HTML
+    files.
+    """
+
+    current = None
+    """BuildMetrics: the metrics of the build of which a stage is running"""
+
+    def __init__(self):
+        self.stages = []
+        self.chants = collections.defaultdict(dict)
+        self.written = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def cpu_time():
+        """Return the cpu time used by this process and its (finished) children"""
+        times = os.times()
+        return times.user + times.system + times.children_user + times.children_system
+
+    @staticmethod
+    def max_rss():
+        """Return the maximum rss in bytes of this process or any of its 
+        (finished) children since the start of the build, or None if this cannot
+        be determined. (This is not reset between stages.)"""
+        if resource is None:
+            return None
+        rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        # Linux reports kilobytes, MacOS bytes
+        return rss if sys.platform == 'darwin' else rss * 1024
+
+    def record_file(self, path):
+        """Count a file written during the current stage. This method is 
+        thread-safe."""
+        num_bytes = os.path.getsize(path)
+        with self.lock:
+            if self.written is not None:
+                self.written[0] += 1
+                self.written[1] += num_bytes
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Context manager that measures a stage of the pipeline"""
+        self.written = [0, 0]
+        BuildMetrics.current = self
+        wall_start = time.perf_counter()
+        cpu_start = self.cpu_time()
+        try:
+            yield
+        finally:
+            BuildMetrics.current = None
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = self.cpu_time() - cpu_start
+        files_written, bytes_written = self.written
+        self.written = None
+        self.stages.append({
+            'stage': name,
+            'wall_seconds': wall_time,
+            'cpu_seconds': cpu_time,
+            'max_rss_so_far_bytes': self.max_rss(),
+            'files_written': files_written,
+            'bytes_written': bytes_written,
+        })
+        logging.info(f"Stage '{name}' took {wall_time:.1f}s (cpu time {cpu_time:.1f}s)")
+
+    def record_chant(self, idx, **metrics):
+        """Record metrics (e.g. ``parse_seconds=1.2``) for a single chant"""
+        self.chants[idx].update(metrics)
+
+    def merge_report(self, directory, shard=None):
+        """Add the metrics in the report of another build (e.g. a shard) to these
+        metrics. Its stages are labeled with the name of the shard."""
+        with open(os.path.join(directory, 'performance.json'), 'r') as handle:
+            report = json.load(handle)
+        for stage in report['stages']:
+            self.stages.append(dict(stage, shard=shard))
+        chants_fn = os.path.join(directory, 'performance-chants.csv')
+        if os.path.exists(chants_fn):
+            chants = pd.read_csv(chants_fn, index_col=0)
+            chants = chants.drop(columns='total_html_seconds', errors='ignore')
+            for idx, metrics in chants.to_dict(orient='index').items():
+                self.record_chant(idx, **{ key: value for key, value in metrics.items() 
+                                           if not pd.isnull(value) })
+
+    def write_report(self, directory, top=25):
+        """Write the metrics to `performance.json` (stages and a summary of the
+        slowest and largest chants) and `performance-chants.csv` (all chants)"""
+        chants = pd.DataFrame.from_dict(self.chants, orient='index')
+        chants.index.name = 'chant_id'
+        report = { 'version': __version__, 'stages': self.stages }
+        if len(chants) > 0:
+            chants = chants.sort_index()
+            html_columns = [col for col in ['fast_html_seconds', 'parse_seconds', 'html_seconds'] 
+                            if col in chants]
+            if len(html_columns) > 0:
+                chants['total_html_seconds'] = chants[html_columns].sum(axis=1, min_count=1)
+                slowest = chants.nlargest(top, 'total_html_seconds')
+                report['slowest_chants'] = json.loads(slowest.to_json(orient='index'))
+            if 'gabc_bytes' in chants:
+                largest = chants.nlargest(top, 'gabc_bytes')
+                report['largest_chants'] = json.loads(largest.to_json(orient='index'))
+            chants.to_csv(os.path.join(directory, 'performance-chants.csv'))
+
+        with open(os.path.join(directory, 'performance.json'), 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+def record_written(path):
+    """Count a file written to the output directory in the metrics of the 
+    stage that is running (if any)"""
+    if BuildMetrics.current is not None:
+        BuildMetrics.current.record_file(path)
+
+class CorpusTables(object):
+    """The tables of the corpus, loaded from the CSV files.
+
+    Every table is loaded only once (when it is first accessed) and can be 
+    shared by all stages of the pipeline. The tables are available as attributes,
+    e.g. ``tables.chants``. Columns get the dtypes declared in the database 
+    structure: a ``pandas_dtype`` if specified (e.g. categoricals for columns with
+    few distinct values and compact integers for ids), strings for ``str`` 
+    columns, and inferred dtypes otherwise.
+    """
+
+    def __init__(self, csv_dir=None, db_structure=DB_STRUCTURE, shard=None):
+        """
+        Args:
+            csv_dir (str, optional): the CSV directory. Defaults to the CSV 
+                directory in the output directory.
+            db_structure (dict, optional): the database structure
+            shard (tuple, optional): a tuple ``(shard, num_shards)``. If passed,
+                the chants table only contains the chants in that shard: those 
+                with ``id % num_shards == shard - 1``. Defaults to None.
+        """
+        if csv_dir is None:
+            csv_dir = CSV_DIR
+        if not os.path.exists(csv_dir):
+            raise Exception('CSV directory not found')
+        self.csv_dir = csv_dir
+        self.db_structure = db_structure
+        self.shard = shard
+        self.tables = {}
+
+    def __getattr__(self, name):
+        if name != 'db_structure' and name in self.db_structure:
+            if name not in self.tables:
+                self.tables[name] = self.load(name)
+            return self.tables[name]
+        raise AttributeError(name)
+
+    def dtypes(self, table_name):
+        """Return the pandas dtypes of all columns in a table"""
+        dtypes = {}
+        for column in self.db_structure[table_name]:
+            if 'pandas_dtype' in column:
+                dtypes[column['name']] = column['pandas_dtype']
+            elif column['dtype'] == 'str':
+                dtypes[column['name']] = str
+        return dtypes
+
+    def select_shard(self, table_name, table):
+        """Return the rows of a table that belong to the shard (if any). Only
+        the chants table is sharded."""
+        if self.shard is None or table_name != 'chants':
+            return table
+        shard, num_shards = self.shard
+        return table[table.index % num_shards == shard - 1]
+
+    def load(self, table_name, usecols=None):
+        """Load a table from its CSV file
+        
+        Args:
+            table_name (str): name of the table
+            usecols (list, optional): if passed, only these columns (and the 
+                index) are read. Defaults to None.
+        """
+        filepath = os.path.join(self.csv_dir, f'{table_name}.csv')
+        dtypes = self.dtypes(table_name)
+        if usecols is not None:
+            index_name = self.db_structure[table_name][0]['name']
+            usecols = [index_name] + [name for name in usecols if name != index_name]
+            dtypes = { name: dtype for name, dtype in dtypes.items() if name in usecols }
+        table = pd.read_csv(filepath, index_col=0, dtype=dtypes, usecols=usecols)
+        return self.select_shard(table_name, table)
+
+    def columns(self, table_name, names=()):
+        """Return the index and only some columns of a table. Unless the whole
+        table has already been loaded, only these columns are read from the CSV
+        file, so that e.g. the metadata of all chants can be used without loading
+        all GABC code. The result is loaded only once.
+
+        Args:
+            table_name (str): name of the table
+            names (list, optional): the columns. Defaults to no columns.
+        """
+        if table_name in self.tables:
+            return self.tables[table_name][list(names)]
+        key = (table_name, tuple(names))
+        if key not in self.tables:
+            self.tables[key] = self.load(table_name, usecols=list(names))
+        return self.tables[key]
+
+    def read_chunks(self, table_name, chunk_size, filepath=None):
+        """Read a table from its CSV file in chunks, without loading it as a whole.
+
+        Args:
+            filepath (str, optional): read the table from this file instead of
+                the CSV directory (e.g. a sorted copy)
+
+        Yields:
+            pd.DataFrame: chunks of (at most) `chunk_size` rows, in file order
+        """
+        if filepath is None:
+            filepath = os.path.join(self.csv_dir, f'{table_name}.csv')
+        chunks = pd.read_csv(filepath, index_col=0, dtype=self.dtypes(table_name),
+            chunksize=chunk_size)
+        return (self.select_shard(table_name, chunk) for chunk in chunks)
+
+    def is_sorted(self, table_name, chunk_size):
+        """Whether a table is sorted by its index. Only the index is read."""
+        filepath = os.path.join(self.csv_dir, f'{table_name}.csv')
+        last_idx = None
+        for chunk in pd.read_csv(filepath, usecols=[0], chunksize=chunk_size):
+            index = chunk.iloc[:, 0]
+            if len(index) == 0:
+                continue
+            if (not index.is_monotonic_increasing
+                or (last_idx is not None and index.iloc[0] < last_idx)):
+                return False
+            last_idx = index.iloc[-1]
+        return True
+
+    def read_sorted_chunks(self, table_name, chunk_size):
+        """Read a table from its CSV file in chunks sorted by index, without 
+        loading it as a whole. If the table is not sorted, it is sorted using an
+        external merge sort: chunks of `chunk_size` rows are sorted and written
+        to temporary files, which are then merged. Rows with the same index keep
+        their order in the file.
+
+        Yields:
+            pd.DataFrame: chunks of rows, sorted by index
+        """
+        if self.is_sorted(table_name, chunk_size):
+            yield from self.read_chunks(table_name, chunk_size)
+            return
+
+        logging.info(f'Sorting table {table_name} by {self.db_structure[table_name][0]["name"]}...')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            runs = []
+            for i, chunk in enumerate(self.read_chunks(table_name, chunk_size)):
+                run_fn = os.path.join(tmp_dir, f'{table_name}-{i}.csv')
+                chunk.sort_index(kind='mergesort').to_csv(run_fn)
+                runs.append(run_fn)
+
+            # Merge the runs, reading a block of every run at a time
+            block_size = max(1, chunk_size // len(runs))
+            readers = [self.read_chunks(table_name, block_size, filepath=run_fn)
+                       for run_fn in runs]
+            def read_block(run):
+                return next((block for block in readers[run] if len(block) > 0), None)
+
+            blocks = [read_block(run) for run in range(len(runs))]
+            while any(block is not None for block in blocks):
+                # All rows up to the smallest last index of any block can be merged
+                until = min(block.index[-1] for block in blocks if block is not None)
+                merged = []
+                for run, block in enumerate(blocks):
+                    if block is None:
+                        continue
+                    # Read ahead until all rows of the run up to `until` are in 
+                    # the block, so that rows with the same index stay in order
+                    while block.index[-1] == until:
+                        next_block = read_block(run)
+                        if next_block is None:
+                            break
+                        block = pd.concat([block, next_block])
+                    position = block.index.searchsorted(until, side='right')
+                    merged.append(block.iloc[:position])
+                    blocks[run] = block.iloc[position:] if position < len(block) else read_block(run)
+                # A stable sort, so rows from earlier runs come first
+                yield pd.concat(merged).sort_index(kind='mergesort')
+
+class SortedTableReader(object):
+    """Reads a table in chunks sorted by its index (e.g. ``chant_sources``, 
+    sorted by chant id), so that it can be merged with another sorted table.
+    Tables that are not sorted are first sorted (see 
+    `CorpusTables.read_sorted_chunks`)."""
+
+    def __init__(self, tables, table_name, chunk_size):
+        """
+        Args:
+            tables (CorpusTables): the corpus tables
+            table_name (str): name of the table
+            chunk_size (int): number of rows read at a time
+        """
+        self.table_name = table_name
+        self.chunks = tables.read_sorted_chunks(table_name, chunk_size)
+        self.buffer = []
+        self.last_idx = None
+        self.exhausted = False
+
+    def read_until(self, idx):
+        """Return all rows with an index up to (and including) `idx` that have
+        not been returned before, in file order."""
+        while not self.exhausted and (self.last_idx is None or self.last_idx <= idx):
+            try:
+                chunk = next(self.chunks)
+            except StopIteration:
+                self.exhausted = True
+                break
+            if len(chunk) == 0:
+                continue
+            self.buffer.append(chunk)
+            self.last_idx = chunk.index[-1]
+        if len(self.buffer) == 0:
+            return None
+        rows = pd.concat(self.buffer)
+        position = rows.index.searchsorted(idx, side='right')
+        self.buffer = [rows.iloc[position:]] if position < len(rows) else []
+        return rows.iloc[:position]
 
 ##
 
+class SQLDumpReader(object):
+    """Streaming reader for MySQL dumps (as produced by mysqldump or phpMyAdmin)
+    that yields the rows of all ``INSERT INTO ... VALUES`` statements, without
+    ever loading the dump in a database or in memory as a whole."""
+
+    chunk_size = 2 ** 20
+    """int: number of characters read from the dump at a time"""
+
+    token_pattern = re.compile(r"""
+          '(?P<string>[^'\\]*(?:(?:\\.|'')[^'\\]*)*)'
+        | "(?P<dstring>[^"\\]*(?:(?:\\.|"")[^"\\]*)*)"
+        | `(?P<name>[^`]*(?:``[^`]*)*)`
+        | (?P<comment>--[^\n]*(?:\n|\Z)|\#[^\n]*(?:\n|\Z)|/\*.*?(?:\*/|\Z))
+        | (?P<space>\s+)
+        | (?P<punct>[(),;])
+        | (?P<word>[^\s'"`(),;]+)
+        """, re.VERBOSE | re.DOTALL)
+    """re.Pattern: pattern matching a single sql token"""
+
+    escape_pattern = re.compile(r"\\(.)|''|\"\"", re.DOTALL)
+    """re.Pattern: pattern matching escape sequences in sql strings"""
+
+    escapes = {
+        '0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a',
+        '%': '\\%', '_': '\\_'
+    }
+    """dict: special escape sequences in MySQL strings"""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+
+    @classmethod
+    def unescape(cls, string):
+        """Resolve all escape sequences in a MySQL string literal"""
+        def replace(match):
+            if match.group(1) is None:
+                return match.group(0)[0]
+            char = match.group(1)
+            return cls.escapes.get(char, char)
+        return cls.escape_pattern.sub(replace, string)
+
+    def tokens(self):
+        """Iterate over all tokens in the dump, skipping whitespace and comments.
+        
+        Yields:
+            tuple: a ``(kind, value)`` pair, where kind is one of ``string``,
+                ``name``, ``punct`` or ``word``. Strings are unescaped.
+        """
+        with open(self.filepath, 'r', encoding='utf-8') as handle:
+            buffer = ''
+            pos = 0
+            eof = False
+            while True:
+                match = self.token_pattern.match(buffer, pos)
+                # Tokens touching the end of the buffer may be incomplete (this 
+                # includes comments that are not yet closed). So are strings 
+                # directly followed by a quote: that is an escaped quote '' of a
+                # string that continues beyond the buffer
+                incomplete = (match is None 
+                    or match.end() == len(buffer)
+                    or buffer[match.end()] == buffer[match.start()] in '\'"`')
+                if not eof and incomplete:
+                    chunk = handle.read(self.chunk_size)
+                    buffer = buffer[pos:] + chunk
+                    pos = 0
+                    eof = chunk == ''
+                    continue
+                if match is None:
+                    if pos < len(buffer):
+                        raise Exception(f'Cannot parse sql dump near: {buffer[pos:pos+50]}')
+                    return
+                pos = match.end()
+                kind = match.lastgroup
+                if kind in ['space', 'comment']:
+                    continue
+                elif kind in ['string', 'dstring']:
+                    yield 'string', self.unescape(match.group(kind))
+                elif kind == 'name':
+                    yield 'name', match.group(kind).replace('``', '`')
+                else:
+                    yield kind, match.group(kind)
+
+    def rows(self):
+        """Iterate over all rows inserted by the dump.
+        
+        Yields:
+            tuple: a ``(table, values)`` pair with the name of the table and a 
+                list of values. Strings are returned as ``str``, numbers as the 
+                literal found in the dump, and NULL as ``None``.
+        """
+        tokens = self.tokens()
+        for kind, value in tokens:
+            if kind != 'word' or value.upper() not in ['INSERT', 'REPLACE']:
+                continue
+
+            # Find the table name; skip modifiers like IGNORE and INTO
+            table = None
+            for kind, value in tokens:
+                if kind == 'name' or (kind == 'word' and value.upper() not in 
+                    ['INTO', 'IGNORE', 'LOW_PRIORITY', 'DELAYED', 'HIGH_PRIORITY']):
+                    table = value.split('.')[-1]
+                    break
+
+            # Skip an optional column list; those follow the table order anyway
+            depth = 0
+            for kind, value in tokens:
+                if kind == 'punct' and value == '(':
+                    depth += 1
+                elif kind == 'punct' and value == ')':
+                    depth -= 1
+                elif depth == 0 and kind == 'word' and value.upper() in ['VALUES', 'VALUE']:
+                    break
+
+            # Parse all value tuples
+            values = None
+            for kind, value in tokens:
+                if kind == 'punct':
+                    if value == '(':
+                        values = []
+                    elif value == ')':
+                        yield table, values
+                        values = None
+                    elif value == ';':
+                        break
+                elif values is not None:
+                    if kind == 'word' and value.upper() == 'NULL':
+                        values.append(None)
+                    else:
+                        values.append(value)
+
+class TableWriter(object):
+    """Writes the final CSV file of a table, chunk by chunk"""
+
+    def __init__(self, table_name, db_structure=DB_STRUCTURE, archive=None):
+        """
+        Args:
+            table_name (str): name of the table
+            db_structure (dict, optional): the database structure
+            archive (CorpusArchive, optional): archive to which the CSV file is 
+                added once it is written
+        """
+        self.table_name = table_name
+        self.names = [col['name'] for col in db_structure[table_name]]
+        self.archive = archive
+        self.filepath = os.path.join(CSV_DIR, f'{table_name}.csv')
+        self.handle = open(self.filepath, 'w', newline='')
+        self.header = True
+
+    def write(self, chunk):
+        """Append a chunk of rows (a DataFrame indexed by the first column)"""
+        chunk.to_csv(self.handle, header=self.header)
+        self.header = False
+
+    def close(self):
+        """Close the file; tables without rows only get a header"""
+        if self.header:
+            empty = pd.DataFrame(columns=self.names).set_index(self.names[0])
+            empty.to_csv(self.handle)
+        self.handle.close()
+        record_written(self.filepath)
+        if self.archive is not None:
+            self.archive.add(self.filepath)
+
 class SQLConverter(object):
 
     field_delimiter = '@'
     """str: delimiter used in the temporary csv file"""
+
+    engines = ['mysql', 'native']
+    """list: available engines for reading the sql dump"""
+
+    pool_size = 3
+    """int: number of database connections used to export tables concurrently"""
+
+    chunk_size = 2000
+    """int: number of rows post-processed at a time"""
     
     def __init__(self, db_host='localhost', db_user='root', db_pass='',
-        db_prefix='gregobase_', db_structure=DB_STRUCTURE):
+        db_prefix='gregobase_', db_structure=DB_STRUCTURE, engine='mysql',
+        archive=None):
         
+        if engine not in self.engines:
+            raise ValueError(f'Unknown engine: {engine}')
+        self.engine = engine
+        self.archive = archive
+
         # Initialize database
         self.db_host = db_host
         self.db_user = db_user
         self.db_pass = db_pass
         self.db_prefix = db_prefix
         self.db_name = f'tmp_db_gregocorpus_{random_id()}'
-        try:
-            self.db = pymysql.connect(host=db_host, user=db_user, password=db_pass)
-        except:
-            raise Exception(
-                'Could not connect to the mysql database. Are you sure mysql '
-                'is running? You can check this by running `mysql -uroot` '
-                'which opens mysql (close it using `exit`). If mysql is not '
-                'running, start it using `mysql.server start`.'
-            )
-
-        self.cursor = self.db.cursor()
+        if engine == 'mysql':
+            try:
+                self.db = pymysql.connect(host=db_host, user=db_user, password=db_pass)
+            except:
+                raise Exception(
+                    'Could not connect to the mysql database. Are you sure mysql '
+                    'is running? You can check this by running `mysql -uroot` '
+                    'which opens mysql (close it using `exit`). If mysql is not '
+                    'running, start it using `mysql.server start`. Alternatively, '
+                    'use the native engine which does not require mysql.'
+                )
+            self.cursor = self.db.cursor()
 
         # Set up directories
         self.tmp_dir = os.path.join(OUTPUT_DIR, 'tmp')
-        for dir_path in [CSV_DIR, self.tmp_dir]:
+        dir_paths = [CSV_DIR, self.tmp_dir] if engine == 'mysql' else [CSV_DIR]
+        for dir_path in dir_paths:
             if not os.path.exists(dir_path):
                 logging.info(f"Creating directory: '{os.path.relpath(dir_path, start=OUTPUT_DIR)}'")
                 os.makedirs(dir_path)
@@ -102,58 +1100,165 @@ class SQLConverter(object):
         command = f'{mysql} {self.db_name} < {filepath}'
         os.system(command)
 
+    def read_table(self, table_name, filepath_or_buffer, **kwargs):
+        """Read an intermediate csv file of a table using the column names and 
+        dtypes from the database structure.
+
+        Args:
+            table_name (str): name of the table
+            filepath_or_buffer: the intermediate csv file
+            **kwargs: further keyword arguments passed to ``pd.read_csv``
+
+        Returns:
+            iterator: chunks (DataFrames) of at most `chunk_size` rows
+        """
+        columns = self.db_structure[table_name]
+        dtype_map = { 'str': str, 'int': int }
+        dtypes = { col['name']: dtype_map[col['dtype']] for col in columns }
+        names = [ col['name'] for col in columns ]
+        return pd.read_csv(filepath_or_buffer,
+                           names=names, 
+                           dtype=dtypes,
+                           sep=',', 
+                           na_values='N',
+                           index_col=0,
+                           engine='c',
+                           chunksize=self.chunk_size,
+                           **kwargs)
+
+    def write_table(self, table_name, filepath_or_buffer, **kwargs):
+        """Read an intermediate csv file of a table (see `read_table`) and write 
+        the final CSV file.
+
+        The file is processed in chunks of rows, so that the table never has to
+        be loaded in memory as a whole.
+        """
+        writer = TableWriter(table_name, db_structure=self.db_structure, archive=self.archive)
+        for chunk in self.read_table(table_name, filepath_or_buffer, **kwargs):
+            writer.write(chunk)
+        writer.close()
+
+    def connect(self):
+        """Open a new connection to the temporary database"""
+        return pymysql.connect(host=self.db_host, user=self.db_user, 
+            password=self.db_pass, database=self.db_name)
+
+    def export_table(self, table_name, connections):
+        """Export a single database table to a CSV file, using one of the 
+        available connections"""
+        # Export db table to temporary csv file
+        tmp_fn = os.path.join(self.tmp_dir, f'{table_name}.csv')
+        target_fn = os.path.join(CSV_DIR, f'{table_name}.csv')
+        logging.info(f"Exporting table '{table_name}' to temporary file '{os.path.relpath(target_fn, start=OUTPUT_DIR)}'")
+        statement = (
+            "SELECT * from {db_prefix}{table_name} INTO OUTFILE '{filepath}' "
+            "FIELDS OPTIONALLY ENCLOSED BY '{delimiter}' "
+            "TERMINATED BY ',' "
+            "LINES TERMINATED BY '\n'"
+            ).format(filepath=tmp_fn, 
+                     table_name=table_name, 
+                     delimiter=self.field_delimiter,
+                     db_prefix=self.db_prefix)
+        connection = connections.get()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(statement)
+        finally:
+            connections.put(connection)
+        
+        # Post process and convert to final csv file
+        self.write_table(table_name, tmp_fn,
+                        escapechar='\\', 
+                        quotechar=self.field_delimiter)
+
     def export_tables(self):
         """Export the database tables to CSV files. 
         
         This is done in two steps. The database tables are first exported to
         an intermediate CSV format using funny delimiters (stored in a temporary)
-        directory. Second, these are converted to the final, ordinary CSV files."""
-        self.cursor.execute(f'USE {self.db_name};')
-        for table_name in self.db_structure.keys():
-            # Export db table to temporary csv file
-            tmp_fn = os.path.join(self.tmp_dir, f'{table_name}.csv')
-            target_fn = os.path.join(CSV_DIR, f'{table_name}.csv')
-            logging.info(f"Exporting table '{table_name}' to temporary file '{os.path.relpath(target_fn, start=OUTPUT_DIR)}'")
-            statement = (
-                "SELECT * from {db_prefix}{table_name} INTO OUTFILE '{filepath}' "
-                "FIELDS OPTIONALLY ENCLOSED BY '{delimiter}' "
-                "TERMINATED BY ',' "
-                "LINES TERMINATED BY '\n'"
-                ).format(filepath=tmp_fn, 
-                         table_name=table_name, 
-                         delimiter=self.field_delimiter,
-                         db_prefix=self.db_prefix)
-            self.cursor.execute(statement)
-            
-            # Post process and convert to final csv file
-            columns = self.db_structure[table_name]
-            dtypes = {}
-            dtype_map = { 'str': str, 'int': int }
-            dtypes = { col['name']: dtype_map[col['dtype']] for col in columns }
-            names = [ col['name'] for col in columns ]
-            df = pd.read_csv(tmp_fn,
-                            names=names, 
-                            dtype=dtypes,
-                            sep=',', 
-                            escapechar='\\', 
-                            quotechar=self.field_delimiter,
-                            na_values='N',
-                            index_col=0,
-                            engine='python')
-
-            df.to_csv(target_fn)
+        directory. Second, these are converted to the final, ordinary CSV files.
+        Tables are exported concurrently using a small pool of connections."""
+        table_names = list(self.db_structure.keys())
+        num_connections = min(self.pool_size, len(table_names))
+        connections = queue.Queue()
+        for _ in range(num_connections):
+            connections.put(self.connect())
+
+        try:
+            with ThreadPoolExecutor(max_workers=num_connections) as executor:
+                futures = [executor.submit(self.export_table, table_name, connections)
+                           for table_name in table_names]
+                for future in futures:
+                    future.result()
+        finally:
+            while not connections.empty():
+                connections.get().close()
 
         # Remove temporary directory
         rel_tmp_dir = os.path.relpath(self.tmp_dir, start=OUTPUT_DIR)
         logging.info(f"Removing temporary directory '{rel_tmp_dir}'")
         shutil.rmtree(self.tmp_dir)
 
+    def write_rows(self, writer, rows):
+        """Convert rows parsed from the sql dump (see `SQLDumpReader.rows`) in the
+        same way as the intermediate csv files of the MySQL export (using ``N`` 
+        for NULL values), and append them to the final CSV file of their table.
+
+        Args:
+            writer (TableWriter): the writer of the CSV file of the table
+            rows (list): a list of rows
+        """
+        buffer = io.StringIO()
+        csv_writer = csv.writer(buffer, lineterminator='\n')
+        for values in rows:
+            csv_writer.writerow(['N' if value is None else value for value in values])
+        buffer.seek(0)
+        for chunk in self.read_table(writer.table_name, buffer):
+            writer.write(chunk)
+
+    def parse_tables(self, filepath):
+        """Parse the database tables directly from the sql dump and write them
+        to CSV files, without using a MySQL server.
+        
+        The dump is read in a single pass, and the rows of every table are 
+        appended to its final CSV file while they are parsed, in chunks of 
+        `chunk_size` rows. Only a single chunk of every table is kept in memory.
+        The chunks are converted in exactly the same way as in the MySQL engine."""
+        rel_path = os.path.relpath(filepath, start=OUTPUT_DIR)
+        logging.info(f"Parsing sql file: '{rel_path}'")
+        tables = { f'{self.db_prefix}{name}': name for name in self.db_structure.keys() }
+        writers = {}
+        for table_name in self.db_structure.keys():
+            writers[table_name] = TableWriter(table_name, db_structure=self.db_structure, 
+                                              archive=self.archive)
+            logging.info(f"Writing table '{table_name}' to "
+                         f"'{os.path.relpath(writers[table_name].filepath, start=OUTPUT_DIR)}'")
+        pending = { table_name: [] for table_name in self.db_structure.keys() }
+        
+        reader = SQLDumpReader(filepath)
+        for table, values in reader.rows():
+            if table not in tables: 
+                continue
+            rows = pending[tables[table]]
+            rows.append(values)
+            if len(rows) >= self.chunk_size:
+                self.write_rows(writers[tables[table]], rows)
+                rows.clear()
+
+        for table_name, writer in writers.items():
+            self.write_rows(writer, pending[table_name])
+            writer.close()
+
     def convert_to_csv(self, filepath):
         """Convert a sql dump of GregoBase into a set of CSV files
         
         Args:
             filepath (str): a path to the .sql file
         """
+        if self.engine == 'native':
+            self.parse_tables(filepath)
+            return
+
         self.create_db()
         self.import_sql(filepath)
         try:
@@ -175,76 +1280,207 @@ class SQLConverter(object):
 ##
 
 class CSVConverter(object):
-    def __init__(self, db_structure=DB_STRUCTURE):
-        """"""
+    def __init__(self, db_structure=DB_STRUCTURE, tables=None, archive=None, 
+        metrics=None, chunk_size=None, collect_texts=True):
+        """
+        Args:
+            db_structure (dict, optional): the database structure
+            tables (CorpusTables, optional): the corpus tables. If not passed,
+                the tables are loaded from the CSV directory.
+            archive (CorpusArchive, optional): archive to which all GABC files
+                are added once they are written
+            metrics (BuildMetrics, optional): collects per-chant metrics
+            chunk_size (int, optional): if passed, the chants are not loaded all
+                at once, but read in chunks of this many chants, together with
+                their sources and tags. This keeps the memory use constant. (If
+                the ``chants``, ``chant_sources`` or ``chant_tags`` tables are
+                not sorted by chant id, they are sorted first, in chunks as
+                well.) Defaults to None.
+            collect_texts (bool, optional): whether to keep the body and 
+                metadata of all chants in `chant_texts` (used for the Parquet
+                export). Defaults to True.
+        """
         self.db_structure = db_structure
+        self.archive = archive
+        self.metrics = metrics
+        self.chunk_size = chunk_size
+        self.chant_texts = {} if collect_texts else None
 
         # Set up output directories
         if not os.path.exists(GABC_DIR):
             os.makedirs(GABC_DIR)
         if not os.path.exists(HTML_DIR):
             os.makedirs(HTML_DIR)
-        if not os.path.exists(CSV_DIR):
-            raise Exception('CSV directory not found')
+        if tables is None:
+            tables = CorpusTables(db_structure=db_structure)
 
-        # Load all csv files
-        chants_fn = os.path.join(CSV_DIR, 'chants.csv')
-        self.chants = pd.read_csv(chants_fn, index_col=0) 
-        chant_sources_fn = os.path.join(CSV_DIR, 'chant_sources.csv')
-        self.chant_sources = pd.read_csv(chant_sources_fn, index_col=0)
-        chant_tags_fn = os.path.join(CSV_DIR, 'chant_tags.csv')
-        self.chant_tags = pd.read_csv(chant_tags_fn, index_col=0)
-        sources_fn = os.path.join(CSV_DIR, 'sources.csv')
-        self.sources = pd.read_csv(sources_fn, index_col=0)
-        tags_fn = os.path.join(CSV_DIR, 'tags.csv')
-        self.tags = pd.read_csv(tags_fn, index_col=0)
+        self.tables = tables
+        self.sources = tables.sources
+        self.tags = tables.tags
+        self.source_info = { source_id: (source['title'], source['year'])
+                             for source_id, source in self.sources.iterrows() }
+        self.tag_names = { tag_id: tag['tag'] for tag_id, tag in self.tags.iterrows() }
+
+        if chunk_size is None:
+            self.chants = tables.chants
+            self.chant_sources = tables.chant_sources
+            self.chant_tags = tables.chant_tags
+
+            # Precompute the sources and tags of every chant
+            self.chant_source_index = self.index_chant_sources()
+            self.chant_tag_index = self.index_chant_tags()
+
+    def index_chant_sources(self, chant_sources=None):
+        """Group the sources of all chants, in the order of `chant_sources`.
 
-    def extract_gabc_body(self, idx):
-        """Extract the gabc body of a chant from the chants table
-        
         Args:
-            idx (int): The id of a chant
+            chant_sources (pd.DataFrame, optional): the rows of the 
+                ``chant_sources`` table to group. Defaults to the full table.
+
+        Returns:
+            dict: maps chant ids to lists of ``(source_id, title, year)`` tuples
+        """
+        if chant_sources is None:
+            chant_sources = self.chant_sources
+        index = {}
+        for chant_id, source_id in chant_sources['source'].items():
+            title, year = self.source_info[source_id]
+            index.setdefault(chant_id, []).append((source_id, title, year))
+        return index
+
+    def index_chant_tags(self, chant_tags=None):
+        """Group the tags of all chants, in the order of `chant_tags`.
+
+        Args:
+            chant_tags (pd.DataFrame, optional): the rows of the ``chant_tags``
+                table to group. Defaults to the full table.
+
+        Returns:
+            dict: maps chant ids to lists of ``(tag_id, name)`` tuples
+        """
+        if chant_tags is None:
+            chant_tags = self.chant_tags
+        index = {}
+        for chant_id, tag_id in chant_tags['tag_id'].items():
+            index.setdefault(chant_id, []).append((tag_id, self.tag_names[tag_id]))
+        return index
+
+    def iter_chunks(self):
+        """Iterate over the chants in chunks of `chunk_size` chants, sorted by
+        id. For every chunk, `chants`, `chant_source_index` and `chant_tag_index`
+        are replaced by those of the chants in the chunk. Without a chunk size,
+        all chants form a single chunk.
+
+        Yields:
+            pd.DataFrame: the chants in the chunk
+        """
+        if self.chunk_size is None:
+            yield self.chants
+            return
+
+        sources = SortedTableReader(self.tables, 'chant_sources', self.chunk_size)
+        tags = SortedTableReader(self.tables, 'chant_tags', self.chunk_size)
+        for chants in self.tables.read_sorted_chunks('chants', self.chunk_size):
+            if len(chants) == 0:
+                continue
+            last_idx = chants.index[-1]
+            self.chants = chants
+            chant_sources = sources.read_until(last_idx)
+            chant_tags = tags.read_until(last_idx)
+            self.chant_source_index = (self.index_chant_sources(chant_sources) 
+                                       if chant_sources is not None else {})
+            self.chant_tag_index = (self.index_chant_tags(chant_tags) 
+                                    if chant_tags is not None else {})
+            yield chants
+
+    def extract_gabc_bodies(self, chants=None):
+        """Extract the gabc bodies of all chants in the chants table at once.
+
+        The ``gabc`` column contains either a quoted gabc string, or a JSON list 
+        of tex/gabc parts (in which case only the gabc is extracted and the tex
+        is turned into verbatim text). The bodies are decoded to utf-8 (also the
+        escaped unicode characters) and the ``gabc_verses`` are appended.
         
-        Raises:
-            Exception: when the chant does not have gabc
-            Exception: when the encoding can't be converted to utf-8
+        Args:
+            chants (pd.DataFrame, optional): the chants to extract. Defaults to
+                the full chants table.
         
         Returns:
-            str: A gabc string
+            (pd.Series, pd.Series): a series with the gabc bodies of all chants
+                that could be extracted, and a series with the reason of failure
+                for all other chants. Both are indexed by chant id.
         """
-        chant = self.chants.loc[idx, :]
-
-        if type(chant.gabc) != str:
-            return ""
+        if chants is None:
+            chants = self.chants
+        gabc = chants['gabc']
+        is_str = gabc.map(lambda value: type(value) == str)
+        is_json = is_str & ~gabc.str.startswith('"', na=False)
+        is_quoted = is_str & ~is_json & gabc.str.endswith('"', na=False)
+        errors = pd.Series('Cannot find GABC', index=gabc.index[is_str & ~is_json & ~is_quoted])
 
         # The chant is a list of tex/gabc strings; extract only the gabc
-        elif not chant.gabc.startswith('"'):
-            parts = json.loads(chant.gabc)
-            gabc = ""
-            for format, contents, _ in parts:
-                if format == 'gabc':
-                    gabc += contents
-                elif format == 'tex':
-                    gabc += f' <v>{contents}</v>() '
-
+        def join_parts(value):
+            # Also well-formed JSON of the wrong shape cannot be parsed
+            try:
+                body = ""
+                for format, contents, _ in json.loads(value):
+                    if format == 'gabc':
+                        body += contents
+                    elif format == 'tex':
+                        body += f' <v>{contents}</v>() '
+                return body
+            except (ValueError, TypeError):
+                return None
+        json_bodies = gabc[is_json].map(join_parts)
+        invalid_json = json_bodies.isnull()
+        errors = pd.concat([errors, 
+            pd.Series('Cannot parse GABC', index=json_bodies.index[invalid_json])])
+        
         # All other cases: remove the quotes around the gabc
-        elif chant.gabc.startswith('"') and chant.gabc.endswith('"'):
-            gabc = chant.gabc[1:len(chant.gabc)-1]
-        else:
-            logging.error(f'Cannot find GABC of chant {chant.name}; skipping...')
-            return False
+        quoted_bodies = gabc[is_quoted].str.slice(1, -1)
+        bodies = pd.concat([json_bodies[~invalid_json], quoted_bodies]).astype(object)
 
         # First encode to bytes, then decode, also the escaped unicode chars:
         try:
-            gabc = gabc.encode('latin1').decode('unicode-escape')
-        except:
-            logging.error(f'Cannot convert GABC to utf-8 for chant {chant.name}; skipping...')
-            return False
-
-        if not pd.isnull(chant['gabc_verses']):
-            gabc += chant['gabc_verses']
+            bodies = bodies.str.encode('latin1').str.decode('unicode-escape')
+        except UnicodeError:
+            def decode(body):
+                try:
+                    return body.encode('latin1').decode('unicode-escape')
+                except UnicodeError:
+                    return None
+            bodies = bodies.map(decode)
+            not_decoded = bodies.isnull()
+            errors = pd.concat([errors, 
+                pd.Series('Cannot convert GABC to utf-8', index=bodies.index[not_decoded])])
+            bodies = bodies[~not_decoded]
+        
+        verses = chants.loc[bodies.index, 'gabc_verses']
+        has_verses = verses.notnull()
+        bodies[has_verses] = bodies[has_verses] + verses[has_verses]
+
+        # Chants without gabc have an empty body
+        empty_bodies = pd.Series("", index=gabc.index[~is_str], dtype=object)
+        bodies = pd.concat([bodies, empty_bodies])
+        order = chants.index
+        bodies = bodies.reindex(order[order.isin(bodies.index)])
+        errors = errors.reindex(order[order.isin(errors.index)])
+        return bodies, errors
 
-        return gabc
+    def extract_gabc_body(self, idx):
+        """Extract the gabc body of a chant from the chants table
+        
+        Args:
+            idx (int): The id of a chant
+        
+        Returns:
+            str: A gabc string, or False if the gabc could not be extracted
+        """
+        bodies, errors = self.extract_gabc_bodies(self.chants.loc[[idx], :])
+        if len(errors) > 0:
+            logging.error(f'{errors[idx]} for chant {idx}; skipping...')
+            return False
+        return bodies[idx]
 
     def collect_metadata(self, idx):
         """Collect all metadata for a given chant from the various tables in the 
@@ -297,105 +1533,1507 @@ class CSVConverter(object):
                 del metadata[key]
         
         # Add data about all sources the chant is found in
-        source_ids = self.chant_sources.query(f'chant_id=={idx}')['source']
-        if len(source_ids) > 0:
-            metadata['_gregobase_sources'] = ",".join(str(i) for i in source_ids)
-            for i, source_id in enumerate(source_ids):
-                source = self.sources.loc[source_id, :]
+        sources = self.chant_source_index.get(idx, [])
+        if len(sources) > 0:
+            metadata['_gregobase_sources'] = ",".join(str(i) for i, _, _ in sources)
+            for i, (source_id, title, year) in enumerate(sources):
                 metadata[f'_gregobase_source_{i}_id'] = source_id
-                metadata[f'_gregobase_source_{i}_title'] = source["title"]
-                metadata[f'_gregobase_source_{i}_year'] = source["year"]
+                metadata[f'_gregobase_source_{i}_title'] = title
+                metadata[f'_gregobase_source_{i}_year'] = year
 
         # Add all tags associated to the chant
-        tag_ids = self.chant_tags.query(f'chant_id=={idx}')['tag_id']
-        if len(tag_ids) > 0:
-            metadata['_gregobase_tags'] = ",".join(str(i) for i in tag_ids)
-            for i, tag_id in enumerate(tag_ids):
-                tag = self.tags.loc[tag_id, :]
+        tags = self.chant_tag_index.get(idx, [])
+        if len(tags) > 0:
+            metadata['_gregobase_tags'] = ",".join(str(i) for i, _ in tags)
+            for i, (tag_id, name) in enumerate(tags):
                 metadata[f'_gregobase_tag_{i}_id'] = tag_id
-                metadata[f'_gregobase_tag_{i}_name'] = tag['tag']
+                metadata[f'_gregobase_tag_{i}_name'] = name
 
         return metadata
 
-    def convert_to_gabc(self):
-        """Exports all chants to GABC files."""
+    def convert_to_gabc(self, manifest=None):
+        """Exports all chants to GABC files. 
+        
+        Args:
+            manifest (Manifest, optional): the manifest of a previous build. Only
+                files of new or changed chants are written, and the files of 
+                chants that no longer exist are removed.
+        """
         logging.info('Exporting chants to GABC files...')
-        for idx, chant in self.chants.iterrows():
-            body = self.extract_gabc_body(idx)
-            if body is not False:
+        if manifest is None:
+            manifest = Manifest()
+
+        exported = set()
+        all_errors = []
+        for _ in self.iter_chunks():
+            bodies, errors = self.extract_gabc_bodies()
+            all_errors.append(errors)
+            for idx, body in bodies.items():
+                start = time.perf_counter()
                 metadata = self.collect_metadata(idx)
                 gabc_path = os.path.join(GABC_DIR, f'{idx:0>5}.gabc')
+                attributes = [f'{key}:{value};\n' for key, value in metadata.items()]
+                contents = ''.join(attributes) + "%%\n" + body
+                if self.chant_texts is not None:
+                    self.chant_texts[idx] = (body, metadata)
+                exported.add(idx)
+                if not manifest.update_gabc(idx, contents) and os.path.exists(gabc_path):
+                    continue
                 
                 with open(gabc_path, 'w') as handle:
-                    for key, value in metadata.items():
-                        attribute = f'{key}:{value};\n'
-                        handle.write(attribute)        
-                    handle.write("%%\n")
-                    handle.write(body)
+                    handle.write(contents)
+                record_written(gabc_path)
+                if self.archive is not None:
+                    self.archive.add(gabc_path)
+                if self.metrics is not None:
+                    self.metrics.record_chant(idx, gabc_seconds=time.perf_counter() - start,
+                        gabc_bytes=len(contents.encode('utf-8')))
+
+        if len(all_errors) > 0:
+            errors = pd.concat(all_errors)
+            for reason, failed in errors.groupby(errors, sort=False):
+                ids = ', '.join(str(idx) for idx in failed.index)
+                logging.error(f'{reason} for {len(failed)} chant(s): {ids}; skipping...')
+
+        # Remove chants from a previous build that no longer exist
+        for idx in set(manifest.chants.keys()) - exported:
+            logging.info(f'Removing files of chant {idx}')
+            for path in [os.path.join(GABC_DIR, f'{idx:0>5}.gabc'), 
+                         os.path.join(HTML_DIR, f'{idx:0>5}.html')]:
+                if os.path.exists(path):
+                    os.remove(path)
+            manifest.remove(idx)
+
+##
+
+class GABCValidator(object):
+    """Quickly checks whether GABC files can be parsed by chant21, without
+    actually parsing them. 
+
+    The files are tokenized using the same rules as chant21's GABC grammar: the
+    header should consist of attributes, every ``(`` should be closed by a ``)``
+    before the next one, the music between them should consist of known 
+    clefs, notes, pausas, spacers, codes and so on (with balanced brackets), and
+    there should be a clef before the first note. Chants are only reported as 
+    invalid if chant21 would certainly fail to convert them, so that they can be
+    skipped when converting the chants to HTML. Chants that are reported as 
+    valid may still fail.
+    """
+
+    suffix = (r"(?:~|>|<|v|V|o(?:~|<)?|w|s<?|q|0|1"  # neume shape
+              r"|\.\.?|'(?:0|1)?|_[0-5]*"            # rhythmic sign
+              r"|r[0-5]?|R)")                         # empty note or accent
+    alteration = rf"[a-mA-M][xy#]{suffix}?"
+    note = rf"-*[a-mA-M]{suffix}*"
+    music_pattern = re.compile(rf"""
+          (?P<custos>[a-m]?\+)
+        | (?P<clef>(?:c|f)b?[1-4])
+        | (?P<pausa>::|:[?']?|;[1-6]?|,[_0-6]?|`)
+        | (?P<alteration>{alteration})
+        | (?P<note>{note})
+        | (?P<spacer>!|@|//|/0|/\[-?[0-9]\]|/|[ ])
+        | (?P<polyphony>\{{(?:{alteration}|{note})+\}})
+        | (?P<brace>\[(?:o|u)(?:b|cba|cb):(?:0|1)(?:(?:\{{|\}})|(?:;\d+(?:\.\d+)?mm))?\])
+        | (?P<code>\[(?:(?:n|g|e)m[0-9]|(?:n|g|e)v:[^\]]+)\])
+        | (?P<choral_sign>\[cs:[^\]]+\])
+        | (?P<translation>\[alt:[^\]]+\])
+        | (?P<end_of_line>[zZ](?:0|-)?)
+        """, re.VERBOSE)
+    """re.Pattern: pattern matching a single musical element, in the order in 
+    which they are tried by the chant21 grammar"""
+
+    text_pattern = re.compile(r"<(i|b|tt|ul)>[^<]*</\1>|<v>[^<]+</v>|def-m[0-9]:[^;]+;")
+    """re.Pattern: pattern matching tags, verbatim code and macros, which can
+    contain parentheses that do not enclose music"""
+
+    text_start_pattern = re.compile(r"(?:[^ \n\r\t\f\v\(][^\(\n]*)?\(|[^\(<\* ]*[<\*]")
+    """re.Pattern: pattern matching the start of a file that might be parsed as
+    the text of a syllable"""
+
+    def __init__(self, tables=None):
+        """
+        Args:
+            tables (CorpusTables, optional): the corpus tables. If not passed,
+                the tables are loaded from the CSV directory.
+        """
+        if not os.path.exists(GABC_DIR):
+            raise Exception('GABC directory not found')
+        if tables is None:
+            tables = CorpusTables()
+        # Only the chant ids are needed (not the GABC code)
+        self.chants = tables.columns('chants')
+        self.invalid = {}
+
+    @classmethod
+    def validate_music(cls, music):
+        """Tokenize the music between a pair of parentheses.
+
+        Returns:
+            tuple: a list with the kinds of all musical elements, and an error
+                message (or None)
+        """
+        kinds = []
+        position = 0
+        while position < len(music):
+            match = cls.music_pattern.match(music, position)
+            if match is None:
+                char = music[position]
+                if char in '[]':
+                    return kinds, f"Unbalanced brackets in '({music})'"
+                elif char in '{}':
+                    return kinds, f"Unbalanced braces in '({music})'"
+                return kinds, f"Unknown musical element '{music[position:]}' in '({music})'"
+            kinds.append(match.lastgroup)
+            position = match.end()
+        return kinds, None
+
+    @classmethod
+    def validate_body(cls, body):
+        """Check the body of a GABC file.
+
+        Returns:
+            str: the reason why the body is invalid, or None
+        """
+        # Bodies containing further headers are not checked
+        if '%%' in body:
+            return None
+        if body.lstrip('\n').startswith(' '):
+            return 'The body starts with a space'
+        has_clef = False
+        skipped_text = False
+        # chant21 sorts the elements of a word by offset, and clefs come before
+        # alterations at the same offset: an alteration only needs a clef before
+        # the next note or the end of its word
+        has_alteration = False
+        position = 0
+        text = cls.text_pattern.search(body)
+        while True:
+            start = body.find('(', position)
+            if start < 0:
+                if has_alteration and not (has_clef or skipped_text):
+                    return 'Missing clef'
+                return None
+            if text is not None and text.start() < position:
+                text = cls.text_pattern.search(body, position)
+            if text is not None and text.start() < start:
+                skipped_text = True
+                position = text.end()
+                continue
+            end = body.find(')', start + 1)
+            if end < 0 or '(' in body[start + 1:end]:
+                return f'Unbalanced parentheses at position {start}'
+            kinds, error = cls.validate_music(body[start + 1:end])
+            if error is not None:
+                return error
+
+            # Tags that are not parsed as such could contain a clef
+            for kind in kinds:
+                if kind == 'clef':
+                    has_clef = True
+                elif kind == 'alteration':
+                    has_alteration = True
+                elif kind == 'note' and not (has_clef or skipped_text):
+                    return 'Missing clef'
+            position = end + 1
+
+            # Words are separated by whitespace after a syllable
+            if body[position:position + 1].isspace():
+                if has_alteration and not (has_clef or skipped_text):
+                    return 'Missing clef'
+                has_alteration = False
+
+    @classmethod
+    def validate_file(cls, gabc_path):
+        """Check a GABC file.
+
+        Returns:
+            str: the reason why the file is invalid, or None
+        """
+        with open(gabc_path, 'r') as handle:
+            contents = handle.read()
+        separator = contents.find('%%\n')
+        if separator < 0:
+            return cls.validate_body(contents)
+        header = contents[:separator]
+        position = 0
+        while position < len(header):
+            match = GABCConverter.header_attribute_pattern.match(header, position)
+            if match is None:
+                # chant21 then parses the whole file as the body, which only
+                # works if the text before the first '(' can be a syllable text
+                if cls.text_start_pattern.match(contents) is not None:
+                    return None
+                return f"Invalid header attribute '{header[position:].splitlines()[0]}'"
+            position = match.end()
+        return cls.validate_body(contents[separator + 3:])
+
+    def validate(self, jobs=None):
+        """Validate all GABC files and write a report (`validation.csv`) with 
+        the validity of every chant and the reason why it is invalid.
+
+        Args:
+            jobs (int, optional): the number of worker processes. Defaults to 
+                the number of cpus.
+
+        Returns:
+            dict: maps the ids of all invalid chants to the reason why they are
+                invalid
+        """
+        logging.info('Validating GABC files...')
+        paths = []
+        for idx in self.chants.index:
+            gabc_path = os.path.join(GABC_DIR, f'{idx:0>5}.gabc')
+            if os.path.exists(gabc_path):
+                paths.append((idx, gabc_path))
+
+        jobs = jobs or os.cpu_count() or 1
+        chunks = [paths[i:i + 500] for i in range(0, len(paths), 500)]
+        if jobs == 1 or len(chunks) <= 1:
+            results = map(_validate_chunk, chunks)
+            rows = [row for chunk in results for row in chunk]
+        else:
+            with multiprocessing.Pool(jobs) as pool:
+                rows = [row for chunk in pool.imap(_validate_chunk, chunks) for row in chunk]
+
+        self.invalid = { idx: reason for idx, reason in rows if reason is not None }
+        report = pd.DataFrame(rows, columns=['chant_id', 'reason'])
+        report.insert(1, 'valid', report['reason'].isnull())
+        filepath = os.path.join(OUTPUT_DIR, 'validation.csv')
+        report.to_csv(filepath, index=False)
+        record_written(filepath)
+        logging.info(f'Found {len(self.invalid)} invalid GABC files')
+        return self.invalid
+
+def _validate_chunk(paths):
+    """Validate a chunk of ``(idx, gabc_path)`` pairs in a worker process. 
+    Returns a list of ``(idx, reason)`` tuples, where reason is None for valid
+    files."""
+    return [(idx, GABCValidator.validate_file(gabc_path)) for idx, gabc_path in paths]
+
+##
+
+class ParquetWriter(object):
+    """Exports the corpus tables to Parquet files, next to the CSV files.
+
+    All tables get the dtypes declared in the database structure (see 
+    `CorpusTables`). Besides the tables in the database structure, there is 
+    a ``chant_texts`` table with the GABC body of every chant, and the header 
+    metadata of its GABC file (see `CSVConverter.collect_metadata`). The files 
+    can be loaded with column pruning and memory mapping, e.g.:
+
+    ```python
+    pd.read_parquet('parquet/chants.parquet', columns=['mode'], memory_map=True)
+    ```
+
+    This requires the `pyarrow` package.
+    """
+
+    def __init__(self, tables=None, archive=None):
+        """
+        Args:
+            tables (CorpusTables, optional): the corpus tables. If not passed,
+                the tables are loaded from the CSV directory.
+            archive (CorpusArchive, optional): archive to which all Parquet files
+                are added once they are written
+        """
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise Exception(
+                'Exporting the corpus to Parquet requires the pyarrow package. '
+                'You can install it using `pip install pyarrow`.')
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        if tables is None:
+            tables = CorpusTables()
+        self.tables = tables
+        self.archive = archive
+        if not os.path.exists(PARQUET_DIR):
+            os.makedirs(PARQUET_DIR)
+
+    def write_table(self, table, name):
+        """Write a pyarrow table to a Parquet file"""
+        filepath = os.path.join(PARQUET_DIR, f'{name}.parquet')
+        self.pq.write_table(table, filepath)
+        record_written(filepath)
+        if self.archive is not None:
+            self.archive.add(filepath)
+        logging.info(f"Table {name} exported to '{os.path.relpath(filepath, start=OUTPUT_DIR)}'")
+
+    def write_tables(self):
+        """Export all tables in the database structure"""
+        for table_name in self.tables.db_structure.keys():
+            df = getattr(self.tables, table_name)
+            table = self.pa.Table.from_pandas(df, preserve_index=True)
+            self.write_table(table, table_name)
+
+    def write_chant_texts(self, chant_texts):
+        """Export the ``chant_texts`` table.
+
+        Args:
+            chant_texts (dict): maps chant ids to ``(body, metadata)`` tuples, 
+                as collected by `CSVConverter.convert_to_gabc`.
+        """
+        ids = sorted(chant_texts.keys())
+        bodies = [chant_texts[idx][0] for idx in ids]
+        metadata = [[(key, str(value)) for key, value in chant_texts[idx][1].items()]
+                    for idx in ids]
+        table = self.pa.table({
+            'chant_id': self.pa.array(ids, type=self.pa.int32()),
+            'gabc_body': self.pa.array(bodies, type=self.pa.string()),
+            'gabc_header': self.pa.array(metadata, 
+                type=self.pa.map_(self.pa.string(), self.pa.string())),
+        })
+        self.write_table(table, 'chant_texts')
+
+class ChantTimeoutError(Exception):
+    """Raised when converting a single chant takes too long"""
+
+TRANSIENT_HTML_ERRORS = ('conversion timed out', 'memory limit exceeded', 
+                         'the worker process died')
+"""tuple: reasons why a chant could not be converted to HTML that depend on 
+the timeout and memory limit of the build, rather than on the chant itself"""
+
+def _raise_chant_timeout(signum, frame):
+    raise ChantTimeoutError(TRANSIENT_HTML_ERRORS[0])
+
+def _init_html_worker(max_memory=None):
+    """Initialize a worker process for the HTML conversion.
+
+    Args:
+        max_memory (int, optional): maximum memory (in bytes) the worker 
+            can use, or None for no limit. Only supported on Unix.
+    """
+    if max_memory is not None and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+
+@contextlib.contextmanager
+def _chant_timeout(timeout=None):
+    """Context manager that raises a ChantTimeoutError after `timeout` seconds.
+    Only supported on Unix."""
+    use_alarm = timeout is not None and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        handler = signal.signal(signal.SIGALRM, _raise_chant_timeout)
+        signal.alarm(timeout)
+    try:
+        yield
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, handler)
+
+def parse_chant(idx, gabc_path, timings, cache=None):
+    """Parse a GABC file using chant21.
+
+    Returns:
+        tuple: the parsed chant (or None) and an error message (or None)
+    """
+    start = time.perf_counter()
+    try:
+        if cache is not None:
+            chant, timings['parse_cached'] = cache.parse(gabc_path)
+        else:
+            chant = converter.parse(gabc_path,
+                format='gabc', forceSource=True, storePickle=False)
+        return chant, None
+    except MemoryError:
+        return None, f"Chant {idx} could not be parsed: {TRANSIENT_HTML_ERRORS[1]}"
+    except Exception as e:
+        return None, f"Chant {idx} could not be parsed: {e}"
+    finally:
+        timings['parse_seconds'] = time.perf_counter() - start
+
+class ExportedChant(object):
+    """A chant that has already been exported to a plain dictionary (using
+    ``toObject``), so that it can be rendered by `chant21.html.toFile` without
+    exporting it again"""
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def toObject(self, includeVolpiano=True):
+        return self.obj
+
+def render_chant_to_html(idx, chant, html_path, timings, features=None):
+    """Export a parsed chant to an HTML file. The chant is exported to a 
+    dictionary only once, both to render the HTML and to extract its features.
+
+    Args:
+        features (dict, optional): if passed, the features of the chant (see 
+            `extract_features`) are stored in this dictionary
+
+    Returns:
+        str: an error message if the chant could not be exported, else None
+    """
+    from chant21.html import toFile
+    start = time.perf_counter()
+    try:
+        obj = chant.toObject(includeVolpiano=True)
+        # Extract the features first, so that no HTML file is written if this fails
+        if features is not None:
+            features.update(extract_features(obj))
+        toFile(ExportedChant(obj), filepath=html_path)
+    except Exception as e:
+        if os.path.exists(html_path):
+            os.remove(html_path)
+        reason = TRANSIENT_HTML_ERRORS[1] if isinstance(e, MemoryError) else e
+        return f"Chant {idx} could not be converted to HTML: {reason}"
+    finally:
+        timings['html_seconds'] = time.perf_counter() - start
+
+def convert_chant_to_html(idx, gabc_path, html_path, timeout=None, timings=None,
+    cache=None, features=None):
+    """Convert a single GABC file to HTML using chant21.
+
+    Args:
+        idx (int): the id of the chant
+        gabc_path (str): path to the GABC file
+        html_path (str): path of the HTML file to write
+        timeout (int, optional): maximum number of seconds the conversion can
+            take, or None for no limit. Only supported on Unix.
+        timings (dict, optional): if passed, the durations of parsing 
+            (``parse_seconds``) and exporting to HTML (``html_seconds``) are
+            stored in this dictionary.
+        cache (ParseCache, optional): cache of parsed chants
+        features (dict, optional): if passed, the features of the chant (see 
+            `extract_features`) are stored in this dictionary
+
+    Returns:
+        str: an error message if the chant could not be converted, else None
+    """
+    if timings is None:
+        timings = {}
+    with _chant_timeout(timeout):
+        chant, error = parse_chant(idx, gabc_path, timings, cache=cache)
+        if error is not None:
+            return error
+        return render_chant_to_html(idx, chant, html_path, timings, features=features)
+
+def convert_duplicates_to_html(group, timeout=None, cache=None, extract=False):
+    """Convert a group of chants with identical GABC bodies to HTML. Only the 
+    first chant is parsed. The other chants reuse that parse, and only get their
+    own header metadata (which chant21 stores in ``chant.editorial.metadata``)
+    before they are exported.
+
+    Args:
+        group (list): a list of ``(idx, gabc_path, html_path, header)`` tuples,
+            where header is a dictionary with the header of the GABC file.
+        timeout (int, optional): maximum number of seconds the conversion of a
+            single chant can take.
+        cache (ParseCache, optional): cache of parsed chants
+        extract (bool, optional): also extract the features of the chants (see
+            `extract_features`). Defaults to False.
+
+    Returns:
+        list: a list of ``(idx, error, timings, features)`` tuples, where 
+            features is None if they were not extracted
+    """
+    idx, gabc_path, html_path, _ = group[0]
+    timings = {}
+    features = {} if extract else None
+    results = []
+    with _chant_timeout(timeout):
+        chant, error = parse_chant(idx, gabc_path, timings, cache=cache)
+        if error is None:
+            conversion = chant.editorial.metadata.get('conversion')
+            error = render_chant_to_html(idx, chant, html_path, timings, features=features)
+    results.append((idx, error, timings, features))
+
+    for dup_idx, dup_gabc_path, dup_html_path, header in group[1:]:
+        features = {} if extract else None
+        if chant is None:
+            # Parsing failed; parse the duplicate as well to get its exact error
+            timings = {}
+            dup_error = convert_chant_to_html(dup_idx, dup_gabc_path, dup_html_path,
+                timeout=timeout, timings=timings, cache=cache, features=features)
+            results.append((dup_idx, dup_error, timings, features))
+            continue
+        timings = { 'duplicate_of': idx }
+        chant.editorial.metadata = { 'conversion': conversion, **header }
+        with _chant_timeout(timeout):
+            dup_error = render_chant_to_html(dup_idx, chant, dup_html_path, timings,
+                features=features)
+        results.append((dup_idx, dup_error, timings, features))
+    return results
+
+def render_chant_fast(gabc_path, html_path, timeout=None, timings=None, features=None):
+    """Try to convert a GABC file to HTML using the fast renderer in `fast_html.py`,
+    which produces the same HTML as chant21 without building a music21 stream.
+
+    Args:
+        features (dict, optional): if passed, the features of the chant (see 
+            `extract_features`) are stored in this dictionary
+
+    Returns:
+        bool: whether the chant could be converted. If not, it should be 
+            converted using chant21 (see `convert_chant_to_html`). Unexpected 
+            errors (other than unsupported chants and timeouts) are logged.
+    """
+    import fast_html
+    if timings is None:
+        timings = {}
+    start = time.perf_counter()
+    try:
+        with _chant_timeout(timeout):
+            obj = fast_html.render_gabc_to_html(gabc_path, html_path)
+            if features is not None:
+                features.update(extract_features(obj))
+        return True
+    except (fast_html.UnsupportedChant, ChantTimeoutError):
+        return False
+    except Exception as e:
+        logging.warning(f"Unexpected error in the fast renderer for "
+            f"'{os.path.basename(gabc_path)}' (converting it using chant21): {e!r}")
+        return False
+    finally:
+        timings['fast_html_seconds'] = time.perf_counter() - start
+
+def _convert_chunk_to_html(args):
+    """Convert a chunk of groups of chants with identical GABC bodies to HTML 
+    in a worker process. Returns a list of ``(idx, error, timings, features)`` 
+    tuples, where error is None on success, and features is None if they are not
+    extracted."""
+    chunk, timeout, cache, fast, extract = args
+    results = []
+    for group in chunk:
+        if fast:
+            # Chants the fast renderer cannot handle are converted using chant21
+            remaining = []
+            for task in group:
+                idx, gabc_path, html_path, _ = task
+                timings = {}
+                features = {} if extract else None
+                if render_chant_fast(gabc_path, html_path, timeout=timeout, timings=timings,
+                                     features=features):
+                    results.append((idx, None, timings, features))
+                else:
+                    remaining.append(task)
+            group = remaining
+        if len(group) == 0:
+            continue
+        elif len(group) == 1:
+            idx, gabc_path, html_path, _ = group[0]
+            timings = {}
+            features = {} if extract else None
+            error = convert_chant_to_html(idx, gabc_path, html_path, 
+                timeout=timeout, timings=timings, cache=cache, features=features)
+            results.append((idx, error, timings, features))
+        else:
+            results.extend(convert_duplicates_to_html(group, timeout=timeout, cache=cache,
+                                                      extract=extract))
+    return results
 
 class GABCConverter(object):
-    def __init__(self):
-        """"""
+
+    chunk_size = 20
+    """int: number of chants sent to a worker process at once"""
+
+    header_attribute_pattern = re.compile(r"([^:;%]+):[ ]*([^%;]+(?:; [^%;]+)*);\n*")
+    """re.Pattern: pattern matching a header attribute, as in the chant21 grammar"""
+
+    def __init__(self, tables=None, archive=None, metrics=None, features=None):
+        """
+        Args:
+            tables (CorpusTables, optional): the corpus tables. If not passed,
+                the tables are loaded from the CSV directory.
+            archive (CorpusArchive, optional): archive to which all HTML files
+                are added once they are written
+            metrics (BuildMetrics, optional): collects per-chant metrics
+            features (FeatureTables, optional): collects the features of all 
+                converted chants
+        """
+        self.archive = archive
+        self.metrics = metrics
+        self.features = features
+        self.body_hashes = {}
+        self.errors = {}
+        self.unchanged = []
+        self.limits = {}
         # Set up output directories
         if not os.path.exists(GABC_DIR):
             raise Exception('GABC directory not found')
-        if not os.path.exists(CSV_DIR):
-            raise Exception('CSV directory not found')
         if not os.path.exists(HTML_DIR):
             os.makedirs(HTML_DIR)
+        if tables is None:
+            tables = CorpusTables()
+
+        # Only the chant ids are needed (not the GABC code)
+        self.chants = tables.columns('chants')
 
-        # Load all csv files
-        chants_fn = os.path.join(CSV_DIR, 'chants.csv')
-        self.chants = pd.read_csv(chants_fn, index_col=0)
+    def convert_to_html(self, jobs=1, timeout=None, max_memory=None, manifest=None,
+        cache=None, fast=False, invalid=None):
+        """Export all chants to HTML files.
 
-    def convert_to_html(self):
+        Args:
+            jobs (int, optional): the number of worker processes. Defaults to 1,
+                in which case all chants are converted in the current process.
+            timeout (int, optional): maximum number of seconds the conversion 
+                of a single chant can take. Defaults to None (no limit).
+            max_memory (int, optional): maximum memory in bytes of every worker
+                process. With a memory limit, chants are always converted in 
+                worker processes, also if ``jobs == 1``. Defaults to None (no limit).
+            manifest (Manifest, optional): the manifest of a previous build. Only
+                chants that have changed since that build are converted.
+            cache (ParseCache, optional): cache of parsed chants. Defaults to 
+                None (no cache).
+            fast (bool, optional): use the fast renderer in `fast_html.py` when
+                possible, and only fall back to chant21 for other chants. 
+                Defaults to False.
+            invalid (dict, optional): maps the ids of chants that are known to 
+                be invalid to the reason why (see `GABCValidator`). These chants
+                are not converted. Defaults to None.
+        """
         logging.info('Exporting chants to HTML files...')
-        for idx, chant in self.chants.iterrows():
+        if manifest is None:
+            manifest = Manifest()
+        if invalid is None:
+            invalid = {}
+        # Transient errors are only reused in builds with the same limits
+        self.limits = { 'timeout': timeout, 'max_memory': max_memory }
+        # Unchanged chants are only skipped if their features are known
+        known_features = self.features.chant_ids() if self.features is not None else None
+        tasks = []
+        for idx in self.chants.index:
             gabc_path = os.path.join(GABC_DIR, f'{idx:0>5}.gabc')
             html_path = os.path.join(HTML_DIR, f'{idx:0>5}.html')
 
             if not os.path.exists(gabc_path):
-                logging.error(f'GABC file not found: {os.path.relpath(gabc_path, start=OUTPUT_DIR)}')
+                error = f'GABC file not found: {os.path.relpath(gabc_path, start=OUTPUT_DIR)}'
+                logging.error(error)
+                self.errors[idx] = error
                 continue
-            
-            try:
-                chant = converter.parse(gabc_path,
-                    format='gabc', forceSource=True, storePickle=False)
-            except Exception as e:
-                logging.error(f"Chant {idx} could not be parsed: {e}")
+
+            if idx in invalid:
+                error = f'Chant {idx} is invalid: {invalid[idx]}'
+                logging.error(error)
+                self.errors[idx] = error
+                if os.path.exists(html_path):
+                    os.remove(html_path)
+                # The verdict is dropped once the validator no longer reports it
+                manifest.update_html(idx, error=error, options={ 'invalid': invalid[idx] })
                 continue
 
-            chant.toHTML(html_path)
+            # Skip chants that are unchanged since the previous build
+            if manifest.has_html(idx, options={ **self.limits, 'invalid': None }):
+                error = manifest.html_error(idx)
+                if error is not None:
+                    logging.error(error)
+                    self.errors[idx] = error
+                    continue
+                elif os.path.exists(html_path) and (known_features is None 
+                                                    or idx in known_features):
+                    self.unchanged.append(idx)
+                    continue
+            tasks.append((idx, gabc_path, html_path))
+
+        if len(tasks) < len(self.chants):
+            logging.info(f'Converting {len(tasks)} new or changed chants')
+
+        # Chants with identical GABC bodies are parsed only once
+        files = { idx: self.read_gabc(gabc_path) for idx, gabc_path, _ in tasks }
+        self.body_hashes.update({ idx: body_hash for idx, (body_hash, _) in files.items() })
+        groups = collections.OrderedDict()
+        for idx, gabc_path, html_path in tasks:
+            body_hash, header = files[idx]
+            key = body_hash if header is not None else idx
+            groups.setdefault(key, []).append((idx, gabc_path, html_path, header))
+        groups = list(groups.values())
+        if len(groups) < len(tasks):
+            logging.info(f'Parsing {len(groups)} chants with unique GABC bodies')
+
+        options = (timeout, cache, fast, self.features is not None)
+        if jobs == 1 and max_memory is None:
+            results = (_convert_chunk_to_html(([group], *options)) for group in groups)
+            self._register_html(results, manifest)
+        else:
+            logging.info(f'Using {jobs} worker process(es)')
+            chunks = [groups[i:i + self.chunk_size] 
+                      for i in range(0, len(groups), self.chunk_size)]
+            while len(chunks) > 0:
+                interrupted, chunks = self._convert_in_pool(chunks, options, manifest,
+                    jobs=jobs, max_memory=max_memory)
+                if len(interrupted) > 0:
+                    self._convert_interrupted(interrupted, options, manifest, max_memory)
+
+        if cache is not None:
+            cache.evict()
+
+    def _convert_in_pool(self, chunks, options, manifest, jobs, max_memory=None, 
+        max_running=None):
+        """Convert chunks of groups of chants in a pool of worker processes. At 
+        most `max_running` chunks (by default twice the number of workers) are 
+        submitted at a time. When a worker process dies (e.g. it crashes, or is
+        killed when it runs out of memory), the pool can no longer be used and
+        the conversion stops.
+
+        Returns:
+            tuple: a list of the chunks that were being converted when a worker 
+                died, and a list of the chunks that were not yet submitted
+        """
+        if max_running is None:
+            max_running = 2 * jobs
+        chunks = collections.deque(chunks)
+        running = {}
+        with ProcessPoolExecutor(jobs, initializer=_init_html_worker, 
+                                 initargs=(max_memory,)) as executor:
+            while len(chunks) > 0 or len(running) > 0:
+                while len(chunks) > 0 and len(running) < max_running:
+                    chunk = chunks.popleft()
+                    future = executor.submit(_convert_chunk_to_html, (chunk, *options))
+                    running[future] = chunk
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                broken = []
+                for future in done:
+                    chunk = running.pop(future)
+                    try:
+                        results = future.result()
+                    except BrokenProcessPool:
+                        broken.append(chunk)
+                        continue
+                    self._register_html([results], manifest)
+                if len(broken) > 0:
+                    return broken + list(running.values()), list(chunks)
+        return [], []
+
+    def _convert_interrupted(self, chunks, options, manifest, max_memory=None):
+        """Convert the chunks that were being converted when a worker process 
+        died. Their groups of chants are converted one at a time in a single 
+        worker process, so that the chants that make it die can be identified 
+        and reported as unconvertable."""
+        groups = [[group] for chunk in chunks for group in chunk]
+        num_chants = sum(len(group) for [group] in groups)
+        logging.warning(f'A worker process died; converting {num_chants} chants again '
+                        'one at a time')
+        while len(groups) > 0:
+            crashed, groups = self._convert_in_pool(groups, options, manifest, jobs=1, 
+                max_memory=max_memory, max_running=1)
+            for [group] in crashed:
+                results = [(idx, f'Chant {idx} could not be converted to HTML: '
+                                 f'{TRANSIENT_HTML_ERRORS[2]}', {}, None) 
+                           for idx, _, _, _ in group]
+                self._register_html([results], manifest)
+
+    @classmethod
+    def read_gabc(cls, gabc_path):
+        """Read a GABC file and split it in a header and a body.
+
+        Returns:
+            tuple: the hash of the body, and a dictionary with the header 
+                attributes. The header is None if it cannot be parsed exactly
+                as chant21 would parse it, or if the body contains further 
+                header sections; such chants are never deduplicated.
+        """
+        with open(gabc_path, 'r') as handle:
+            contents = handle.read()
+        position = contents.find('%%\n')
+        if position < 0:
+            return Manifest.hash(contents), None
+        header_str = contents[:position]
+        body = contents[position + 3:].lstrip('\n')
+        if '%%' in body:
+            return Manifest.hash(body), None
+
+        header = {}
+        position = 0
+        while position < len(header_str):
+            match = cls.header_attribute_pattern.match(header_str, position)
+            if match is None:
+                return Manifest.hash(body), None
+            header[match.group(1)] = match.group(2)
+            position = match.end()
+        return Manifest.hash(body), header
+
+    def write_duplicates_report(self, filepath=None):
+        """Write a CSV file listing all groups of chants with identical GABC 
+        bodies (only the header metadata differs). Every chant is listed with
+        the hash of its body and the first chant in its group."""
+        if filepath is None:
+            filepath = os.path.join(OUTPUT_DIR, 'duplicates.csv')
+        rows = []
+        for idx in self.chants.index:
+            gabc_path = os.path.join(GABC_DIR, f'{idx:0>5}.gabc')
+            if idx not in self.body_hashes and os.path.exists(gabc_path):
+                self.body_hashes[idx], _ = self.read_gabc(gabc_path)
+            if idx in self.body_hashes:
+                rows.append((self.body_hashes[idx], idx))
+        df = pd.DataFrame(rows, columns=['body_hash', 'chant_id'])
+        df['duplicate_of'] = df.groupby('body_hash')['chant_id'].transform('min')
+        df = df[df.groupby('body_hash')['chant_id'].transform('size') > 1]
+        df = df.sort_values(['duplicate_of', 'chant_id'])
+        df.to_csv(filepath, index=False)
+        record_written(filepath)
+        num_groups = df['body_hash'].nunique()
+        logging.info(f'Found {num_groups} groups of chants with identical GABC bodies '
+                     f'({len(df) - num_groups} duplicates)')
+
+    def write_unconvertable_report(self, filepath=None):
+        """Write a CSV file listing all chants that could not be converted to
+        HTML, and the reason why (`unconvertable.csv`)"""
+        if filepath is None:
+            filepath = os.path.join(OUTPUT_DIR, 'unconvertable.csv')
+        rows = sorted(self.errors.items())
+        df = pd.DataFrame(rows, columns=['chant_id', 'reason'])
+        df.to_csv(filepath, index=False)
+        record_written(filepath)
+
+    def _register_html(self, results, manifest):
+        """Log the errors and update the manifest, metrics and features for 
+        chunks of converted chants"""
+        for chunk in results:
+            for idx, error, timings, features in chunk:
+                html_path = os.path.join(HTML_DIR, f'{idx:0>5}.html')
+                if self.metrics is not None:
+                    self.metrics.record_chant(idx, **timings)
+                if error is not None:
+                    logging.error(error)
+                    self.errors[idx] = error
+                    if os.path.exists(html_path):
+                        os.remove(html_path)
+                    options = None
+                    if error.endswith(TRANSIENT_HTML_ERRORS):
+                        options = self.limits
+                    manifest.update_html(idx, error=error, options=options)
+                else:
+                    with open(html_path, 'r') as handle:
+                        contents = handle.read()
+                    manifest.update_html(idx, contents=contents)
+                    record_written(html_path)
+                    if self.archive is not None:
+                        self.archive.add(html_path)
+                    if self.metrics is not None:
+                        self.metrics.record_chant(idx, html_bytes=len(contents.encode('utf-8')))
+                    if self.features is not None:
+                        self.features.add(idx, features)
         
 ##
 
-class ReadmeWriter(object):
+def extract_features(obj):
+    """Extract the notes, syllables and words of a chant from the dictionary it
+    is exported to (using ``toObject``), from which the HTML is also rendered.
+    The pitches are those shown in the HTML: the diatonic note numbers of the
+    volpiano notes (as in music21, so C4 is 29). Flats and naturals are not 
+    taken into account, as the fast renderer does not export them.
+
+    Returns:
+        dict: a dictionary with ``notes`` (lists with the ``pitch``, 
+            ``liquescent``, ``neume`` and ``syllable`` of every note), and lists
+            of rows of the ``syllables`` and ``words`` tables (see `FeatureTables`)
+    """
+    from fast_html import VOLPIANO_NOTES, VOLPIANO_LIQUESCENTS
+    notes = { column: [] for column in FeatureTables.note_dtypes }
+    syllables = []
+    words = []
+    num_neumes = 0
+    for section_idx, section in enumerate(obj.get('elements', [])):
+        for word in section.get('elements', []):
+            word_idx = len(words)
+            text = ''
+            num_word_notes = 0
+            for syllable in word.get('elements', []):
+                syllable_idx = len(syllables)
+                music = []
+                num_notes = 0
+                num_syllable_neumes = 0
+                for element in syllable.get('elements', []):
+                    if element['type'] != 'neume':
+                        if element.get('volpiano'):
+                            music.append(element['volpiano'])
+                        continue
+                    neume = ''
+                    for note in element.get('elements', []):
+                        volpiano = note['volpiano']
+                        liquescent = volpiano in VOLPIANO_LIQUESCENTS
+                        alphabet = VOLPIANO_LIQUESCENTS if liquescent else VOLPIANO_NOTES
+                        # The lowest volpiano note is F3
+                        notes['pitch'].append(alphabet.index(volpiano) + 25)
+                        notes['liquescent'].append(liquescent)
+                        notes['neume'].append(num_neumes)
+                        notes['syllable'].append(syllable_idx)
+                        neume += volpiano
+                    music.append(neume)
+                    num_notes += len(neume)
+                    num_neumes += 1
+                    num_syllable_neumes += 1
+                lyric = syllable.get('lyric') or ''
+                syllables.append((section_idx, word_idx, syllable_idx, lyric, 
+                    syllable.get('annotation') or '', num_syllable_neumes, num_notes,
+                    '-'.join(music)))
+                text += lyric
+                num_word_notes += num_notes
+            words.append((section_idx, word_idx, text, 
+                len(word.get('elements', [])), num_word_notes))
+    return { 'notes': notes, 'syllables': syllables, 'words': words }
+
+class FeatureTables(object):
+    """Symbolic features of all chants, extracted from the same parse that is 
+    used to convert them to HTML (see `extract_features`), so that analyses do
+    not have to parse the chants again. They are stored in the `features` 
+    directory:
+
+    - `notes.npz`: numpy arrays with the ``pitch`` (a diatonic note number), 
+      ``liquescent`` flag, ``neume`` and ``syllable`` of all notes of all chants.
+      The notes of chant ``chant_ids[i]`` are those from ``offsets[i]`` up to
+      ``offsets[i + 1]``.
+    - `syllables.csv`: the section, word, lyric, annotation, number of neumes
+      and notes, and the volpiano of every syllable
+    - `words.csv`: the section, text, and number of syllables and notes of 
+      every word
+
+    Sections, words, syllables and neumes are numbered within a chant, starting
+    from 0.
+    """
+
+    note_dtypes = { 'pitch': 'int8', 'liquescent': 'bool', 'neume': 'int32', 'syllable': 'int32' }
+    """dict: the columns and dtypes of the notes table"""
+
+    syllable_columns = ['section', 'word', 'syllable', 'lyric', 'annotation', 
+                        'num_neumes', 'num_notes', 'volpiano']
+    """list: the columns of the syllables table (besides ``chant_id``)"""
+
+    word_columns = ['section', 'word', 'text', 'num_syllables', 'num_notes']
+    """list: the columns of the words table (besides ``chant_id``)"""
+
+    def __init__(self, directory=None):
+        """
+        Args:
+            directory (str, optional): the directory of the tables. Defaults to
+                the `features` directory in the output directory.
+        """
+        if directory is None:
+            directory = FEATURES_DIR
+        self.directory = directory
+        self.chants = {}
+
+    def path(self, filename):
+        """Return the path of a file in the directory"""
+        return os.path.join(self.directory, filename)
+
+    def exists(self):
+        """Whether the tables have been written to the directory"""
+        return all(os.path.exists(self.path(filename)) 
+                   for filename in ['notes.npz', 'syllables.csv', 'words.csv'])
+
+    def chant_ids(self):
+        """Return the set of ids of all chants in the tables in the directory"""
+        if not self.exists():
+            return set()
+        with np.load(self.path('notes.npz')) as data:
+            return set(data['chant_ids'].tolist())
+
+    def add(self, idx, features):
+        """Add the features of a chant (see `extract_features`)"""
+        notes = { column: np.asarray(features['notes'][column], dtype=dtype)
+                  for column, dtype in self.note_dtypes.items() }
+        self.chants[idx] = (notes, features['syllables'], features['words'])
+
+    def read(self):
+        """Read the tables from the directory.
 
-    def __init__(self, db_structure=DB_STRUCTURE):
-        """"""
+        Returns:
+            tuple: an array with the ids of all chants, and DataFrames with all
+                notes, syllables and words (with a ``chant_id`` column)
+        """
+        with np.load(self.path('notes.npz')) as data:
+            chant_ids = data['chant_ids']
+            notes = pd.DataFrame({ column: data[column] for column in self.note_dtypes })
+            notes.insert(0, 'chant_id', np.repeat(chant_ids, np.diff(data['offsets'])))
+        kwargs = dict(keep_default_na=False, 
+                      dtype={ 'lyric': str, 'annotation': str, 'volpiano': str, 'text': str })
+        syllables = pd.read_csv(self.path('syllables.csv'), **kwargs)
+        words = pd.read_csv(self.path('words.csv'), **kwargs)
+        return chant_ids, notes, syllables, words
+
+    def collected(self):
+        """Return the features of all added chants, as tables like `read`"""
+        chant_ids = np.array(sorted(self.chants), dtype='int32')
+        notes = pd.DataFrame({ 
+            column: np.concatenate([np.empty(0, dtype=dtype)] 
+                                   + [self.chants[idx][0][column] for idx in chant_ids])
+            for column, dtype in self.note_dtypes.items() })
+        notes.insert(0, 'chant_id', np.repeat(chant_ids, 
+            [len(self.chants[idx][0]['pitch']) for idx in chant_ids]))
+        syllables = pd.DataFrame([(idx, *row) for idx in chant_ids for row in self.chants[idx][1]],
+                                 columns=['chant_id'] + self.syllable_columns)
+        words = pd.DataFrame([(idx, *row) for idx in chant_ids for row in self.chants[idx][2]],
+                             columns=['chant_id'] + self.word_columns)
+        return chant_ids, notes, syllables, words
+
+    @staticmethod
+    def select(tables, chant_ids):
+        """Select the rows of some chants from tables like those returned by `read`"""
+        ids, notes, syllables, words = tables
+        chant_ids = list(chant_ids)
+        return (ids[np.isin(ids, chant_ids)], notes[notes['chant_id'].isin(chant_ids)],
+                syllables[syllables['chant_id'].isin(chant_ids)], 
+                words[words['chant_id'].isin(chant_ids)])
+
+    @staticmethod
+    def combine(parts):
+        """Combine tables (like those returned by `read`) of different chants, 
+        and sort them by chant id"""
+        chant_ids = np.sort(np.concatenate([part[0] for part in parts]))
+        notes, syllables, words = [
+            pd.concat([part[i] for part in parts]).sort_values('chant_id', kind='stable')
+            for i in range(1, 4)]
+        return chant_ids, notes, syllables, words
+
+    def save(self, tables):
+        """Write tables like those returned by `read` to the directory"""
+        chant_ids, notes, syllables, words = tables
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        counts = notes.groupby('chant_id').size().reindex(chant_ids, fill_value=0)
+        offsets = np.concatenate([[0], np.cumsum(counts.to_numpy())]).astype('int64')
+        arrays = { column: notes[column].to_numpy(dtype=dtype) 
+                   for column, dtype in self.note_dtypes.items() }
+        np.savez(self.path('notes.npz'), chant_ids=chant_ids.astype('int32'), 
+                 offsets=offsets, **arrays)
+        syllables.to_csv(self.path('syllables.csv'), index=False)
+        words.to_csv(self.path('words.csv'), index=False)
+        for name in ['notes.npz', 'syllables.csv', 'words.csv']:
+            record_written(self.path(name))
+        logging.info(f'Wrote the features of {len(chant_ids)} chants ({len(notes)} notes, '
+                     f'{len(syllables)} syllables)')
+
+    def write(self, keep=()):
+        """Write the features of all added chants to the directory, together 
+        with those of the chants in `keep` from the tables already in the 
+        directory (e.g. chants that did not change since the previous build)."""
+        parts = [self.collected()]
+        keep = set(keep) - set(self.chants)
+        if len(keep) > 0 and self.exists():
+            parts.append(self.select(self.read(), keep))
+        self.save(self.combine(parts))
+
+    @classmethod
+    def merge(cls, directories, directory=None):
+        """Merge the tables in several directories (e.g. of shards). If none of
+        the directories contain tables (e.g. shards built with `--no-features`), 
+        nothing is written. Raises an exception if only some of them do, as the
+        merged tables would then silently miss chants."""
+        missing = [path for path in directories if not cls(path).exists()]
+        if len(missing) == len(directories):
+            return
+        if len(missing) > 0:
+            raise Exception(f'No feature tables found in {", ".join(missing)}. '
+                            'Build all shards either with or without --no-features.')
+        parts = [cls(path).read() for path in directories]
+        cls(directory).save(cls.combine(parts))
+
+##
+
+class ShardWriter(object):
+    """Packs the files of all chants of one kind (e.g. all GABC files) into a
+    small number of shard files.
+
+    The shards (e.g. `gabc-000.shard`) simply contain the files, byte for byte,
+    one after the other. The index (e.g. `gabc-index.csv`) lists the shard, 
+    offset and length (in bytes) of every chant, so that a chant can be read
+    with a single seek. See also `ShardReader`.
+    """
+
+    def __init__(self, kind, directory=None, shard_size=64 * 2**20, archive=None):
+        """
+        Args:
+            kind (str): the kind of files, e.g. ``gabc`` or ``html``
+            directory (str, optional): the directory of the shards. Defaults to
+                the `packed` directory of the corpus.
+            shard_size (int, optional): maximum size of a shard in bytes (unless
+                it contains a single larger file). Defaults to 64MB.
+            archive (CorpusArchive, optional): archive to which the shards and 
+                the index are added once they are written
+        """
+        if directory is None:
+            directory = PACKED_DIR
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.kind = kind
+        self.directory = directory
+        self.shard_size = shard_size
+        self.archive = archive
+        self.index = []
+        self.shard = -1
+        self.handle = None
+        self.offset = 0
+
+    def shard_path(self, shard):
+        return os.path.join(self.directory, f'{self.kind}-{shard:0>3}.shard')
+
+    def close_shard(self):
+        if self.handle is not None:
+            self.handle.close()
+            record_written(self.shard_path(self.shard))
+            if self.archive is not None:
+                self.archive.add(self.shard_path(self.shard))
+            self.handle = None
+
+    def add(self, idx, contents):
+        """Add the contents (bytes, or a string that is utf-8 encoded) of the 
+        file of a chant"""
+        data = contents.encode('utf-8') if isinstance(contents, str) else contents
+        if self.handle is None or (self.offset > 0 and 
+                                   self.offset + len(data) > self.shard_size):
+            self.close_shard()
+            self.shard += 1
+            self.handle = open(self.shard_path(self.shard), 'wb')
+            self.offset = 0
+        self.handle.write(data)
+        self.index.append((idx, self.shard, self.offset, len(data)))
+        self.offset += len(data)
+
+    def close(self):
+        """Close the last shard and write the index"""
+        self.close_shard()
+        index_fn = os.path.join(self.directory, f'{self.kind}-index.csv')
+        index = pd.DataFrame(self.index, columns=['id', 'shard', 'offset', 'length'])
+        index.to_csv(index_fn, index=False)
+        record_written(index_fn)
+        if self.archive is not None:
+            self.archive.add(index_fn)
+        logging.info(f'Packed {len(index)} {self.kind} files into {self.shard + 1} shard(s)')
+
+class ShardReader(object):
+    """Reads the files of chants from shards written by a `ShardWriter`.
+    
+    The shards are memory-mapped, so reading a chant does not require 
+    reading the whole shard. For example:
+
+    ```python
+    reader = ShardReader('gabc', 'gregobasecorpus-v0.4/packed')
+    gabc = reader.get(1)
+    ```
+    """
+
+    def __init__(self, kind, directory=None):
+        if directory is None:
+            directory = PACKED_DIR
+        self.kind = kind
+        self.directory = directory
+        index_fn = os.path.join(directory, f'{kind}-index.csv')
+        if not os.path.exists(index_fn):
+            raise Exception(f'Shard index not found: {index_fn}')
+        self.index = pd.read_csv(index_fn, index_col=0)
+        self.shards = {}
+
+    @staticmethod
+    def exists(kind, directory=None):
+        """Whether shards of a given kind exist in a directory"""
+        if directory is None:
+            directory = PACKED_DIR
+        return os.path.exists(os.path.join(directory, f'{kind}-index.csv'))
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, idx):
+        return idx in self.index.index
+
+    def ids(self):
+        """Return the ids of all chants in the shards"""
+        return list(self.index.index)
+
+    def get_bytes(self, idx):
+        """Return the contents of the file of a chant as bytes"""
+        shard, offset, length = self.index.loc[idx, ['shard', 'offset', 'length']]
+        if shard not in self.shards:
+            shard_path = os.path.join(self.directory, f'{self.kind}-{shard:0>3}.shard')
+            with open(shard_path, 'rb') as handle:
+                if os.path.getsize(shard_path) == 0:
+                    self.shards[shard] = b''
+                else:
+                    self.shards[shard] = mmap.mmap(handle.fileno(), 0, 
+                        access=mmap.ACCESS_READ)
+        return self.shards[shard][offset:offset + length]
+
+    def get(self, idx):
+        """Return the contents of the file of a chant"""
+        return self.get_bytes(idx).decode('utf-8')
+
+    def close(self):
+        for shard in self.shards.values():
+            if isinstance(shard, mmap.mmap):
+                shard.close()
+        self.shards = {}
+
+def pack_corpus(archive=None, shard_size=64 * 2**20):
+    """Pack all GABC and HTML files into shards (see `ShardWriter`) and remove
+    the `gabc` and `html` directories.
+
+    Args:
+        archive (CorpusArchive, optional): archive to which the shards are added.
+            The loose GABC and HTML files should not have been added to it.
+        shard_size (int, optional): maximum size of a shard in bytes
+    """
+    for kind, directory in [('gabc', GABC_DIR), ('html', HTML_DIR)]:
+        logging.info(f'Packing {kind} files...')
+        writer = ShardWriter(kind, shard_size=shard_size, archive=archive)
+        filenames = sorted(entry.name for entry in os.scandir(directory) 
+                           if entry.is_file() and entry.name.endswith(f'.{kind}'))
+        for filename in filenames:
+            with open(os.path.join(directory, filename), 'rb') as handle:
+                writer.add(int(filename.split('.')[0]), handle.read())
+        writer.close()
+        shutil.rmtree(directory)
+
+def unpack_corpus(directory=None, remove=False):
+    """Unpack shards to the loose GABC and HTML files (`gabc/00001.gabc`, etc.)
+
+    Args:
+        directory (str, optional): the output directory of the corpus. Defaults
+            to the current output directory.
+        remove (bool, optional): remove the shards after unpacking them. 
+            Defaults to False.
+    """
+    if directory is None:
+        directory = OUTPUT_DIR
+    packed_dir = os.path.join(directory, 'packed')
+    for kind in ['gabc', 'html']:
+        if not ShardReader.exists(kind, packed_dir):
+            continue
+        reader = ShardReader(kind, packed_dir)
+        target_dir = os.path.join(directory, kind)
+        if not os.path.exists(target_dir):
+            os.makedirs(target_dir)
+        for idx in reader.ids():
+            with open(os.path.join(target_dir, f'{idx:0>5}.{kind}'), 'wb') as handle:
+                handle.write(reader.get_bytes(idx))
+        reader.close()
+        logging.info(f'Unpacked {len(reader)} {kind} files')
+    if remove and os.path.exists(packed_dir):
+        shutil.rmtree(packed_dir)
+
+def shard_output_dir(shard, num_shards):
+    """Return the output directory of a shard of a sharded build"""
+    return f'{OUTPUT_DIR}-shard-{shard}-of-{num_shards}'
+
+def merge_shard_logs(num_shards, log_fn):
+    """Append the logs of all shards of a sharded build to a log file"""
+    with open(log_fn, 'a') as handle:
+        for shard in range(1, num_shards + 1):
+            shard_log_fn = os.path.join(shard_output_dir(shard, num_shards), 
+                                        'corpus-generation.log')
+            if os.path.exists(shard_log_fn):
+                with open(shard_log_fn, 'r') as shard_log:
+                    handle.write(shard_log.read())
+
+def merge_shards(num_shards, archive=None, metrics=None):
+    """Merge the shards of a sharded build into the output directory: copy their
+    GABC and HTML files, and combine their manifests, validation and 
+    unconvertable reports, feature tables and performance metrics. Existing GABC,
+    HTML, packed and feature files in the output directory are removed. The result does not depend
+    on the order in which the shards were built.
+
+    Args:
+        num_shards (int): the number of shards
+        archive (CorpusArchive, optional): archive to which the GABC and HTML 
+            files are added
+        metrics (BuildMetrics, optional): metrics to which those of the shards
+            are added
+    """
+    shard_dirs = [shard_output_dir(shard, num_shards) for shard in range(1, num_shards + 1)]
+    for shard, shard_dir in enumerate(shard_dirs, start=1):
+        # The performance report is written at the end of a build
+        if not os.path.exists(os.path.join(shard_dir, 'performance.json')):
+            raise Exception(f'Shard {shard}/{num_shards} not found or not finished: {shard_dir}')
+
+    logging.info(f'Merging {num_shards} shards...')
+    for directory in [GABC_DIR, HTML_DIR, PACKED_DIR, FEATURES_DIR]:
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+    for kind, directory in [('gabc', GABC_DIR), ('html', HTML_DIR)]:
+        os.makedirs(directory)
+        paths = {}
+        for shard_dir in shard_dirs:
+            shard_kind_dir = os.path.join(shard_dir, kind)
+            if os.path.exists(shard_kind_dir):
+                for entry in os.scandir(shard_kind_dir):
+                    paths[entry.name] = entry.path
+        for filename in sorted(paths):
+            path = os.path.join(directory, filename)
+            shutil.copyfile(paths[filename], path)
+            record_written(path)
+            if archive is not None:
+                archive.add(path)
+        logging.info(f'Merged {len(paths)} {kind} files')
+
+    manifest = Manifest(os.path.join(OUTPUT_DIR, 'manifest.json'))
+    manifest.chants = {}
+    reports = collections.defaultdict(list)
+    for shard, shard_dir in enumerate(shard_dirs, start=1):
+        shard_manifest = Manifest(os.path.join(shard_dir, 'manifest.json'))
+        manifest.chants.update(shard_manifest.chants)
+        for name in ['validation.csv', 'unconvertable.csv']:
+            filepath = os.path.join(shard_dir, name)
+            if os.path.exists(filepath):
+                reports[name].append(pd.read_csv(filepath))
+        if metrics is not None:
+            metrics.merge_report(shard_dir, shard=f'{shard}/{num_shards}')
+    manifest.save()
+    for name, dfs in reports.items():
+        report = pd.concat(dfs).sort_values('chant_id')
+        report.to_csv(os.path.join(OUTPUT_DIR, name), index=False)
+        record_written(os.path.join(OUTPUT_DIR, name))
+    FeatureTables.merge([os.path.join(shard_dir, 'features') for shard_dir in shard_dirs])
+
+def count_chant_files(kind):
+    """Return the number of files of a given kind (``gabc`` or ``html``) in the
+    corpus, either as loose files or in shards."""
+    if ShardReader.exists(kind):
+        return len(ShardReader(kind))
+    directory = GABC_DIR if kind == 'gabc' else HTML_DIR
+    if not os.path.exists(directory):
+        return 0
+    return sum(1 for entry in os.scandir(directory) if entry.is_file())
+
+##
+
+class CorpusStatistics(object):
+    """Frequencies of the values of all columns marked with ``report_value_counts`` 
+    in the database structure. These are reported in the README, and can be 
+    exported to a JSON file.
+
+    The descriptions of values from a ``value_description_table`` (e.g. the 
+    title and year of a source) are formatted for the whole description table 
+    at once and then joined with the counts, rather than looked up value by 
+    value. Every frequency table is only computed once.
+    """
+
+    def __init__(self, tables=None, db_structure=DB_STRUCTURE):
+        """
+        Args:
+            tables (CorpusTables, optional): the corpus tables. If not passed,
+                the tables are loaded from the CSV directory.
+            db_structure (dict, optional): the database structure
+        """
+        if tables is None:
+            tables = CorpusTables(db_structure=db_structure)
+        self.tables = tables
         self.db_structure = db_structure
+        self.cache = {}
+
+    def table(self, table_name):
+        """Return the reported columns of a table (see `CorpusTables.columns`)"""
+        names = [column['name'] for _, column in self.reported_columns(table_name)]
+        return self.tables.columns(table_name, names)
+
+    def reported_columns(self, table_name=None):
+        """Iterate over ``(table_name, column)`` pairs of all columns whose value 
+        counts are reported (optionally only those of a single table)"""
+        table_names = self.db_structure.keys() if table_name is None else [table_name]
+        for name in table_names:
+            for column in self.db_structure[name]:
+                if 'report_value_counts' in column:
+                    yield name, column
+
+    @staticmethod
+    def format_template(template, table):
+        """Format a template like ``'{description.title} ({description.year})'`` 
+        for all rows of a table at once.
+        
+        Returns:
+            pd.Series: the formatted strings, with the same index as the table
+        """
+        conversions = { 'r': repr, 's': str, 'a': ascii }
+        formatted = pd.Series('', index=table.index, dtype=object)
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            formatted = formatted + literal
+            if field is None:
+                continue
+            convert = conversions.get(conversion, lambda value: value)
+            column = table[field.split('.', 1)[1]]
+            formatted = formatted + column.map(lambda value: format(convert(value), spec))
+        return formatted
 
-        # Set up output directories
-        OUTPUT_DIR = os.path.join(DIST_DIR, f'gregobasecorpus-v{__version__}')
-        GABC_DIR = os.path.join(OUTPUT_DIR, 'gabc')
-        if not os.path.exists(GABC_DIR):
-            os.makedirs(GABC_DIR)
+    def describe(self, column, values):
+        """Return the descriptions of several values of a column
+        
+        Returns:
+            list: the description of every value
+        """
+        if 'value_description_table' in column:
+            table = getattr(self.tables, column['value_description_table'])
+            descriptions = self.format_template(column['value_description_template'], table)
+            return descriptions.reindex(values).fillna('').tolist()
+        value_descriptions = column.get('value_descriptions', {})
+        return [value_descriptions.get(value, '') for value in values]
 
-        CSV_DIR = os.path.join(OUTPUT_DIR, 'csv')
-        if not os.path.exists(CSV_DIR):
-            raise Exception('CSV directory not found')
+    def frequencies(self, table_name, column):
+        """Return the frequencies of the values of a column.
+
+        Args:
+            table_name (str): the name of the table
+            column (dict): the column, as in the database structure
 
-        # Load all csv files
-        chants_fn = os.path.join(CSV_DIR, 'chants.csv')
-        self.chants = pd.read_csv(chants_fn, index_col=0) 
-        chant_sources_fn = os.path.join(CSV_DIR, 'chant_sources.csv')
-        self.chant_sources = pd.read_csv(chant_sources_fn, index_col=0)
-        chant_tags_fn = os.path.join(CSV_DIR, 'chant_tags.csv')
-        self.chant_tags = pd.read_csv(chant_tags_fn, index_col=0)
-        sources_fn = os.path.join(CSV_DIR, 'sources.csv')
-        self.sources = pd.read_csv(sources_fn, index_col=0)
-        tags_fn = os.path.join(CSV_DIR, 'tags.csv')
-        self.tags = pd.read_csv(tags_fn, index_col=0)
+        Returns:
+            pd.DataFrame: a dataframe indexed by value and sorted by decreasing
+                count, with the ``count``, percentage (``perc``) and 
+                ``description`` of every value, and whether it is counted 
+                among the *others* in the README (``other``).
+        """
+        key = (table_name, column['name'])
+        if key not in self.cache:
+            table = self.table(table_name)
+            # As objects, tied values are counted in order of first appearance
+            # (not in the order of the categories of categorical columns)
+            counts = table[column['name']].astype(object).value_counts()
+            freqs = pd.DataFrame({ 'count': counts, 'perc': counts / len(table) * 100 })
+            freqs['description'] = self.describe(column, counts.index)
+            freqs['other'] = freqs['perc'] <= column.get('report_min_freq', 0)
+            self.cache[key] = freqs
+        return self.cache[key]
+
+    def to_dict(self):
+        """Return all frequencies as a (JSON serializable) dictionary"""
+        stats = {}
+        for table_name, column in self.reported_columns():
+            if table_name not in stats:
+                num_rows = len(self.table(table_name))
+                stats[table_name] = { 'num_rows': num_rows, 'columns': {} }
+            freqs = self.frequencies(table_name, column)
+            stats[table_name]['columns'][column['name']] = [
+                { 'value': value, 'count': count, 'perc': perc, 
+                  'description': description, 'other': other }
+                for value, count, perc, description, other in zip(
+                    freqs.index.tolist(), freqs['count'].tolist(), freqs['perc'].tolist(),
+                    freqs['description'].tolist(), freqs['other'].tolist())
+            ]
+        return stats
+
+    def write_json(self, filepath=None):
+        """Export all frequencies to a JSON file (by default `statistics.json` 
+        in the output directory)"""
+        if filepath is None:
+            filepath = os.path.join(OUTPUT_DIR, 'statistics.json')
+        with open(filepath, 'w') as handle:
+            json.dump(self.to_dict(), handle, indent=2)
+        record_written(filepath)
+        logging.info(f"Statistics written to '{os.path.relpath(filepath, start=OUTPUT_DIR)}'")
+
+class ReadmeWriter(object):
+
+    def __init__(self, db_structure=DB_STRUCTURE, tables=None, statistics=None):
+        """
+        Args:
+            db_structure (dict, optional): the database structure
+            tables (CorpusTables, optional): the corpus tables. If not passed,
+                the tables are loaded from the CSV directory.
+            statistics (CorpusStatistics, optional): the statistics of the 
+                corpus. If not passed, these are computed from the tables.
+        """
+        self.db_structure = db_structure
+        if tables is None:
+            tables = CorpusTables(db_structure=db_structure)
+
+        if statistics is None:
+            statistics = CorpusStatistics(tables=tables, db_structure=db_structure)
+        self.statistics = statistics
+        # Only the reported columns are loaded (e.g. not the GABC code)
+        self.chants = statistics.table('chants')
+        self.chant_sources = statistics.table('chant_sources')
+        self.chant_tags = statistics.table('chant_tags')
+        self.sources = tables.sources
+        self.tags = tables.tags
 
     def table_structure(self, table_name):
         """Create a Markdown table describing the structure a database table:
@@ -410,16 +3048,12 @@ class ReadmeWriter(object):
             description = column['description']
             lines.append(f'| {name: <12} | {dtype: <4} | {description: <50} |')
 
-        for column in self.db_structure[table_name]:
-            if not 'report_value_counts' in column:
-                continue
+        for _, column in self.statistics.reported_columns(table_name):
             table = getattr(self, table_name)
             column_name = column['name']
-            value_counts = pd.value_counts(table[column_name])
-            value_descriptions = column.get('value_descriptions', {})
+            freqs = self.statistics.frequencies(table_name, column)
             title = f'#### Values of `{table_name}.{column_name}`\n'
             if 'value_description_table' in column:
-                value_descriptions = getattr(self, column['value_description_table'])
                 title = f'#### Frequencies of `{table_name}.{column_name}` values\n'
 
             lines.append('')
@@ -427,35 +3061,22 @@ class ReadmeWriter(object):
             lines.append('| Value        | Count | Perc. | Description                              |')
             lines.append('|--------------|------:|------:|------------------------------------------|')
 
-            others_count = 0
-            other_values = []
-            min_freq = column.get('report_min_freq', 0)
-            for value, count in value_counts.iteritems():
-                perc = count / len(table) * 100
-
-                if perc <= min_freq:
-                    others_count += count
-                    if 'value_description_table' in column:
-                        template = column['value_description_template']
-                        description = template.format(description=value_descriptions.loc[value, :])
-                        other_values.append(f'`{description}`')
-                    else:
-                        other_values.append(f'`{value}`')
-                    continue
-
-                if 'value_description_table' in column:
-                    template = column['value_description_template']
-                    description = template.format(description=value_descriptions.loc[value, :])
-                else:
-                    description = value_descriptions.get(value, '')
+            frequent = freqs[~freqs['other']]
+            for value, count, perc, description in zip(frequent.index, frequent['count'], 
+                frequent['perc'], frequent['description']):
                 lines.append(f'| {value: <12} | {count: >5} | {perc: >4.0f}% | {description: <40} |')
             
+            others = freqs[freqs['other']]
+            others_count = others['count'].sum()
             if others_count > 0:
                 perc = others_count / len(table) * 100
-                values = ", ".join(other_values)
+                if 'value_description_table' in column:
+                    other_values = others['description']
+                else:
+                    other_values = others.index
+                values = ", ".join(f'`{value}`' for value in other_values)
                 lines.append(f'| *others*     | {others_count: >5} | {perc: >4.0f}% | {values} |')
 
-
         return '\n'.join(lines)
 
     def get_changelog(self):
@@ -474,10 +3095,13 @@ class ReadmeWriter(object):
         logging.info('Writing README file...')
         now = datetime.datetime.now()
         corpus_date = now.strftime("%d %B %Y")
-        num_gabc_files = len([f for f in os.listdir(GABC_DIR) 
-            if os.path.isfile(os.path.join(GABC_DIR,f))])
-        num_html_files = len([f for f in os.listdir(HTML_DIR) 
-            if os.path.isfile(os.path.join(HTML_DIR,f))])
+        num_gabc_files = count_chant_files('gabc')
+        num_html_files = count_chant_files('html')
+        report_fn = os.path.join(OUTPUT_DIR, 'unconvertable.csv')
+        if os.path.exists(report_fn):
+            num_unconvertable = len(pd.read_csv(report_fn))
+        else:
+            num_unconvertable = len(self.chants) - num_html_files
 
         template_kws = {
             'version': __version__,
@@ -490,13 +3114,19 @@ class ReadmeWriter(object):
             'num_gabc_files': num_gabc_files,
             'num_html_files': num_html_files,
             'num_chants': len(self.chants),
-            'num_unconvertable': len(self.chants) - num_html_files,
+            'num_unconvertable': num_unconvertable,
             'num_sources': len(self.sources),
             'num_tags': len(self.tags),
             'corpus_date': corpus_date,
-            'changelog': self.get_changelog()
+            'changelog': self.get_changelog(),
+            'features_section': ''
         }
 
+        # Only document the features if they were extracted (see `--no-features`)
+        if FeatureTables().exists():
+            with open(os.path.join(SRC_DIR, 'readme_features.md'), 'r') as handle:
+                template_kws['features_section'] = handle.read()
+
         with open(os.path.join(SRC_DIR, 'readme_template.md'), 'r') as handle:
             template = handle.read()
             readme = template.format(**template_kws)
@@ -504,47 +3134,193 @@ class ReadmeWriter(object):
         readme_fn = os.path.join(OUTPUT_DIR, 'README.md')
         with open(readme_fn, 'w') as handle:
             handle.write(readme)
+        record_written(readme_fn)
+        self.statistics.write_json()
 
 ##
 
-def main():
+def main(argv=None):
     import argparse
     parser = argparse.ArgumentParser(description='Generate the GregoBase Corpus.')
-    parser.add_argument('--sql', type=str, required=True,
-                        help='path the gregobase database dump')
-    parser.add_argument('--date', type=str, required=True,
-                        help='the date on which gregobase was exported (you can find this in the sql file)')   
-    args = parser.parse_args()
-
-    # Clear output_dir before starting logging to that directory
-    if os.path.exists(OUTPUT_DIR):
+    parser.add_argument('--sql', type=str, default=None,
+                        help='path the gregobase database dump (required by the sql stage)')
+    parser.add_argument('--date', type=str, default=None,
+                        help='the date on which gregobase was exported (you can find this in the sql file; required by the readme stage)')   
+    parser.add_argument('--output-dir', type=str, default=None,
+                        help=f'the output directory (default: dist/gregobasecorpus-v{__version__})')
+    parser.add_argument('--stages', type=str, default=None,
+                        help=f'comma-separated list of stages to run on an existing output directory ({",".join(STAGES)}); by default all stages are run')
+    parser.add_argument('--shard', type=str, default=None,
+                        help='only build the gabc, validate and html stages for shard i of n (e.g. 2/4) in a separate directory')
+    parser.add_argument('--merge', type=int, default=None,
+                        help='merge the given number of shards, and run the pack, readme and compress stages')
+    parser.add_argument('--engine', type=str, default='mysql', choices=SQLConverter.engines,
+                        help='how to read the sql dump: import it in mysql, or parse it natively (no mysql needed)')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='number of worker processes used to validate and convert chants to html '
+                             '(by default, validation uses all cpus and the html conversion a single process)')
+    parser.add_argument('--timeout', type=int, default=None,
+                        help='maximum number of seconds the html conversion of a single chant can take')
+    parser.add_argument('--max-memory', type=int, default=None,
+                        help='maximum memory (in MB) of every html worker process')
+    parser.add_argument('--tar-zst', action='store_true',
+                        help='also compress the corpus to a .tar.zst archive (requires zstandard)')
+    parser.add_argument('--parquet', action='store_true',
+                        help='also export all tables and the gabc bodies to parquet files (requires pyarrow)')
+    parser.add_argument('--packed', action='store_true',
+                        help='pack the gabc and html files into a few indexed shard files')
+    parser.add_argument('--incremental', action='store_true',
+                        help='do not clear the output directory, and only regenerate chants that are new or have changed')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='export chants to gabc in chunks of this many chants to limit memory use')
+    parser.add_argument('--no-features', action='store_true',
+                        help='do not extract the feature tables (notes, syllables and words) of all chants')
+    parser.add_argument('--fast-html', action='store_true',
+                        help='convert chants to html without music21 where possible (see fast_html.py)')
+    parser.add_argument('--parse-cache', type=str, default=None,
+                        help='keep parsed chants in a cache in this directory, which can be reused by later builds (by default, no cache is used)')
+    parser.add_argument('--cache-size', type=int, default=2048,
+                        help='maximum size (in MB) of the cache of parsed chants (default: 2048)')
+    args = parser.parse_args(argv)
+    if args.output_dir is not None:
+        set_output_dir(args.output_dir)
+    shard = None
+    allowed_stages = STAGES
+    if args.shard is not None:
+        match = re.fullmatch(r'([0-9]+)/([0-9]+)', args.shard)
+        if match is None or not 1 <= int(match.group(1)) <= int(match.group(2)):
+            parser.error('--shard should be of the form i/n, with 1 <= i <= n')
+        shard = (int(match.group(1)), int(match.group(2)))
+        allowed_stages = ['gabc', 'validate', 'html']
+    if args.merge is not None:
+        if shard is not None:
+            parser.error('--shard and --merge cannot be used together')
+        if args.merge < 1:
+            parser.error('--merge should be at least 1')
+        allowed_stages = ['pack', 'readme', 'compress']
+    if args.stages is None:
+        stages = [stage for stage in allowed_stages
+                  if (stage != 'parquet' or args.parquet) and (stage != 'pack' or args.packed)]
+    else:
+        stages = args.stages.split(',')
+        for stage in stages:
+            if stage not in STAGES:
+                parser.error(f'Unknown stage: {stage}')
+            if stage not in allowed_stages:
+                parser.error(f"The {stage} stage cannot be run with {'--shard' if shard else '--merge'}")
+    if 'sql' in stages and args.sql is None:
+        parser.error('the sql stage requires --sql')
+    if 'readme' in stages and args.date is None:
+        parser.error('the readme stage requires --date')
+    if 'parquet' in stages and 'gabc' not in stages:
+        parser.error('the parquet stage requires the gabc stage')
+
+    # Shards read the CSV files of the output directory, but write all other
+    # files to a directory of their own
+    csv_dir = CSV_DIR
+    if shard is not None:
+        set_output_dir(shard_output_dir(*shard))
+
+    # Clear output_dir before starting logging to that directory, unless
+    # only some stages are run, or shards are merged into it
+    keep_output = args.incremental or args.stages is not None or args.merge is not None
+    if os.path.exists(OUTPUT_DIR) and not keep_output:
         shutil.rmtree(OUTPUT_DIR)
-    os.makedirs(OUTPUT_DIR)
+    if not os.path.exists(OUTPUT_DIR):
+        os.makedirs(OUTPUT_DIR)
 
     # Set up logging
     log_fn = os.path.join(OUTPUT_DIR, 'corpus-generation.log')
+    if args.merge is not None:
+        merge_shard_logs(args.merge, log_fn)
     logging.basicConfig(filename=log_fn,
-                        filemode='w',
+                        filemode='a' if keep_output else 'w',
                         format='%(levelname)s %(asctime)s %(message)s',
                         datefmt='%d-%m-%y %H:%M:%S',
                         level=logging.INFO)
     logging.info(f'Start generating GregoBase Corpus v{__version__}')
     logging.info(f"> Output directory: '{os.path.relpath(OUTPUT_DIR, start=ROOT_DIR)}'")
+    logging.info(f"> Stages: {', '.join(stages)}")
+    if shard is not None:
+        logging.info(f'> Shard: {shard[0]}/{shard[1]}')
 
     # Go!
-    sql = SQLConverter()
-    sql.convert_to_csv(filepath=args.sql)
-
-    csv = CSVConverter()
-    csv.convert_to_gabc()
+    metrics = BuildMetrics()
+    # Creating the archive removes the archive of a previous build
+    archive = CorpusArchive() if 'compress' in stages else None
+    if os.path.exists(PACKED_DIR) and ('gabc' in stages or 'html' in stages):
+        # Incremental builds need the loose files of the previous build
+        unpack_corpus(remove=True)
+    # Packed files are added to the archive when packing the corpus
+    chant_archive = None if 'pack' in stages else archive
+    if 'sql' in stages:
+        with metrics.stage('sql'):
+            sql = SQLConverter(engine=args.engine, archive=archive)
+            sql.convert_to_csv(filepath=args.sql)
+
+    tables = CorpusTables(csv_dir, shard=shard)
+    if args.merge is not None:
+        with metrics.stage('merge'):
+            merge_shards(args.merge, archive=chant_archive, metrics=metrics)
+            gabc = GABCConverter(tables=tables)
+            gabc.write_duplicates_report()
+
+    manifest = Manifest(os.path.join(OUTPUT_DIR, 'manifest.json'))
+    if 'gabc' in stages:
+        with metrics.stage('gabc'):
+            csv_converter = CSVConverter(tables=tables, archive=chant_archive, 
+                metrics=metrics, chunk_size=args.chunk_size, 
+                collect_texts='parquet' in stages)
+            csv_converter.convert_to_gabc(manifest=manifest)
+            manifest.save()
+
+    if 'parquet' in stages:
+        with metrics.stage('parquet'):
+            parquet = ParquetWriter(tables=tables, archive=archive)
+            parquet.write_tables()
+            parquet.write_chant_texts(csv_converter.chant_texts)
     
-    gabc = GABCConverter()
-    gabc.convert_to_html()
-
-    writer = ReadmeWriter()
-    writer.write_readme(gregobase_export_date=args.date)
-
-    compress_corpus()
+    invalid = None
+    if 'validate' in stages:
+        with metrics.stage('validate'):
+            validator = GABCValidator(tables=tables)
+            invalid = validator.validate(jobs=args.jobs)
+
+    if 'html' in stages:
+        with metrics.stage('html'):
+            features = None
+            if not args.no_features:
+                features = FeatureTables()
+            elif os.path.exists(FEATURES_DIR):
+                shutil.rmtree(FEATURES_DIR)
+            gabc = GABCConverter(tables=tables, archive=chant_archive, metrics=metrics,
+                                 features=features)
+            max_memory = args.max_memory * 2**20 if args.max_memory else None
+            cache = None
+            if args.parse_cache is not None:
+                cache = ParseCache(args.parse_cache, max_size=args.cache_size * 2**20)
+            gabc.convert_to_html(jobs=args.jobs or 1, timeout=args.timeout, max_memory=max_memory,
+                                 manifest=manifest, cache=cache, fast=args.fast_html,
+                                 invalid=invalid)
+            gabc.write_duplicates_report()
+            gabc.write_unconvertable_report()
+            if features is not None:
+                features.write(keep=gabc.unchanged)
+            manifest.save()
+
+    if 'pack' in stages:
+        with metrics.stage('pack'):
+            pack_corpus(archive)
+
+    if 'readme' in stages:
+        with metrics.stage('readme'):
+            writer = ReadmeWriter(tables=tables)
+            writer.write_readme(gregobase_export_date=args.date)
+
+    if 'compress' in stages:
+        with metrics.stage('compress'):
+            compress_corpus(archive, tar_zst=args.tar_zst)
+    metrics.write_report(OUTPUT_DIR)
 
 if __name__ == '__main__':
     main()
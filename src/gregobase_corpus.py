@@ -0,0 +1,200 @@
+"""
+Load a (generated) GregoBase Corpus, select chants and parse them.
+
+The corpus tables are only loaded when they are first needed, and indexes
+(by mode, office part, tag, source, year and cantus id) are built once, so
+that selecting chants is a lookup rather than a scan of the chants table.
+Chants are only parsed (using chant21) when they are accessed, and recently
+parsed chants are kept in memory. For example:
+
+```python
+from gregobase_corpus import GregoBaseCorpus
+corpus = GregoBaseCorpus('../dist/gregobasecorpus-v0.4')
+ids = corpus.select(office_part='in', mode='1', source=3)
+for chant in corpus.chants(ids):
+    chant.show()
+print(corpus.errors)  # Chants that could not be parsed
+```
+"""
+import os
+import collections
+from generate_corpus import CorpusTables, ShardReader, FeatureTables, converter
+
+class ChantParseError(Exception):
+    """Raised when chant21 cannot parse the GABC code of a chant"""
+
+class GregoBaseCorpus(object):
+    """A read-only view of a generated GregoBase Corpus"""
+
+    criteria = ['mode', 'office_part', 'tag', 'source', 'year', 'cantus_id']
+    """list: the criteria that can be used to select chants"""
+
+    def __init__(self, directory, cache_size=256, parse_cache=None):
+        """
+        Args:
+            directory (str): the directory of the corpus (an unzipped release,
+                with loose or packed GABC files)
+            cache_size (int, optional): the number of parsed chants kept in
+                memory. Defaults to 256.
+            parse_cache (ParseCache, optional): a persistent cache of parsed
+                chants (see `generate_corpus.ParseCache`). Defaults to None.
+        """
+        if not os.path.exists(directory):
+            raise Exception(f'Corpus directory not found: {directory}')
+        self.directory = directory
+        self.tables = CorpusTables(os.path.join(directory, 'csv'))
+        self.cache_size = cache_size
+        self.parse_cache = parse_cache
+        self.cache = collections.OrderedDict()
+        self._indexes = {}
+        self._shards = None
+        self._features = None
+        self.errors = {}
+
+    def __len__(self):
+        return len(self.ids())
+
+    def ids(self):
+        """Return the ids of all chants. Only the index of the chants table is
+        loaded (not e.g. the GABC code)."""
+        return self.tables.columns('chants').index
+
+    def index(self, criterion):
+        """Return the index for a criterion: a dictionary mapping values to the
+        (frozen) set of ids of chants with that value. The index is built when
+        it is first used."""
+        if criterion not in self._indexes:
+            self._indexes[criterion] = self.build_index(criterion)
+        return self._indexes[criterion]
+
+    def build_index(self, criterion):
+        """Build the index for a criterion"""
+        if criterion in ['mode', 'office_part', 'cantus_id']:
+            chants = self.tables.columns('chants', [criterion])
+            groups = chants.groupby(criterion, observed=True).groups
+        elif criterion == 'tag':
+            chant_tags = self.tables.chant_tags
+            groups = chant_tags.index.groupby(chant_tags['tag_id'])
+        elif criterion == 'source':
+            chant_sources = self.tables.chant_sources
+            groups = chant_sources.index.groupby(chant_sources['source'])
+        elif criterion == 'year':
+            chant_sources = self.tables.chant_sources
+            years = self.tables.columns('sources', ['year'])['year']
+            years = chant_sources['source'].map(years)
+            groups = chant_sources.index.groupby(years)
+        else:
+            raise Exception(f'Unknown criterion: {criterion}')
+        return { value: frozenset(int(idx) for idx in ids)
+                 for value, ids in groups.items() }
+
+    def select(self, **criteria):
+        """Select chants that match all criteria. A criterion can be a single
+        value or a list of values (any of which should match). Tags can be
+        passed by id or by name. For example:
+        ``corpus.select(office_part='in', mode=['1', '2'], tag='Pascha')``
+
+        Returns:
+            list: the sorted ids of all matching chants
+        """
+        selection = None
+        for criterion, values in criteria.items():
+            if criterion not in self.criteria:
+                raise Exception(f'Unknown criterion: {criterion}')
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            if criterion == 'tag':
+                values = [self.tag_id(value) for value in values]
+            index = self.index(criterion)
+            matches = set()
+            for value in values:
+                matches.update(index.get(value, ()))
+            selection = matches if selection is None else selection & matches
+        if selection is None:
+            return list(self.ids())
+        return sorted(selection)
+
+    def tag_id(self, tag):
+        """Return the id of a tag given its name (or id)"""
+        if isinstance(tag, str):
+            tags = self.tables.tags
+            matches = tags.index[tags['tag'] == tag]
+            return int(matches[0]) if len(matches) > 0 else None
+        return tag
+
+    def metadata(self, idx):
+        """Return the row of a chant in the chants table"""
+        return self.tables.chants.loc[idx]
+
+    def gabc(self, idx):
+        """Return the contents of the GABC file of a chant"""
+        gabc_path = os.path.join(self.directory, 'gabc', f'{idx:0>5}.gabc')
+        if os.path.exists(gabc_path):
+            with open(gabc_path, 'r') as handle:
+                return handle.read()
+        packed_dir = os.path.join(self.directory, 'packed')
+        if self._shards is None and ShardReader.exists('gabc', packed_dir):
+            self._shards = ShardReader('gabc', packed_dir)
+        if self._shards is not None and idx in self._shards:
+            return self._shards.get(idx)
+        raise KeyError(f'No GABC file found for chant {idx}')
+
+    def features(self):
+        """Return the feature tables of the corpus, extracted when the corpus was
+        generated (see `generate_corpus.FeatureTables`), without parsing any 
+        chants.
+
+        Returns:
+            tuple: an array with the ids of all chants with features, and 
+                DataFrames with all notes, syllables and words
+        """
+        if self._features is None:
+            tables = FeatureTables(os.path.join(self.directory, 'features'))
+            if not tables.exists():
+                raise Exception(f'No feature tables found in {self.directory}')
+            self._features = tables.read()
+        return self._features
+
+    def parse(self, idx):
+        """Parse a chant using chant21. Raises a `ChantParseError` if chant21
+        cannot parse the chant, and a KeyError if the chant has no GABC file."""
+        gabc_path = os.path.join(self.directory, 'gabc', f'{idx:0>5}.gabc')
+        use_cache = self.parse_cache is not None and os.path.exists(gabc_path)
+        gabc = None if use_cache else self.gabc(idx)
+        # chant21 raises plain exceptions for GABC code it cannot handle
+        try:
+            if use_cache:
+                chant, _ = self.parse_cache.parse(gabc_path)
+                return chant
+            return converter.parse(gabc,
+                format='gabc', forceSource=True, storePickle=False)
+        except MemoryError:
+            raise
+        except Exception as e:
+            raise ChantParseError(f'Chant {idx} could not be parsed: {e}') from e
+
+    def chant(self, idx):
+        """Return the parsed chant with a given id. The most recently used
+        chants are cached."""
+        if idx in self.cache:
+            self.cache.move_to_end(idx)
+            return self.cache[idx]
+        chant = self.parse(idx)
+        self.cache[idx] = chant
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return chant
+
+    def chants(self, ids=None):
+        """Iterate over the parsed chants with the given ids (by default, all
+        chants). Chants that cannot be parsed are skipped, and the reason why
+        is stored in ``errors`` (by chant id)."""
+        if ids is None:
+            ids = self.ids()
+        for idx in ids:
+            try:
+                chant = self.chant(idx)
+            except ChantParseError as e:
+                self.errors[idx] = str(e)
+                continue
+            yield chant
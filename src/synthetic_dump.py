@@ -0,0 +1,208 @@
+"""
+Generate synthetic GregoBase database dumps of arbitrary size.
+
+The dumps follow the column schema in `db_structure.json` and mimic the
+peculiarities of the real GregoBase data: gabc stored either as a quoted
+string with escaped unicode characters or as a JSON list of tex/gabc parts,
+chants appearing in several sources and having several tags, and so on. They
+can be converted using both the mysql and the native engine. Usage:
+
+```bash
+$ python synthetic_dump.py --chants=10000 --output=../dist/synthetic-10000.sql
+```
+"""
+import os
+import json
+import random
+import datetime
+
+SRC_DIR = os.path.dirname(__file__)
+db_structure_fn = os.path.join(SRC_DIR, 'db_structure.json')
+with open(db_structure_fn, 'r') as handle:
+    DB_STRUCTURE = json.load(handle)
+
+WORDS = ['Dominus', 'Deus', 'gloria', 'alleluia', 'Kyrie', 'eleison', 'sanctus',
+    'caeli', 'terra', 'spiritus', 'laudate', 'pueri', 'Domini', 'nomen', 'benedictus',
+    'veni', 'lux', 'aeterna', 'requiem', 'exsultate', 'justi', 'misericordia']
+ACCENTED_WORDS = ['Jesú', 'Cæli', 'gloriæ', 'adorémus', 'Dóminus', 'Kýrie', 
+    'eléison', 'ǽterna']
+CLEFS = ['c1', 'c2', 'c3', 'c4', 'f3', 'f4', 'cb3']
+PITCHES = 'cdefghijklm'
+NEUME_SUFFIXES = ['', '', '', '.', '_', "'", 'o', 'w', 'v', '~', 's', '..']
+BARS = [',', ';', ':', '::']
+OFFICE_PARTS = [key for col in DB_STRUCTURE['chants'] if col['name'] == 'office_part'
+                for key in col['value_descriptions'].keys()]
+MODES = [key for col in DB_STRUCTURE['chants'] if col['name'] == 'mode'
+         for key in col['value_descriptions'].keys()]
+MODE_VARS = ['a', 'b', 'c', 'd', 'D', 'e', 'f', 'g', 'g2', 'G*', 'a*']
+
+def random_neume(rng):
+    """Return a random neume, e.g. `fgh` or `h.`"""
+    start = rng.randrange(len(PITCHES) - 3)
+    length = rng.choice([1, 1, 1, 2, 2, 3, 4])
+    neume = ''
+    for _ in range(length):
+        start = max(0, min(len(PITCHES) - 1, start + rng.choice([-2, -1, 1, 1, 2])))
+        neume += PITCHES[start]
+    return neume + rng.choice(NEUME_SUFFIXES)
+
+def random_word(rng, accents=True):
+    """Return a random (latin) word, possibly with accents"""
+    if accents and rng.random() < 0.15:
+        return rng.choice(ACCENTED_WORDS)
+    return rng.choice(WORDS)
+
+def random_gabc(rng, num_words=None, accents=True):
+    """Return a random gabc body: a clef, followed by words split in syllables
+    with neumes and occasional bars."""
+    if num_words is None:
+        num_words = int(rng.expovariate(1 / 25)) + 2
+    parts = [f'({rng.choice(CLEFS)})']
+    for _ in range(num_words):
+        word = random_word(rng, accents=accents)
+        size = max(1, len(word) // 3)
+        syllables = [word[i:i + size] for i in range(0, len(word), size)]
+        parts.append(''.join(f'{syl}({random_neume(rng)})' for syl in syllables))
+        if rng.random() < 0.2:
+            parts.append(f'({rng.choice(BARS)})')
+    parts.append('(::)')
+    return ' '.join(parts)
+
+def random_text(rng, min_words=1, max_words=5):
+    """Return a random text"""
+    num_words = rng.randint(min_words, max_words)
+    return ' '.join(random_word(rng, accents=False) for _ in range(num_words))
+
+def generate_tables(num_chants, num_sources=None, num_tags=None, seed=0):
+    """Generate synthetic contents for all tables of the GregoBase database.
+
+    Args:
+        num_chants (int): the number of chants
+        num_sources (int, optional): the number of sources. By default this
+            scales with the number of chants.
+        num_tags (int, optional): the number of tags. By default this scales
+            with the number of chants.
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        dict: maps table names to lists of rows. Every row is a list with values
+            for all columns in the order of the database structure; None is used
+            for NULL.
+    """
+    rng = random.Random(seed)
+    if num_sources is None:
+        num_sources = max(3, num_chants // 300)
+    if num_tags is None:
+        num_tags = max(10, num_chants // 50)
+
+    tags = [[i, random_text(rng, 1, 3)] for i in range(1, num_tags + 1)]
+    sources = []
+    for i in range(1, num_sources + 1):
+        sources.append([i, rng.randint(1850, 2015), random_text(rng, 1, 2),
+            f'Liber {random_text(rng, 1, 3)}', random_text(rng, 0, 20) or None,
+            None, json.dumps(list(range(1, rng.randint(2, 40))))])
+
+    chants = []
+    chant_sources = []
+    chant_tags = []
+    for i in range(1, num_chants + 1):
+        form = rng.random()
+        if form < 0.8:
+            # A quoted string in which unicode characters are escaped
+            gabc = json.dumps(random_gabc(rng))
+        elif form < 0.95:
+            parts = []
+            for _ in range(rng.randint(1, 4)):
+                if rng.random() < 0.7:
+                    parts.append(['gabc', random_gabc(rng, accents=False), 0])
+                else:
+                    parts.append(['tex', random_text(rng), 0])
+            gabc = json.dumps(parts)
+        elif form < 0.98:
+            gabc = None
+        else:
+            gabc = ''
+        gabc_verses = None
+        if rng.random() < 0.05:
+            gabc_verses = '\n' + random_gabc(rng, num_words=10, accents=False)
+
+        chants.append([
+            i,
+            f'g{rng.randint(0, 9999):0>5}' if rng.random() < 0.6 else None,
+            rng.choice(['Vatican', 'Solesmes', '', '']),
+            random_text(rng, 1, 4),
+            rng.choice([0, 1, 1, 2]),
+            rng.choice(OFFICE_PARTS),
+            rng.choice(MODES + ['']),
+            rng.choice(MODE_VARS) if rng.random() < 0.4 else None,
+            random_text(rng, 1, 2) if rng.random() < 0.5 else '',
+            random_text(rng, 2, 8) if rng.random() < 0.3 else '',
+            gabc,
+            gabc_verses,
+            None,
+            random_text(rng, 2, 12) if rng.random() < 0.1 else ''
+        ])
+
+        for source in rng.sample(range(1, num_sources + 1), min(num_sources, rng.choice([0, 1, 1, 1, 2, 3]))):
+            chant_sources.append([i, source, str(rng.randint(1, 1000)), rng.randint(1, 5), rng.randint(1, 3)])
+        for tag in rng.sample(range(1, num_tags + 1), min(num_tags, rng.choice([0, 0, 1, 2, 3, 5]))):
+            chant_tags.append([i, tag])
+
+    return {
+        'chant_tags': chant_tags,
+        'chants': chants,
+        'tags': tags,
+        'sources': sources,
+        'chant_sources': chant_sources
+    }
+
+def sql_value(value):
+    """Format a value as a MySQL literal"""
+    if value is None:
+        return 'NULL'
+    elif type(value) == int:
+        return str(value)
+    value = (value.replace('\\', '\\\\').replace("'", "\\'")
+             .replace('\n', '\\n').replace('\r', '\\r'))
+    return f"'{value}'"
+
+def write_dump(tables, filepath, db_prefix='gregobase_', db_structure=DB_STRUCTURE,
+    batch_size=500):
+    """Write a MySQL dump (in the style of phpMyAdmin) of the tables"""
+    with open(filepath, 'w', encoding='utf-8') as handle:
+        now = datetime.datetime.now().strftime('%b %d, %Y at %I:%M %p')
+        handle.write('-- Synthetic GregoBase dump\n')
+        handle.write(f'-- Generation Time: {now}\n\n')
+        handle.write('SET SQL_MODE = "NO_AUTO_VALUE_ON_ZERO";\n')
+        handle.write('/*!40101 SET NAMES utf8mb4 */;\n\n')
+        for table_name, rows in tables.items():
+            columns = db_structure[table_name]
+            definitions = ',\n'.join(
+                f"  `{col['name']}` {'int(11)' if col['dtype'] == 'int' else 'mediumtext'} DEFAULT NULL"
+                for col in columns)
+            handle.write(f'CREATE TABLE `{db_prefix}{table_name}` (\n{definitions}\n)'
+                          ' ENGINE=MyISAM DEFAULT CHARSET=utf8mb4;\n\n')
+            names = ', '.join(f"`{col['name']}`" for col in columns)
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                handle.write(f'INSERT INTO `{db_prefix}{table_name}` ({names}) VALUES\n')
+                values = ',\n'.join(
+                    '(' + ', '.join(sql_value(value) for value in row) + ')'
+                    for row in batch)
+                handle.write(values + ';\n\n')
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Generate a synthetic GregoBase dump.')
+    parser.add_argument('--chants', type=int, required=True,
+                        help='number of chants')
+    parser.add_argument('--output', type=str, required=True,
+                        help='path of the sql file')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed')
+    args = parser.parse_args()
+    tables = generate_tables(args.chants, seed=args.seed)
+    write_dump(tables, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""
+Unpack a packed GregoBase Corpus (generated with `--packed`) to the usual
+layout with one file per chant (`gabc/00001.gabc`, `html/00001.html`, etc.).
+Usage:
+
+```bash
+$ python unpack_corpus.py ../dist/gregobasecorpus-v0.4
+```
+"""
+import logging
+from generate_corpus import unpack_corpus
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Unpack a packed GregoBase Corpus.')
+    parser.add_argument('directory', type=str,
+                        help='the directory of the corpus')
+    parser.add_argument('--remove', action='store_true',
+                        help='remove the shards after unpacking them')
+    args = parser.parse_args()
+    logging.basicConfig(format='%(levelname)s %(message)s', level=logging.INFO)
+    unpack_corpus(args.directory, remove=args.remove)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), os.path.pardir, 'src')
+sys.path.insert(0, os.path.abspath(SRC_DIR))
+
+import generate_corpus as gc
+import synthetic_dump
+
+@pytest.fixture(autouse=True)
+def restore_output_dir():
+    """Tests change the (global) output directory; restore it afterwards"""
+    output_dir = gc.OUTPUT_DIR
+    yield
+    gc.set_output_dir(output_dir)
+
+@pytest.fixture(scope='session')
+def synthetic_tables():
+    return synthetic_dump.generate_tables(40, seed=1)
+
+@pytest.fixture(scope='session')
+def synthetic_sql(tmp_path_factory, synthetic_tables):
+    filepath = str(tmp_path_factory.mktemp('dumps') / 'synthetic.sql')
+    synthetic_dump.write_dump(synthetic_tables, filepath)
+    return filepath
+
+def build_corpus(output_dir, sql, *args):
+    """Build a corpus from a dump using the native engine, like running
+    ``generate_corpus.py`` from the command line with the given arguments"""
+    argv = ['--output-dir', str(output_dir), '--sql', sql, '--engine', 'native',
+            '--date', 'test']
+    gc.main(argv + [str(arg) for arg in args])
+    return str(output_dir)
+
+def read_files(directory):
+    """Return the contents (bytes) of all files in a directory (but not in its
+    subdirectories), by name"""
+    files = {}
+    for name in sorted(os.listdir(directory)):
+        if os.path.isdir(os.path.join(directory, name)):
+            continue
+        with open(os.path.join(directory, name), 'rb') as handle:
+            files[name] = handle.read()
+    return files
@@ -0,0 +1,68 @@
+import os
+import zipfile
+
+import generate_corpus as gc
+
+def write_files(directory, files):
+    for name, contents in files.items():
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(contents)
+
+def archive_output_dir(tmp_path, files):
+    gc.set_output_dir(str(tmp_path / 'corpus'))
+    write_files(gc.OUTPUT_DIR, files)
+    archive = gc.CorpusArchive()
+    # Some files are added while the corpus is generated, the others on closing
+    for name in sorted(files)[::2]:
+        archive.add(os.path.join(gc.OUTPUT_DIR, name))
+    archive.close()
+    return archive.filepath
+
+FILES = {
+    'README.md': b'# Corpus\r\n',
+    'csv/chants.csv': b'id,gabc\n1,"(c4) A(f)"\n' * 1000,
+    'gabc/00001.gabc': os.urandom(100000),
+    'html/00001.html': b'',
+    'manifest.json': b'{}',
+}
+
+def test_archive_contains_all_files(tmp_path):
+    filepath = archive_output_dir(tmp_path, FILES)
+    with zipfile.ZipFile(filepath) as archive:
+        assert archive.testzip() is None
+        names = archive.namelist()
+        contents = { name: archive.read(name) for name in names if not name.endswith('/') }
+    assert set(names) >= { 'csv/', 'gabc/', 'html/' }
+    expected = { name: data for name, data in FILES.items() if name != 'manifest.json' }
+    assert contents == expected
+
+def test_archive_uses_zip64_for_large_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(zipfile, 'ZIP64_LIMIT', 1000)
+    monkeypatch.setattr(zipfile, 'ZIP_FILECOUNT_LIMIT', 3)
+    filepath = archive_output_dir(tmp_path, FILES)
+    monkeypatch.undo()
+    with zipfile.ZipFile(filepath) as archive:
+        assert archive.testzip() is None
+        assert archive.read('csv/chants.csv') == FILES['csv/chants.csv']
+    with open(filepath, 'rb') as handle:
+        # Signature of the zip64 end of central directory record
+        assert b'PK\x06\x06' in handle.read()
+
+def test_archive_excludes_build_files(tmp_path):
+    # e.g. a performance report left by an earlier partial build
+    files = dict(FILES)
+    for name in gc.CorpusArchive.excluded:
+        files[name] = b'{}'
+    gc.set_output_dir(str(tmp_path / 'corpus'))
+    write_files(gc.OUTPUT_DIR, files)
+    archive = gc.CorpusArchive()
+    # Excluded files are also ignored when they are added explicitly
+    for name in gc.CorpusArchive.excluded:
+        archive.add(os.path.join(gc.OUTPUT_DIR, name))
+    archive.close()
+    with zipfile.ZipFile(archive.filepath) as archive:
+        names = set(archive.namelist())
+    assert names.isdisjoint(gc.CorpusArchive.excluded)
+    assert 'README.md' in names
@@ -0,0 +1,56 @@
+import os
+
+import generate_corpus as gc
+from conftest import build_corpus, read_files
+
+def test_parse_cache_round_trip(tmp_path, synthetic_sql):
+    corpus = build_corpus(tmp_path / 'corpus', synthetic_sql, '--stages', 'sql,gabc')
+    cache = gc.ParseCache(str(tmp_path / 'cache'))
+    gabc_dir = os.path.join(corpus, 'gabc')
+    for filename in sorted(os.listdir(gabc_dir))[:5]:
+        gabc_path = os.path.join(gabc_dir, filename)
+        parsed, cached = cache.parse(gabc_path)
+        assert not cached
+        restored, cached = cache.parse(gabc_path)
+        assert cached
+        # Also the slots that are not pickled by music21 itself
+        for obj, restored_obj in zip(parsed.recurse(includeSelf=True), 
+                                     restored.recurse(includeSelf=True)):
+            assert type(obj) == type(restored_obj)
+            for slot in gc.ParseCache.slots:
+                assert (getattr(obj, slot, None) is None) == \
+                       (getattr(restored_obj, slot, None) is None)
+        html, restored_html = tmp_path / 'parsed.html', tmp_path / 'restored.html'
+        for chant, html_path in [(parsed, html), (restored, restored_html)]:
+            assert gc.render_chant_to_html(1, chant, str(html_path), {}) is None
+        assert html.read_bytes() == restored_html.read_bytes()
+
+def test_cached_build_equals_uncached_build(tmp_path, synthetic_sql):
+    uncached = build_corpus(tmp_path / 'uncached', synthetic_sql)
+    cache_dir = tmp_path / 'cache'
+    # Fill the cache, then build from the cache only
+    build_corpus(tmp_path / 'cold', synthetic_sql, '--parse-cache', cache_dir)
+    assert len(os.listdir(cache_dir)) > 0
+    cached = build_corpus(tmp_path / 'cached', synthetic_sql, '--parse-cache', cache_dir)
+    for corpus in [os.path.join(tmp_path, 'cold'), cached]:
+        for directory in ['html', 'features']:
+            assert read_files(os.path.join(corpus, directory)) == \
+                   read_files(os.path.join(uncached, directory))
+        assert read_files(corpus)['unconvertable.csv'] == \
+               read_files(uncached)['unconvertable.csv']
+
+def test_evict_removes_least_recently_used_entries(tmp_path, monkeypatch):
+    cache = gc.ParseCache(str(tmp_path / 'cache'), max_size=250)
+    for i in range(5):
+        path = cache.path(f'entry{i}')
+        with open(path, 'wb') as handle:
+            handle.write(b'x' * 100)
+        os.utime(path, (i, i))
+    # Another build sharing the cache removes an entry at the same time
+    remove = os.remove
+    def remove_twice(path):
+        remove(path)
+        remove(path)
+    monkeypatch.setattr(os, 'remove', remove_twice)
+    cache.evict()
+    assert sorted(os.listdir(cache.directory)) == [f'entry{i}.pickle' for i in [3, 4]]
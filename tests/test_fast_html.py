@@ -0,0 +1,46 @@
+import logging
+import os
+
+import generate_corpus as gc
+from conftest import build_corpus, read_files
+
+def test_fast_html_build_equals_default_build(tmp_path, synthetic_sql, caplog):
+    default = build_corpus(tmp_path / 'default', synthetic_sql)
+    with caplog.at_level(logging.WARNING):
+        fast = build_corpus(tmp_path / 'fast', synthetic_sql, '--fast-html')
+    assert 'Unexpected error in the fast renderer' not in caplog.text
+    for directory in ['html', 'features']:
+        assert read_files(os.path.join(fast, directory)) == \
+               read_files(os.path.join(default, directory))
+    assert read_files(fast)['unconvertable.csv'] == read_files(default)['unconvertable.csv']
+
+def test_fast_renderer_falls_back_on_unsupported_chants(tmp_path, caplog):
+    gabc_path = tmp_path / 'unbalanced.gabc'
+    gabc_path.write_text('name:Test;\n%%\n(c4) A(fg')
+    html_path = tmp_path / 'unbalanced.html'
+    with caplog.at_level(logging.WARNING):
+        assert not gc.render_chant_fast(str(gabc_path), str(html_path))
+    assert caplog.text == ''
+
+def test_fast_renderer_logs_unexpected_errors(tmp_path, monkeypatch, caplog):
+    import fast_html
+    def fail(gabc_path, html_path):
+        raise ValueError('a bug')
+    monkeypatch.setattr(fast_html, 'render_gabc_to_html', fail)
+    with caplog.at_level(logging.WARNING):
+        assert not gc.render_chant_fast(str(tmp_path / '00001.gabc'), 
+                                        str(tmp_path / '00001.html'))
+    assert "Unexpected error in the fast renderer for '00001.gabc'" in caplog.text
+    assert 'a bug' in caplog.text
+
+def test_fast_renderer_and_chant21_fail_on_same_chant(tmp_path, caplog):
+    # The inherited chant21 visitor raises an IndexError for this annotation
+    gabc_path = tmp_path / 'annotation.gabc'
+    gabc_path.write_text('name:Test;\n%%\n(c4) <c>*</c>(g) A(g)')
+    html_path = tmp_path / 'annotation.html'
+    with caplog.at_level(logging.WARNING):
+        assert not gc.render_chant_fast(str(gabc_path), str(html_path))
+    assert caplog.text == ''
+    error = gc.convert_chant_to_html(1, str(gabc_path), str(html_path))
+    assert error == 'Chant 1 could not be parsed: list index out of range'
+    assert not os.path.exists(html_path)
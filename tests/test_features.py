@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pytest
+
+import generate_corpus as gc
+from conftest import build_corpus
+
+def features(pitches, num_syllables=1):
+    """Features of a chant with a note of every pitch (see `extract_features`)"""
+    num_notes = len(pitches)
+    return {
+        'notes': { 'pitch': pitches, 'liquescent': [False] * num_notes,
+                   'neume': list(range(num_notes)), 'syllable': [0] * num_notes },
+        'syllables': [(0, 0, i, 'la', '', num_notes, num_notes, '1---f') 
+                      for i in range(num_syllables)],
+        'words': [(0, 0, 'la', num_syllables, num_notes)],
+    }
+
+PITCHES = { 3: [29, 30, 31], 1: [32], 7: [], 5: [28, 27] }
+
+def test_offsets_select_the_notes_of_every_chant(tmp_path):
+    tables = gc.FeatureTables(str(tmp_path / 'features'))
+    for idx, pitches in PITCHES.items():
+        tables.add(idx, features(pitches))
+    tables.write()
+    with np.load(tables.path('notes.npz')) as data:
+        chant_ids, offsets, pitch = data['chant_ids'], data['offsets'], data['pitch']
+    assert chant_ids.tolist() == [1, 3, 5, 7]
+    assert offsets.tolist() == [0, 1, 4, 6, 6]
+    for i, idx in enumerate(chant_ids):
+        assert pitch[offsets[i]:offsets[i + 1]].tolist() == PITCHES[idx]
+
+    # Keep the features of some chants when writing those of others
+    tables = gc.FeatureTables(str(tmp_path / 'features'))
+    tables.add(3, features([40]))
+    tables.write(keep=[5, 7])
+    chant_ids, notes, syllables, words = tables.read()
+    assert chant_ids.tolist() == [3, 5, 7]
+    assert notes['chant_id'].tolist() == [3, 5, 5]
+    assert notes['pitch'].tolist() == [40, 28, 27]
+    assert syllables['chant_id'].tolist() == [3, 5, 7]
+
+def test_merge_requires_features_of_all_shards(tmp_path):
+    directories = [str(tmp_path / f'shard-{i}') for i in range(3)]
+    for i, directory in enumerate(directories[:2]):
+        tables = gc.FeatureTables(directory)
+        tables.add(i, features([29]))
+        tables.write()
+    with pytest.raises(Exception, match='No feature tables found'):
+        gc.FeatureTables.merge(directories, str(tmp_path / 'merged'))
+    gc.FeatureTables.merge(directories[:2], str(tmp_path / 'merged'))
+    assert gc.FeatureTables(str(tmp_path / 'merged')).read()[0].tolist() == [0, 1]
+
+def test_failing_feature_extraction_writes_no_html(tmp_path, monkeypatch, synthetic_sql):
+    corpus = build_corpus(tmp_path / 'corpus', synthetic_sql, '--stages', 'sql,gabc')
+    gabc_dir = os.path.join(corpus, 'gabc')
+    gabc_path = os.path.join(gabc_dir, sorted(os.listdir(gabc_dir))[0])
+    chant = gc.converter.parse(gabc_path, format='gabc', forceSource=True, storePickle=False)
+    def fail(obj):
+        raise ValueError('no features')
+    monkeypatch.setattr(gc, 'extract_features', fail)
+    html_path = str(tmp_path / 'chant.html')
+    error = gc.render_chant_to_html(1, chant, html_path, {}, features={})
+    assert error == 'Chant 1 could not be converted to HTML: no features'
+    assert not os.path.exists(html_path)
+
+@pytest.mark.parametrize('no_features', [False, True])
+def test_readme_only_documents_extracted_features(tmp_path, synthetic_sql, no_features):
+    args = ['--no-features'] if no_features else []
+    corpus = build_corpus(tmp_path / 'corpus', synthetic_sql, *args)
+    with open(os.path.join(corpus, 'README.md'), 'r') as handle:
+        readme = handle.read()
+    assert ('\nFeatures\n--------\n' in readme) != no_features
+    assert os.path.exists(os.path.join(corpus, 'features')) != no_features
+    assert '\nTables\n------\n' in readme
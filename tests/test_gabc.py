@@ -0,0 +1,65 @@
+import json
+
+import pandas as pd
+
+import generate_corpus as gc
+from conftest import build_corpus
+
+def extract_gabc_body(chant):
+    """The original per-row extraction of a gabc body, which returns False (and
+    logs an error) if it cannot be extracted"""
+    if type(chant.gabc) != str:
+        return ""
+    elif not chant.gabc.startswith('"'):
+        try:
+            parts = json.loads(chant.gabc)
+            gabc = ""
+            for format, contents, _ in parts:
+                if format == 'gabc':
+                    gabc += contents
+                elif format == 'tex':
+                    gabc += f' <v>{contents}</v>() '
+        except Exception:
+            return False
+    elif chant.gabc.startswith('"') and chant.gabc.endswith('"'):
+        gabc = chant.gabc[1:len(chant.gabc)-1]
+    else:
+        return False
+    try:
+        gabc = gabc.encode('latin1').decode('unicode-escape')
+    except Exception:
+        return False
+    if not pd.isnull(chant['gabc_verses']):
+        gabc += chant['gabc_verses']
+    return gabc
+
+def test_batch_extraction_equals_per_row_extraction(tmp_path, synthetic_sql):
+    build_corpus(tmp_path / 'corpus', synthetic_sql, '--stages', 'sql')
+    converter = gc.CSVConverter()
+    values = [
+        '"(c4) A(g) B(h)"',
+        '"(c4) A\\u00e9(g)"',
+        json.dumps([['gabc', '(c4) A(g)', 0], ['tex', 'text', 1], ['gabc', ' B(h)', 2]]),
+        None,
+        '',
+        '"unclosed',
+        '[["gabc", "(c4)"',
+        json.dumps([['gabc', '(c4)']]),
+        json.dumps([1, 2, 3]),
+        json.dumps(12),
+        json.dumps({ 'gabc': '(c4)' }),
+        json.dumps([['gabc', 5, 0]]),
+        '"\\x"',
+    ]
+    chants = pd.DataFrame({
+        'gabc': values,
+        'gabc_verses': ['\n(c4) V(g)' if i % 3 == 0 else None for i in range(len(values))],
+    }, index=pd.Index(range(1, len(values) + 1), name='id'))
+    bodies, errors = converter.extract_gabc_bodies(chants)
+    for idx, chant in chants.iterrows():
+        expected = extract_gabc_body(chant)
+        if expected is False:
+            assert idx in errors.index and idx not in bodies.index
+        else:
+            assert bodies[idx] == expected and idx not in errors.index
+    assert len(bodies) + len(errors) == len(chants)
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from conftest import build_corpus
+from generate_corpus import CorpusTables
+from gregobase_corpus import GregoBaseCorpus, ChantParseError
+
+@pytest.fixture
+def corpus_dir(tmp_path, synthetic_sql):
+    return build_corpus(tmp_path / 'corpus', synthetic_sql, '--stages', 'sql,gabc')
+
+def test_chants_skips_and_reports_unparseable_chants(corpus_dir):
+    gabc_dir = os.path.join(corpus_dir, 'gabc')
+    ids = sorted(int(filename.split('.')[0]) for filename in os.listdir(gabc_dir))[:3]
+    broken = ids[1]
+    with open(os.path.join(gabc_dir, f'{broken:0>5}.gabc'), 'w') as handle:
+        handle.write('name:Broken;\n%%\n(c4) A(fg')
+    corpus = GregoBaseCorpus(corpus_dir)
+    chants = list(corpus.chants(ids))
+    assert len(chants) == 2
+    assert list(corpus.errors) == [broken]
+    assert corpus.errors[broken].startswith(f'Chant {broken} could not be parsed')
+    with pytest.raises(ChantParseError):
+        corpus.chant(broken)
+
+def test_chants_does_not_hide_missing_files(corpus_dir):
+    corpus = GregoBaseCorpus(corpus_dir)
+    with pytest.raises(KeyError):
+        list(corpus.chants([99999]))
+
+def test_select_matches_the_tables(corpus_dir):
+    corpus = GregoBaseCorpus(corpus_dir)
+    tables = CorpusTables(os.path.join(corpus_dir, 'csv'))
+    chants, chant_sources = tables.chants, tables.chant_sources
+    chant = chants.index[(chants['office_part'].notnull() & chants['mode'].notnull()).values][0]
+    office_part, mode = chants.loc[chant, 'office_part'], chants.loc[chant, 'mode']
+    expected = chants.index[((chants['office_part'] == office_part) 
+                             & (chants['mode'] == mode)).values]
+    assert corpus.select(office_part=office_part, mode=mode) == list(expected)
+    assert corpus.select(mode=[mode, 'nonexistent']) == \
+           list(chants.index[(chants['mode'] == mode).values])
+
+    source = chant_sources['source'].iloc[0]
+    assert corpus.select(source=source) == \
+           sorted(set(chant_sources.index[(chant_sources['source'] == source).values]))
+    year = tables.sources.loc[source, 'year']
+    sources = tables.sources.index[tables.sources['year'] == year]
+    assert corpus.select(year=year) == \
+           sorted(set(chant_sources.index[chant_sources['source'].isin(sources).values]))
+
+    chant_tags = tables.chant_tags
+    tag_id = chant_tags['tag_id'].iloc[0]
+    expected = sorted(set(chant_tags.index[(chant_tags['tag_id'] == tag_id).values]))
+    assert corpus.select(tag=tag_id) == expected
+    assert corpus.select(tag=tables.tags.loc[tag_id, 'tag']) == expected
+
+    cantus_id = chants['cantus_id'].dropna().iloc[0]
+    assert corpus.select(cantus_id=cantus_id) == \
+           list(chants.index[(chants['cantus_id'] == cantus_id).values])
+    assert corpus.select() == list(chants.index)
+    assert len(corpus) == len(chants)
+
+    # Only the columns needed for the indexes are loaded, not the GABC code
+    assert 'chants' not in corpus.tables.tables
+
+def test_indexes_are_built_once(corpus_dir, monkeypatch):
+    corpus = GregoBaseCorpus(corpus_dir)
+    built = []
+    build_index = corpus.build_index
+    def count_builds(criterion):
+        built.append(criterion)
+        return build_index(criterion)
+    monkeypatch.setattr(corpus, 'build_index', count_builds)
+    first = corpus.select(mode='1', source=1)
+    assert corpus.select(mode='1', source=1) == first
+    corpus.select(mode='2')
+    assert built == ['mode', 'source']
+    assert corpus.index('mode') is corpus.index('mode')
@@ -0,0 +1,117 @@
+import os
+import signal
+
+import pytest
+
+import generate_corpus as gc
+from conftest import build_corpus
+
+@pytest.fixture(scope='module')
+def gabc_corpus(tmp_path_factory, synthetic_sql):
+    """A corpus of which only the CSV and GABC files have been generated"""
+    output_dir = tmp_path_factory.mktemp('gabc-corpus')
+    return build_corpus(output_dir, synthetic_sql, '--stages', 'sql,gabc')
+
+def html_converter(corpus_dir, num_chants=6):
+    """Return an HTML converter for the first few chants with GABC"""
+    gc.set_output_dir(corpus_dir)
+    if os.path.exists(gc.HTML_DIR):
+        for filename in os.listdir(gc.HTML_DIR):
+            os.remove(os.path.join(gc.HTML_DIR, filename))
+    converter = gc.GABCConverter()
+    chants = gc.CorpusTables().chants
+    ids = chants.index[chants['gabc'].notnull() & (chants['gabc'] != '')][:num_chants]
+    converter.chants = converter.chants.loc[ids]
+    return converter
+
+@pytest.fixture
+def time_limit():
+    """Fail instead of hanging forever"""
+    def fail(signum, frame):
+        raise Exception('Test timed out')
+    handler = signal.signal(signal.SIGALRM, fail)
+    signal.alarm(300)
+    yield
+    signal.alarm(0)
+    signal.signal(signal.SIGALRM, handler)
+
+def test_dying_worker_is_reported(gabc_corpus, monkeypatch, time_limit):
+    converter = html_converter(gabc_corpus)
+    ids = list(converter.chants.index)
+    crashing = ids[1]
+    render = gc.render_chant_to_html
+    def render_or_crash(idx, *args, **kwargs):
+        if idx == crashing:
+            os._exit(1)
+        return render(idx, *args, **kwargs)
+    # Worker processes are forked, and so inherit the patched function
+    monkeypatch.setattr(gc, 'render_chant_to_html', render_or_crash)
+    monkeypatch.setattr(gc.GABCConverter, 'chunk_size', 2)
+    converter.convert_to_html(jobs=2)
+    assert 'worker process died' in converter.errors[crashing]
+    assert set(converter.errors) == { crashing }
+    for idx in ids:
+        html_path = os.path.join(gc.HTML_DIR, f'{idx:0>5}.html')
+        assert os.path.exists(html_path) == (idx != crashing)
+
+class BrokenChant(object):
+    def toObject(self, **kwargs):
+        raise ValueError('unexpected element')
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_conversion_errors_are_reported_per_chant(gabc_corpus, monkeypatch, time_limit, jobs):
+    converter = html_converter(gabc_corpus, num_chants=3)
+    failing = converter.chants.index[0]
+    render = gc.render_chant_to_html
+    def render_or_fail(idx, chant, *args, **kwargs):
+        return render(idx, BrokenChant() if idx == failing else chant, *args, **kwargs)
+    monkeypatch.setattr(gc, 'render_chant_to_html', render_or_fail)
+    converter.convert_to_html(jobs=jobs)
+    assert converter.errors == {
+        failing: f'Chant {failing} could not be converted to HTML: unexpected element' }
+    for idx in converter.chants.index:
+        html_path = os.path.join(gc.HTML_DIR, f'{idx:0>5}.html')
+        assert os.path.exists(html_path) == (idx != failing)
+
+def write_gabc(idx, contents):
+    with open(os.path.join(gc.GABC_DIR, f'{idx:0>5}.gabc'), 'w') as handle:
+        handle.write(contents)
+
+@pytest.mark.parametrize('body', [
+    '(c4) A(g) B(h) (::)\n',
+    # chant21 also parses the attributes of further header sections
+    'office-part:in;\n%%\n(c4) A(g) B(h) (::)\n'])
+def test_duplicates_render_like_single_chants(tmp_path, synthetic_sql, monkeypatch, body):
+    corpus = build_corpus(tmp_path / 'corpus', synthetic_sql, '--stages', 'sql,gabc')
+    converter = html_converter(corpus, num_chants=3)
+    first, second, other = converter.chants.index
+    write_gabc(first, f'name:First;\n%%\n{body}')
+    write_gabc(second, f'name:Second;\nmode:1;\n%%\n{body}')
+    write_gabc(other, f'name:Other;\n%%\n{body.replace("B(h)", "B(i)")}')
+    parsed = []
+    parse = gc.parse_chant
+    def count_parses(idx, *args, **kwargs):
+        parsed.append(idx)
+        return parse(idx, *args, **kwargs)
+    monkeypatch.setattr(gc, 'parse_chant', count_parses)
+    converter.convert_to_html()
+    converter.write_duplicates_report()
+    deduplicated = '%%' not in body
+    assert parsed == ([first, other] if deduplicated else [first, second, other])
+
+    html = {}
+    for idx in converter.chants.index:
+        with open(os.path.join(gc.HTML_DIR, f'{idx:0>5}.html')) as handle:
+            html[idx] = handle.read()
+        html_path = str(tmp_path / f'{idx}.html')
+        assert gc.convert_chant_to_html(idx, os.path.join(gc.GABC_DIR, f'{idx:0>5}.gabc'),
+                                        html_path) is None
+        with open(html_path) as handle:
+            assert html[idx] == handle.read()
+    assert 'Second' in html[second] and 'Second' not in html[first]
+
+    with open(os.path.join(gc.OUTPUT_DIR, 'duplicates.csv')) as handle:
+        lines = handle.read().splitlines()
+    assert lines[0] == 'body_hash,chant_id,duplicate_of'
+    assert [line.split(',')[1:] for line in lines[1:]] == \
+           [[str(first), str(first)], [str(second), str(first)]]
@@ -0,0 +1,87 @@
+import copy
+import json
+import os
+import random
+import zipfile
+
+import generate_corpus as gc
+import synthetic_dump
+from conftest import build_corpus, read_files
+
+def modification_times(directory):
+    return { entry.name: entry.stat().st_mtime_ns for entry in os.scandir(directory) }
+
+def test_incremental_build_only_converts_changed_chants(tmp_path, synthetic_sql,
+    synthetic_tables):
+    corpus = build_corpus(tmp_path / 'corpus', synthetic_sql)
+    html_dir = os.path.join(corpus, 'html')
+    html_files = read_files(html_dir)
+    mtimes = modification_times(html_dir)
+
+    # Nothing changed
+    build_corpus(corpus, synthetic_sql, '--incremental')
+    assert modification_times(html_dir) == mtimes
+    assert read_files(html_dir) == html_files
+
+    # Change the GABC of one chant, and remove another
+    converted = sorted(int(name.split('.')[0]) for name in html_files)
+    changed, removed = converted[0], converted[1]
+    tables = copy.deepcopy(synthetic_tables)
+    for row in tables['chants']:
+        if row[0] == changed:
+            row[10] = json.dumps(synthetic_dump.random_gabc(random.Random(0)))
+    tables['chants'] = [row for row in tables['chants'] if row[0] != removed]
+    changed_sql = str(tmp_path / 'changed.sql')
+    synthetic_dump.write_dump(tables, changed_sql)
+    build_corpus(corpus, changed_sql, '--incremental')
+
+    new_mtimes = modification_times(html_dir)
+    assert f'{removed:0>5}.html' not in new_mtimes
+    assert new_mtimes[f'{changed:0>5}.html'] != mtimes[f'{changed:0>5}.html']
+    unchanged = set(mtimes) - { f'{changed:0>5}.html', f'{removed:0>5}.html' }
+    assert { name: new_mtimes[name] for name in unchanged } == \
+           { name: mtimes[name] for name in unchanged }
+
+    # The result is the same as that of a full build
+    fresh = build_corpus(tmp_path / 'fresh', changed_sql)
+    for directory in ['csv', 'gabc', 'html', 'features']:
+        assert read_files(os.path.join(corpus, directory)) == \
+               read_files(os.path.join(fresh, directory))
+    for filename in ['manifest.json', 'duplicates.csv', 'unconvertable.csv']:
+        assert read_files(corpus)[filename] == read_files(fresh)[filename]
+
+def test_release_archive_excludes_build_files(tmp_path, synthetic_sql):
+    corpus = build_corpus(tmp_path / 'corpus', synthetic_sql)
+    with zipfile.ZipFile(os.path.join(corpus, f'gregobasecorpus-v{gc.__version__}.zip')) as archive:
+        names = set(archive.namelist())
+    for filename in gc.CorpusArchive.excluded:
+        assert filename not in names
+    for filename in ['README.md', 'csv/chants.csv', 'unconvertable.csv', 'duplicates.csv']:
+        assert filename in names
+
+def test_incremental_build_retries_timed_out_chants(tmp_path, synthetic_sql, monkeypatch):
+    def time_out(*args, **kwargs):
+        raise gc.ChantTimeoutError('conversion timed out')
+    with monkeypatch.context() as patch:
+        patch.setattr(gc.converter, 'parse', time_out)
+        corpus = build_corpus(tmp_path / 'corpus', synthetic_sql, '--timeout', 60)
+    assert os.listdir(os.path.join(corpus, 'html')) == []
+    with open(os.path.join(corpus, 'manifest.json')) as handle:
+        entries = json.load(handle)['chants'].values()
+    timed_out = [entry for entry in entries if entry.get('html_error', '').endswith('timed out')]
+    assert len(timed_out) > 0
+    assert all(entry['html_error_options'] == { 'timeout': 60, 'max_memory': None }
+               for entry in timed_out)
+
+    # With the same timeout, the chants are not converted again
+    build_corpus(corpus, synthetic_sql, '--incremental', '--timeout', 60)
+    assert os.listdir(os.path.join(corpus, 'html')) == []
+
+    # With a different timeout, they are
+    build_corpus(corpus, synthetic_sql, '--incremental', '--timeout', 120)
+    fresh = build_corpus(tmp_path / 'fresh', synthetic_sql, '--timeout', 120)
+    assert read_files(os.path.join(corpus, 'html')) == \
+           read_files(os.path.join(fresh, 'html'))
+    assert len(os.listdir(os.path.join(corpus, 'html'))) > 0
+    for filename in ['manifest.json', 'unconvertable.csv']:
+        assert read_files(corpus)[filename] == read_files(fresh)[filename]
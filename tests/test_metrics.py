@@ -0,0 +1,30 @@
+import json
+import os
+
+from conftest import build_corpus
+
+def read_stages(corpus):
+    with open(os.path.join(corpus, 'performance.json'), 'r') as handle:
+        return { stage['stage']: stage for stage in json.load(handle)['stages'] }
+
+def test_stages_count_the_files_they_write(tmp_path, synthetic_sql):
+    corpus = build_corpus(tmp_path / 'corpus', synthetic_sql)
+    stages = read_stages(corpus)
+    num_gabc = len(os.listdir(os.path.join(corpus, 'gabc')))
+    # The GABC files and the manifest
+    assert stages['gabc']['files_written'] == num_gabc + 1
+
+    # All files except the performance report itself
+    files = [os.path.join(dirpath, filename) 
+             for dirpath, _, filenames in os.walk(corpus) for filename in filenames
+             if filename not in ['performance.json', 'performance-chants.csv']]
+    # (the manifest is written by both the gabc and the html stage)
+    assert sum(stage['files_written'] for stage in stages.values()) == len(files) + 1
+    html_dir = os.path.join(corpus, 'html')
+    assert stages['html']['bytes_written'] > \
+           sum(entry.stat().st_size for entry in os.scandir(html_dir))
+    
+    # Nothing changed, so only the manifest is written again
+    build_corpus(corpus, synthetic_sql, '--incremental')
+    stages = read_stages(corpus)
+    assert stages['gabc']['files_written'] == 1
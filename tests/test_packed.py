@@ -0,0 +1,49 @@
+import os
+
+import generate_corpus as gc
+from conftest import build_corpus, read_files
+
+FILES = {
+    'gabc': {
+        1: b'name:Kyrie;\r\n%%\r\n(c4) KY(f)ri(g)e(h)\r\n',
+        2: 'name:Glória;\n%%\n(c3) GLÓ(f)ri(g)a(h)\n'.encode('utf-8'),
+        10: b'',
+    },
+    'html': {
+        1: b'<html>\r\n</html>',
+        2: b'<html>\n</html>\n',
+    }
+}
+
+def test_pack_and_unpack_keep_files_byte_for_byte(tmp_path):
+    gc.set_output_dir(str(tmp_path / 'corpus'))
+    for kind, directory in [('gabc', gc.GABC_DIR), ('html', gc.HTML_DIR)]:
+        os.makedirs(directory)
+        for idx, contents in FILES[kind].items():
+            with open(os.path.join(directory, f'{idx:0>5}.{kind}'), 'wb') as handle:
+                handle.write(contents)
+    # Small shards, so that the files are spread over several shards
+    gc.pack_corpus(shard_size=20)
+    assert not os.path.exists(gc.GABC_DIR)
+    for kind, files in FILES.items():
+        reader = gc.ShardReader(kind)
+        assert reader.ids() == sorted(files)
+        for idx, contents in files.items():
+            assert reader.get_bytes(idx) == contents
+            assert reader.get(idx) == contents.decode('utf-8')
+        reader.close()
+
+    gc.unpack_corpus(remove=True)
+    assert not os.path.exists(gc.PACKED_DIR)
+    for kind, files in FILES.items():
+        assert read_files(os.path.join(gc.OUTPUT_DIR, kind)) == \
+               { f'{idx:0>5}.{kind}': contents for idx, contents in files.items() }
+
+def test_unpacked_build_equals_default_build(tmp_path, synthetic_sql):
+    default = build_corpus(tmp_path / 'default', synthetic_sql)
+    packed = build_corpus(tmp_path / 'packed', synthetic_sql, '--packed')
+    assert not os.path.exists(os.path.join(packed, 'gabc'))
+    gc.unpack_corpus(packed)
+    for directory in ['gabc', 'html']:
+        assert read_files(os.path.join(packed, directory)) == \
+               read_files(os.path.join(default, directory))
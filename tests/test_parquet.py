@@ -0,0 +1,56 @@
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import generate_corpus as gc
+from conftest import build_corpus
+
+def test_parquet_round_trip(tmp_path, synthetic_sql):
+    corpus = build_corpus(tmp_path / 'corpus', synthetic_sql, '--stages', 'sql,gabc,parquet',
+                          '--parquet')
+    tables = gc.CorpusTables()
+    for table_name, columns in gc.DB_STRUCTURE.items():
+        table = pq.read_table(os.path.join(corpus, 'parquet', f'{table_name}.parquet'))
+        schema = table.schema
+        assert schema.names == [column['name'] for column in columns[1:]] + [columns[0]['name']]
+        assert schema.field(columns[0]['name']).type == pa.int32()
+        for column in columns[1:]:
+            dtype = column.get('pandas_dtype')
+            field_type = schema.field(column['name']).type
+            if dtype == 'category':
+                assert pa.types.is_dictionary(field_type)
+            elif dtype in ['int32', 'Int32']:
+                assert field_type == pa.int32()
+            elif column['dtype'] == 'str':
+                assert (pa.types.is_string(field_type) or pa.types.is_large_string(field_type)
+                        or pa.types.is_null(field_type))
+        # The pandas dtypes survive the round trip, and so do the values
+        df = table.to_pandas()
+        expected = getattr(tables, table_name)
+        assert df.dtypes.to_dict() == expected.dtypes.to_dict()
+        assert df.index.dtype == expected.index.dtype
+        assert df.equals(expected)
+
+    # Nullable integers (e.g. chants without a source) are kept as nulls
+    chant_sources = pq.read_table(os.path.join(corpus, 'parquet', 'chant_sources.parquet'))
+    assert str(chant_sources.to_pandas()['source'].dtype) == 'Int32'
+    chant_tags = pq.read_table(os.path.join(corpus, 'parquet', 'chant_tags.parquet'))
+    assert str(chant_tags.to_pandas()['tag_id'].dtype) == 'Int32'
+
+    texts = pq.read_table(os.path.join(corpus, 'parquet', 'chant_texts.parquet'))
+    assert texts.schema.names == ['chant_id', 'gabc_body', 'gabc_header']
+    assert texts.schema.field('chant_id').type == pa.int32()
+    assert texts.schema.field('gabc_body').type == pa.string()
+    assert texts.schema.field('gabc_header').type == pa.map_(pa.string(), pa.string())
+    ids = texts.column('chant_id').to_pylist()
+    assert ids == sorted(ids)
+    assert ids == sorted(int(name.split('.')[0]) for name in os.listdir(gc.GABC_DIR))
+    for idx, body, header in zip(ids, texts.column('gabc_body').to_pylist(),
+                                 texts.column('gabc_header').to_pylist()):
+        with open(os.path.join(gc.GABC_DIR, f'{idx:0>5}.gabc')) as handle:
+            contents = handle.read()
+        assert contents.endswith(body)
+        for key, value in header:
+            assert f'{key}:' in contents
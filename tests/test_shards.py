@@ -0,0 +1,30 @@
+import os
+import zipfile
+
+import pytest
+
+import generate_corpus as gc
+from conftest import build_corpus, read_files
+
+@pytest.mark.parametrize('order', [[1, 2, 3], [3, 1, 2]])
+def test_merged_shards_equal_a_single_build(tmp_path, synthetic_sql, order):
+    single = build_corpus(tmp_path / 'single', synthetic_sql)
+    merged = build_corpus(tmp_path / 'merged', synthetic_sql, '--stages', 'sql')
+    # The order in which the shards are built does not matter
+    for shard in order:
+        build_corpus(merged, synthetic_sql, '--shard', f'{shard}/3')
+    build_corpus(merged, synthetic_sql, '--merge', 3)
+    for directory in ['csv', 'gabc', 'html', 'features']:
+        assert read_files(os.path.join(merged, directory)) == \
+               read_files(os.path.join(single, directory))
+    for filename in ['manifest.json', 'validation.csv', 'unconvertable.csv', 
+                     'duplicates.csv', 'statistics.json']:
+        assert read_files(merged)[filename] == read_files(single)[filename]
+    archives = []
+    for corpus in [merged, single]:
+        filepath = os.path.join(corpus, f'gregobasecorpus-v{gc.__version__}.zip')
+        with zipfile.ZipFile(filepath) as archive:
+            # The log is only written outside pytest (which captures logging)
+            archives.append(sorted(name for name in archive.namelist() 
+                                   if name != 'corpus-generation.log'))
+    assert archives[0] == archives[1]
@@ -0,0 +1,62 @@
+import os
+
+import pandas as pd
+import pytest
+
+import generate_corpus as gc
+
+DUMP = r"""-- phpMyAdmin SQL Dump
+/* A comment; with (punctuation), 'quotes
+   and INSERT statements on several lines */
+# Another comment
+CREATE TABLE `gregobase_tags` (`id` int(11), `tag` mediumtext);
+INSERT INTO `gregobase_tags` (`id`, `tag`) VALUES
+(1, 'Pascha'), (2, 'It''s'), (3, 'back\\slash \'quoted\''),
+(4, NULL), (5, '/* not a comment */ -- nor this'), (6, 'two\nlines');
+INSERT IGNORE INTO gregobase_other VALUES (1, "x");
+/*!40101 SET NAMES utf8mb4 */;
+-- that's all, without a final newline"""
+
+EXPECTED_ROWS = [
+    ('gregobase_tags', ['1', 'Pascha']),
+    ('gregobase_tags', ['2', "It's"]),
+    ('gregobase_tags', ['3', "back\\slash 'quoted'"]),
+    ('gregobase_tags', ['4', None]),
+    ('gregobase_tags', ['5', '/* not a comment */ -- nor this']),
+    ('gregobase_tags', ['6', 'two\nlines']),
+    ('gregobase_other', ['1', 'x']),
+]
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 16, 2 ** 20])
+def test_dump_reader_chunk_boundaries(tmp_path, monkeypatch, chunk_size):
+    filepath = tmp_path / 'dump.sql'
+    filepath.write_text(DUMP, encoding='utf-8')
+    monkeypatch.setattr(gc.SQLDumpReader, 'chunk_size', chunk_size)
+    rows = list(gc.SQLDumpReader(str(filepath)).rows())
+    assert rows == EXPECTED_ROWS
+
+def test_native_engine_writes_expected_csv_files(tmp_path, monkeypatch,
+    synthetic_sql, synthetic_tables):
+    gc.set_output_dir(str(tmp_path / 'corpus'))
+    # Small chunks, so that every table is written in several chunks
+    monkeypatch.setattr(gc.SQLConverter, 'chunk_size', 7)
+    gc.SQLConverter(engine='native').convert_to_csv(filepath=synthetic_sql)
+    for table_name, rows in synthetic_tables.items():
+        filepath = os.path.join(gc.CSV_DIR, f'{table_name}.csv')
+        table = pd.read_csv(filepath, dtype=str, keep_default_na=False)
+        names = [column['name'] for column in gc.DB_STRUCTURE[table_name]]
+        assert list(table.columns) == names
+        expected = [['' if value is None else str(value) for value in row] for row in rows]
+        assert table.values.tolist() == expected
+
+def test_native_engine_writes_empty_tables(tmp_path):
+    filepath = tmp_path / 'dump.sql'
+    filepath.write_text(DUMP, encoding='utf-8')
+    gc.set_output_dir(str(tmp_path / 'corpus'))
+    gc.SQLConverter(engine='native').convert_to_csv(filepath=str(filepath))
+    with open(os.path.join(gc.CSV_DIR, 'chants.csv'), 'r') as handle:
+        header = handle.read()
+    names = [column['name'] for column in gc.DB_STRUCTURE['chants']]
+    assert header == ','.join(names) + '\n'
+    tags = pd.read_csv(os.path.join(gc.CSV_DIR, 'tags.csv'), index_col=0)
+    assert tags['tag'].tolist()[:3] == ['Pascha', "It's", "back\\slash 'quoted'"]
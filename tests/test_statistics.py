@@ -0,0 +1,25 @@
+import json
+import os
+
+import generate_corpus as gc
+import synthetic_dump
+from conftest import build_corpus
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+def test_statistics_equal_expected_output(tmp_path):
+    # Expected output of the README writer from before the statistics engine,
+    # on a dump with tied counts (e.g. of office parts)
+    sql = str(tmp_path / 'dump.sql')
+    synthetic_dump.write_dump(synthetic_dump.generate_tables(150, seed=1), sql)
+    corpus = build_corpus(tmp_path / 'corpus', sql, '--stages', 'sql')
+    writer = gc.ReadmeWriter()
+    tables = [writer.table_structure(name) for name in ['chants', 'chant_sources', 'chant_tags']]
+    with open(os.path.join(DATA_DIR, 'statistics-tables.md')) as handle:
+        assert '\n\n'.join(tables) + '\n' == handle.read()
+
+    writer.statistics.write_json()
+    with open(os.path.join(corpus, 'statistics.json')) as handle:
+        statistics = json.load(handle)
+    with open(os.path.join(DATA_DIR, 'statistics.json')) as handle:
+        assert statistics == json.load(handle)
@@ -0,0 +1,92 @@
+import copy
+import os
+import random
+
+import pandas as pd
+import pytest
+
+import generate_corpus as gc
+import synthetic_dump
+from conftest import build_corpus, read_files
+
+@pytest.fixture
+def shuffled_sql(tmp_path, synthetic_tables):
+    """A dump in which the chants and link tables are not sorted by chant id"""
+    tables = copy.deepcopy(synthetic_tables)
+    rng = random.Random(0)
+    for table_name in ['chants', 'chant_sources', 'chant_tags']:
+        rng.shuffle(tables[table_name])
+    filepath = str(tmp_path / 'shuffled.sql')
+    synthetic_dump.write_dump(tables, filepath)
+    return filepath
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 100])
+def test_read_sorted_chunks_is_a_stable_sort(tmp_path, chunk_size):
+    gc.set_output_dir(str(tmp_path / 'corpus'))
+    os.makedirs(gc.CSV_DIR)
+    rng = random.Random(chunk_size)
+    rows = [(rng.randint(1, 4), rng.randint(1, 100)) for _ in range(30)]
+    table = pd.DataFrame(rows, columns=['chant_id', 'tag_id']).set_index('chant_id')
+    table.to_csv(os.path.join(gc.CSV_DIR, 'chant_tags.csv'))
+    chunks = list(gc.CorpusTables().read_sorted_chunks('chant_tags', chunk_size))
+    result = pd.concat(chunks)
+    expected = table.sort_index(kind='mergesort')
+    assert result.index.tolist() == expected.index.tolist()
+    assert result['tag_id'].tolist() == expected['tag_id'].tolist()
+
+def test_chunked_build_sorts_unsorted_tables(tmp_path, shuffled_sql):
+    chunked = build_corpus(tmp_path / 'chunked', shuffled_sql, 
+        '--stages', 'sql,gabc', '--chunk-size', 7)
+    default = build_corpus(tmp_path / 'default', shuffled_sql, '--stages', 'sql,gabc')
+    assert read_files(os.path.join(chunked, 'gabc')) == \
+           read_files(os.path.join(default, 'gabc'))
+
+def test_columns_only_loads_some_columns(tmp_path, synthetic_sql):
+    corpus = build_corpus(tmp_path / 'corpus', synthetic_sql, '--stages', 'sql')
+    tables = gc.CorpusTables(os.path.join(corpus, 'csv'))
+    modes = tables.columns('chants', ['mode'])
+    assert list(modes.columns) == ['mode']
+    assert 'chants' not in tables.tables
+    assert modes.index.equals(tables.chants.index)
+    assert tables.columns('chants', ['mode']).equals(modes)
+
+@pytest.fixture
+def sparse_sql(tmp_path, synthetic_tables):
+    """A dump in which categorical columns have missing values"""
+    tables = copy.deepcopy(synthetic_tables)
+    names = { table_name: [column['name'] for column in columns]
+              for table_name, columns in gc.DB_STRUCTURE.items() }
+    for column in ['office_part', 'mode', 'version']:
+        tables['chants'][0][names['chants'].index(column)] = None
+    filepath = str(tmp_path / 'sparse.sql')
+    synthetic_dump.write_dump(tables, filepath)
+    return filepath
+
+def test_tables_have_declared_dtypes(tmp_path, sparse_sql):
+    corpus = build_corpus(tmp_path / 'corpus', sparse_sql, '--stages', 'sql')
+    tables = gc.CorpusTables(os.path.join(corpus, 'csv'))
+    for table_name, columns in gc.DB_STRUCTURE.items():
+        table = getattr(tables, table_name)
+        assert table.index.name == columns[0]['name']
+        assert str(table.index.dtype) == columns[0]['pandas_dtype']
+        for column in columns[1:]:
+            dtype = table[column['name']].dtype
+            if 'pandas_dtype' in column:
+                assert str(dtype) == column['pandas_dtype']
+            elif column['dtype'] == 'str':
+                assert pd.api.types.is_string_dtype(dtype)
+    assert tables.chants['office_part'].isnull().any()
+
+def test_tables_are_written_back_byte_for_byte(tmp_path, sparse_sql):
+    # Chunks of loaded tables are written back to CSV files when sorting them
+    corpus = build_corpus(tmp_path / 'corpus', sparse_sql, '--stages', 'sql')
+    tables = gc.CorpusTables(os.path.join(corpus, 'csv'))
+    files = read_files(os.path.join(corpus, 'csv'))
+    for table_name, columns in gc.DB_STRUCTURE.items():
+        filepath = os.path.join(corpus, 'csv', f'{table_name}.csv')
+        # The original export read all tables with str and int columns only
+        dtypes = { column['name']: { 'str': str, 'int': int }[column['dtype']]
+                   for column in columns }
+        baseline = pd.read_csv(filepath, dtype=dtypes, index_col=0).to_csv().encode('utf-8')
+        assert files[f'{table_name}.csv'] == baseline
+        assert getattr(tables, table_name).to_csv().encode('utf-8') == baseline
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+import generate_corpus as gc
+import synthetic_dump
+from conftest import build_corpus
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_validator_has_no_false_positives(tmp_path, jobs):
+    sql = str(tmp_path / 'dump.sql')
+    synthetic_dump.write_dump(synthetic_dump.generate_tables(200, seed=2), sql)
+    build_corpus(tmp_path / 'corpus', sql, '--stages', 'sql,gabc')
+    invalid = gc.GABCValidator().validate(jobs=jobs)
+    assert len(invalid) < len(os.listdir(gc.GABC_DIR))
+    # chant21 cannot parse any of the chants reported as invalid
+    for idx, reason in invalid.items():
+        gabc_path = os.path.join(gc.GABC_DIR, f'{idx:0>5}.gabc')
+        with pytest.raises(Exception):
+            gc.converter.parse(gabc_path, format='gabc', forceSource=True, storePickle=False)
+
+@pytest.mark.parametrize('body', ['(fy)(c4) c(g)', 'a(fx)b(c4)c(g)'])
+def test_clef_after_alteration_in_same_word(body):
+    assert gc.GABCValidator.validate_body(body) is None
+    gc.converter.parseData(f'name: test;\n%%\n{body}', format='gabc', forceSource=True)
+
+@pytest.mark.parametrize('body', ['(fx) (c4) c(g)', '(fx g c4) c(g)'])
+def test_alteration_without_clef_in_same_word(body):
+    assert gc.GABCValidator.validate_body(body) == 'Missing clef'
+    with pytest.raises(Exception):
+        gc.converter.parseData(f'name: test;\n%%\n{body}', format='gabc', forceSource=True)